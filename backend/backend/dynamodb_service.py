@@ -1,15 +1,36 @@
+import time
 import boto3
 from django.conf import settings
 from django.core.cache import cache
+from boto3.dynamodb.transform import TransformationInjector
+from boto3.dynamodb.conditions import AttributeBase, ConditionBase
 from botocore.exceptions import ClientError
+from .request_scope import forget_reads, shared_read
+from .serialization import PlainNumberDeserializer
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _read_key(value):
+    """Hashable description of read arguments; boto3 conditions by content rather than identity"""
+    if isinstance(value, ConditionBase):
+        expression = value.get_expression()
+        return (expression['format'], expression['operator'], tuple(_read_key(v) for v in expression['values']))
+    if isinstance(value, AttributeBase):
+        return (type(value).__name__, value.name)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _read_key(v)) for key, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_read_key(v) for v in value)
+    return repr(value)
+
+
 class DynamoDBService:
     def __init__(self):
         self.dynamodb = None
         self.tables = {}
+        self.plain_tables = {}
         self._initialized = False
     
     def _initialize(self):
@@ -31,14 +52,28 @@ class DynamoDBService:
                 )
                 for key, table_name in settings.DYNAMODB_TABLES.items():
                     self.tables[key] = self.dynamodb.Table(table_name)
+                
+                # Second resource whose responses carry int/float instead of Decimal (plain=True reads)
+                plain_dynamodb = session.resource('dynamodb', config=self.dynamodb.meta.client.meta.config)
+                events = plain_dynamodb.meta.client.meta.events
+                events.unregister('after-call.dynamodb', unique_id='dynamodb-attr-value-output')
+                self._plain_injector = TransformationInjector(deserializer=PlainNumberDeserializer())
+                events.register(
+                    'after-call.dynamodb',
+                    self._plain_injector.inject_attribute_value_output,
+                    unique_id='dynamodb-attr-value-output'
+                )
+                for key, table_name in settings.DYNAMODB_TABLES.items():
+                    self.plain_tables[key] = plain_dynamodb.Table(table_name)
                 self._initialized = True
             except Exception as e:
                 logger.error(f"Failed to initialize DynamoDB: {e}")
                 raise
     
-    def get_table(self, table_key):
+    def get_table(self, table_key, plain=False):
+        """Table resource; plain=True returns numbers as int/float, for read-only responses"""
         self._initialize()
-        table = self.tables.get(table_key)
+        table = (self.plain_tables if plain else self.tables).get(table_key)
         if table is None:
             raise ValueError(f"Table '{table_key}' not found in configuration")
         return table
@@ -47,6 +82,7 @@ class DynamoDBService:
         try:
             table = self.get_table(table_key)
             response = table.put_item(Item=item)
+            forget_reads(table_key)
             # Clear cache after write
             cache_pattern = f"scan_{table_key}_"
             try:
@@ -68,18 +104,28 @@ class DynamoDBService:
             logger.error(f"Error getting item from {table_key}: {e}")
             raise
     
-    def scan_table(self, table_key, **kwargs):
+    def scan_table(self, table_key, use_cache=True, parallel=False, plain=False, **kwargs):
+        """
+        Scan a whole table (paginated); parallel=True splits it into segments even when filtered,
+        plain=True returns numbers as int/float (see backend.serialization)
+        """
+        return shared_read(
+            table_key, ('scan', plain, _read_key(kwargs)),
+            lambda: self._scan_table(table_key, use_cache, parallel, plain, **kwargs)
+        )
+
+    def _scan_table(self, table_key, use_cache, parallel, plain, **kwargs):
         try:
-            table = self.get_table(table_key)
+            table = self.get_table(table_key, plain)
             
             # Enhanced caching with better key generation
-            cache_key = f"scan_{table_key}_{hash(str(sorted(kwargs.items())))}"
-            cached_result = cache.get(cache_key)
+            cache_key = f"scan_{table_key}_{'plain_' if plain else ''}{hash(str(sorted(kwargs.items())))}"
+            cached_result = cache.get(cache_key) if use_cache else None
             if cached_result is not None:
                 return cached_result
             
             # Use parallel scan for large tables
-            if not kwargs.get('FilterExpression') and table_key in ['stock_transactions', 'STOCK']:
+            if parallel or (not kwargs.get('FilterExpression') and table_key in ['stock_transactions', 'STOCK']):
                 items = self._parallel_scan(table, **kwargs)
             else:
                 response = table.scan(**kwargs)
@@ -106,6 +152,10 @@ class DynamoDBService:
         
         def scan_segment(segment):
             segment_kwargs = kwargs.copy()
+            # boto3 adds the filter's placeholders to these maps in place, so give each segment its own
+            for key in ('ExpressionAttributeNames', 'ExpressionAttributeValues'):
+                if key in segment_kwargs:
+                    segment_kwargs[key] = dict(segment_kwargs[key])
             segment_kwargs.update({
                 'Segment': segment,
                 'TotalSegments': segments
@@ -128,11 +178,47 @@ class DynamoDBService:
         
         return items
     
-    def query_table(self, table_key, **kwargs):
+    def iter_scan(self, table_key, plain=False, **kwargs):
+        """Yield a scan page by page, uncached, so callers can stream without holding the whole table"""
         try:
-            table = self.get_table(table_key)
+            table = self.get_table(table_key, plain)
+            while True:
+                response = table.scan(**kwargs)
+                yield response.get('Items', [])
+                if 'LastEvaluatedKey' not in response:
+                    return
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            logger.error(f"Error scanning {table_key}: {e}")
+            raise
+    
+    def query_table(self, table_key, plain=False, **kwargs):
+        """Query a table or index, following pagination unless an explicit Limit is given"""
+        return shared_read(
+            table_key, ('query', plain, _read_key(kwargs)),
+            lambda: self._query_table(table_key, plain, **kwargs)
+        )
+
+    def _query_table(self, table_key, plain, **kwargs):
+        try:
+            table = self.get_table(table_key, plain)
             response = table.query(**kwargs)
-            return response.get('Items', [])
+            items = response.get('Items', [])
+            
+            while 'LastEvaluatedKey' in response and 'Limit' not in kwargs:
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+                response = table.query(**kwargs)
+                items.extend(response.get('Items', []))
+            
+            return items
+        except ClientError as e:
+            logger.error(f"Error querying {table_key}: {e}")
+            raise
+    
+    def query_page(self, table_key, plain=False, **kwargs):
+        """One Query call; returns the raw response so callers can resume from LastEvaluatedKey"""
+        try:
+            return self.get_table(table_key, plain).query(**kwargs)
         except ClientError as e:
             logger.error(f"Error querying {table_key}: {e}")
             raise
@@ -141,6 +227,7 @@ class DynamoDBService:
         try:
             table = self.get_table(table_key)
             response = table.delete_item(Key=key)
+            forget_reads(table_key)
             return response
         except ClientError as e:
             logger.error(f"Error deleting item from {table_key}: {e}")
@@ -155,6 +242,7 @@ class DynamoDBService:
                 ExpressionAttributeValues=expression_attribute_values,
                 **kwargs
             )
+            forget_reads(table_key)
             
             # Clear related cache entries
             cache_pattern = f"scan_{table_key}_*"
@@ -165,23 +253,61 @@ class DynamoDBService:
             logger.error(f"Error updating item in {table_key}: {e}")
             raise
     
+    def batch_write_items(self, table_key, items, delete_keys=None):
+        """Write (and optionally delete) many items with batch_writer (25 per request, unprocessed items retried)"""
+        try:
+            table = self.get_table(table_key)
+            with table.batch_writer() as batch:
+                for item in items:
+                    batch.put_item(Item=item)
+                for key in delete_keys or []:
+                    batch.delete_item(Key=key)
+            forget_reads(table_key)
+            
+            # Clear cache after write
+            try:
+                cache.delete_pattern(f"scan_{table_key}_*")
+            except:
+                pass
+            logger.info(f"✓ Batch wrote {len(items)} item(s) to {table_key}, deleted {len(delete_keys or [])}")
+        except ClientError as e:
+            logger.error(f"Error batch writing items to {table_key}: {e}")
+            raise
+    
     def batch_get_items(self, table_key, keys):
         """Efficiently get multiple items at once"""
         try:
             table = self.get_table(table_key)
             
+            # DynamoDB rejects duplicate keys within one batch
+            unique_keys = []
+            seen = set()
+            for key in keys:
+                marker = tuple(sorted(key.items()))
+                if marker not in seen:
+                    seen.add(marker)
+                    unique_keys.append(key)
+            
             # DynamoDB batch_get_item has a limit of 100 items
             items = []
-            for i in range(0, len(keys), 100):
-                batch_keys = keys[i:i+100]
-                response = self.dynamodb.batch_get_item(
-                    RequestItems={
-                        table.name: {
-                            'Keys': batch_keys
-                        }
+            for i in range(0, len(unique_keys), 100):
+                request_items = {
+                    table.name: {
+                        'Keys': unique_keys[i:i+100]
                     }
-                )
-                items.extend(response.get('Responses', {}).get(table.name, []))
+                }
+                attempt = 0
+                while request_items:
+                    response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                    items.extend(response.get('Responses', {}).get(table.name, []))
+                    
+                    # Retry throttled keys with a short backoff
+                    request_items = response.get('UnprocessedKeys') or {}
+                    if request_items:
+                        attempt += 1
+                        if attempt > 5:
+                            raise RuntimeError(f"Unprocessed keys remain for {table_key} after {attempt} attempts")
+                        time.sleep(min(0.05 * (2 ** attempt), 1))
             
             return items
         except ClientError as e:
@@ -0,0 +1,116 @@
+"""
+Dependency-aware concurrent fetches for views that read several sources.
+
+A view declares each read it needs, and the reads it depends on, on a
+FetchPlan. run() executes every read whose dependencies are satisfied on the
+shared fetch pool and hands dependents the results they asked for, so
+independent reads overlap and the view waits about as long as its slowest
+chain of reads rather than their sum:
+
+    plan = FetchPlan()
+    plan.add('stock', dynamodb_service.scan_table, 'STOCK', use_cache=False)
+    plan.add('groups', dynamodb_service.scan_table, 'GROUPS', use_cache=False)
+    plan.add('opening', lambda stock: opening_balances(month, stock), needs=('stock',))
+    data = plan.run()    # {'stock': [...], 'groups': [...], 'opening': {...}}
+
+A plan run from inside a pool thread runs its reads one after another, so
+nested plans can never wait on a pool they are occupying.
+"""
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker = threading.local()
+
+
+def fetch_pool():
+    """The process-wide pool the fetch plans run on (FETCH_POOL_WORKERS threads)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'FETCH_POOL_WORKERS', 8),
+                    thread_name_prefix='fetch',
+                    initializer=_mark_worker
+                )
+    return _pool
+
+
+def _mark_worker():
+    _worker.active = True
+
+
+class FetchPlan:
+    """Named reads with dependencies, run concurrently by run()"""
+
+    def __init__(self):
+        self._steps = {}
+
+    def add(self, name, fn, *args, needs=(), **kwargs):
+        """
+        Declare read `name` as fn(*args, **kwargs); the results of the reads named
+        in needs are passed to it as keyword arguments of the same names
+        """
+        if name in self._steps:
+            raise ValueError(f"Fetch '{name}' is already planned")
+        self._steps[name] = (fn, args, kwargs, tuple(needs))
+        return self
+
+    def _call(self, name, results):
+        fn, args, kwargs, needs = self._steps[name]
+        return fn(*args, **kwargs, **{dep: results[dep] for dep in needs})
+
+    def _order(self):
+        """Step names in dependency order; ValueError on unknown or circular dependencies"""
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Circular fetch dependency: {' -> '.join(path + [name])}")
+            if name not in self._steps:
+                raise ValueError(f"Fetch '{path[-1]}' needs unknown fetch '{name}'")
+            state[name] = 'visiting'
+            for dep in self._steps[name][3]:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self._steps:
+            visit(name, [])
+        return order
+
+    def run(self):
+        """Execute every planned read and return {name: result}; the first failure is raised"""
+        order = self._order()
+        results = {}
+        if len(order) < 2 or getattr(_worker, 'active', False):
+            for name in order:
+                results[name] = self._call(name, results)
+            return results
+
+        pool = fetch_pool()
+        running = {}
+        waiting = list(order)
+        try:
+            while waiting or running:
+                for name in [n for n in waiting if all(dep in results for dep in self._steps[n][3])]:
+                    waiting.remove(name)
+                    # Steps run in a copy of the caller's context, so they share its request scope
+                    running[pool.submit(contextvars.copy_context().run, self._call, name, dict(results))] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        except Exception:
+            for future in running:
+                future.cancel()
+            raise
+        return results
@@ -0,0 +1,82 @@
+"""
+Time-ordered record ids (UUIDv7 layout, RFC 9562).
+
+new_id() returns a canonical 36-character UUID string whose first 48 bits are
+the creation time in Unix milliseconds, so ids sort as strings in creation
+order and still validate as UUIDs next to the existing uuid4 keys. Within a
+process, ids minted in the same millisecond take consecutive values of the
+12-bit counter field, so they stay strictly increasing; the 62 random bits
+keep ids from different workers apart.
+
+lowest_id()/highest_id()/id_range() give the smallest and largest id a moment
+can produce, so a time window becomes a key range:
+
+    start, end = id_range('2025-04-01', '2025-04-30')
+    Key('transaction_id').between(start, end)    # or Attr(...) in a scan filter
+"""
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+MAX_SEQUENCE = 0xFFF
+
+
+def _format(ms, sequence, random_bits):
+    value = (ms << 80) | (0x7 << 76) | (sequence << 64) | (0b10 << 62) | random_bits
+    return str(uuid.UUID(int=value))
+
+
+def new_id():
+    """A new time-ordered id"""
+    global _last_ms, _sequence
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            # Start each millisecond low in the counter range to leave room for a burst
+            _last_ms, _sequence = ms, secrets.randbits(10)
+        elif _sequence < MAX_SEQUENCE:
+            _sequence += 1
+        else:
+            _last_ms, _sequence = _last_ms + 1, 0
+        ms, sequence = _last_ms, _sequence
+    return _format(ms, sequence, secrets.randbits(62))
+
+
+def _to_ms(moment):
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment)
+    return int(moment.timestamp() * 1000)
+
+
+def lowest_id(moment):
+    """The smallest id created at moment (datetime or ISO string; naive means local time)"""
+    return _format(_to_ms(moment), 0, 0)
+
+
+def highest_id(moment):
+    """The largest id created at moment (datetime or ISO string; naive means local time)"""
+    return _format(_to_ms(moment), MAX_SEQUENCE, (1 << 62) - 1)
+
+
+def id_range(start, end):
+    """(lowest, highest) ids created from start to end inclusive; a bare "YYYY-MM-DD" end covers that whole day"""
+    if isinstance(end, str) and len(end) == 10:
+        end = datetime.fromisoformat(end) + timedelta(days=1, milliseconds=-1)
+    return lowest_id(start), highest_id(end)
+
+
+def id_time(record_id):
+    """Local creation time of a time-ordered id, None for any other id (e.g. a uuid4)"""
+    try:
+        value = uuid.UUID(str(record_id))
+    except ValueError:
+        return None
+    if value.version != 7:
+        return None
+    return datetime.fromtimestamp((value.int >> 80) / 1000)
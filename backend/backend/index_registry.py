@@ -0,0 +1,149 @@
+"""
+Registry of the global secondary indexes the query paths rely on.
+
+Indexes are verified or created once at deploy (manage.py ensure_indexes) and
+the set of ACTIVE ones is cached per worker, so a request chooses between a
+Query and a Scan without a DescribeTable call or a failed query.
+"""
+import time
+import logging
+import threading
+from botocore.exceptions import ClientError
+from .dynamodb_service import dynamodb_service
+
+logger = logging.getLogger(__name__)
+
+# table_key -> [(index name, hash attribute, range attribute or None)]
+INDEXES = {
+    'stock_transactions': [
+        ('OpTypeDateIndex', 'operation_type', 'date'),
+        ('MonthTimestampIndex', 'month', 'timestamp'),
+    ],
+    'PUSH_TO_PRODUCTION': [
+        ('MonthDateIndex', 'month', 'date'),
+    ],
+    'GRN_TABLE': [
+        ('transport-index', 'transport', 'date'),
+        ('supplier-index', 'supplierName', 'date'),
+    ],
+    'GROUPS': [
+        ('parent_id-index', 'parent_id', None),
+    ],
+    'CASTING_PRODUCTS': [
+        ('username-index', 'username', None),
+    ],
+    'FREIGHT_ALLOCATIONS': [
+        ('freight_id-index', 'freight_id', None),
+    ],
+}
+
+# While a registered index is missing or still building, look again after this long
+RECHECK_SECONDS = 300
+
+
+class IndexRegistry:
+    """Caches which registered indexes are ACTIVE and creates the missing ones"""
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self._active = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _describe(self, table_key):
+        table = dynamodb_service.get_table(table_key)
+        return table.meta.client.describe_table(TableName=table.name)['Table']
+
+    def index_statuses(self, table_key):
+        """{index name: IndexStatus} for every GSI currently on the table"""
+        description = self._describe(table_key)
+        return {gsi['IndexName']: gsi.get('IndexStatus') for gsi in description.get('GlobalSecondaryIndexes', [])}
+
+    def load(self):
+        """Refresh the ACTIVE index cache with one DescribeTable per registered table"""
+        active = {}
+        for table_key in self.indexes:
+            try:
+                statuses = self.index_statuses(table_key)
+            except Exception as e:
+                logger.warning(f"Could not describe {table_key}, its indexes will be scanned around: {e}")
+                statuses = {}
+            active[table_key] = {name for name, status in statuses.items() if status == 'ACTIVE'}
+        with self._lock:
+            self._active = active
+            self._checked_at = time.monotonic()
+        return active
+
+    def _all_active(self):
+        return all(
+            name in self._active.get(table_key, set())
+            for table_key, specs in self.indexes.items()
+            for name, _, _ in specs
+        )
+
+    def is_active(self, table_key, index_name):
+        """True when the index can be queried; loads the cache on first use"""
+        stale = (
+            self._checked_at is None
+            or (not self._all_active() and time.monotonic() - self._checked_at > RECHECK_SECONDS)
+        )
+        if stale:
+            self.load()
+        return index_name in self._active.get(table_key, set())
+
+    def ensure(self, create=True, table_keys=None):
+        """
+        Verify the registered indexes (of table_keys, default all), creating the missing ones when create is True.
+        Returns [(table_key, index name, status)] where status is the IndexStatus,
+        'MISSING', 'CREATING' (just requested) or 'ERROR: ...'.
+        """
+        report = []
+        for table_key, specs in self.indexes.items():
+            if table_keys is not None and table_key not in table_keys:
+                continue
+            try:
+                description = self._describe(table_key)
+            except ClientError as e:
+                report.extend((table_key, name, f"ERROR: {e}") for name, _, _ in specs)
+                continue
+            statuses = {gsi['IndexName']: gsi.get('IndexStatus') for gsi in description.get('GlobalSecondaryIndexes', [])}
+
+            for name, hash_key, range_key in specs:
+                if name in statuses:
+                    report.append((table_key, name, statuses[name]))
+                elif not create:
+                    report.append((table_key, name, 'MISSING'))
+                else:
+                    try:
+                        self._create(table_key, description, name, hash_key, range_key)
+                        report.append((table_key, name, 'CREATING'))
+                    except ClientError as e:
+                        # DynamoDB builds one new index per table at a time; rerun once it is ACTIVE
+                        report.append((table_key, name, f"ERROR: {e}"))
+        self.load()
+        return report
+
+    def _create(self, table_key, description, name, hash_key, range_key):
+        key_schema = [{'AttributeName': hash_key, 'KeyType': 'HASH'}]
+        if range_key:
+            key_schema.append({'AttributeName': range_key, 'KeyType': 'RANGE'})
+        index = {
+            'IndexName': name,
+            'KeySchema': key_schema,
+            'Projection': {'ProjectionType': 'ALL'}
+        }
+        if description.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+            index['ProvisionedThroughput'] = {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+
+        dynamodb_service.get_table(table_key).meta.client.update_table(
+            TableName=description['TableName'],
+            AttributeDefinitions=[
+                {'AttributeName': attr, 'AttributeType': 'S'} for attr in filter(None, (hash_key, range_key))
+            ],
+            GlobalSecondaryIndexUpdates=[{'Create': index}]
+        )
+        logger.info(f"Creation of {name} on {description['TableName']} started")
+
+
+# Global instance
+index_registry = IndexRegistry(INDEXES)
@@ -0,0 +1,102 @@
+"""
+Batched operations for the /api/lambda/ router.
+
+A JSON array body is a batch: every element is an ordinary router body
+({"operation": ..., ...}). The token is verified once for the whole batch,
+the operations run concurrently on the batch pool inside one request scope
+(so identical reads are made once, see backend.request_scope) and the reply
+is an array in request order:
+
+    [{"operation": "GetAllStocks", "status": 200, "body": {...}}, ...]
+
+Operations of a batch have no order between them; a client that needs a
+write to land before a read sends them in separate requests.
+"""
+import copy
+import json
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from users.decorators import authenticate
+from .request_scope import request_scope
+
+logger = logging.getLogger(__name__)
+
+# Streamed downloads cannot be embedded in a JSON reply
+UNBATCHABLE_OPERATIONS = {'ExportStockTransactions', 'ExportMonthlyGrid'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def batch_pool():
+    """The process-wide pool batched operations run on (LAMBDA_BATCH_WORKERS threads)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'LAMBDA_BATCH_WORKERS', 8),
+                    thread_name_prefix='batch'
+                )
+    return _pool
+
+
+def _run_operation(request, body, route):
+    """The response of one batched operation, run on its own copy of the request"""
+    if not isinstance(body, dict) or not body.get('operation'):
+        return JsonResponse({"error": "Missing 'operation' field"}, status=400)
+    operation = body['operation']
+    if operation in UNBATCHABLE_OPERATIONS:
+        return JsonResponse({"error": f"'{operation}' cannot be batched"}, status=400)
+
+    sub_request = copy.copy(request)
+    sub_request._body = json.dumps(body).encode('utf-8')
+    try:
+        response = route(sub_request, body)
+    except Exception as e:
+        logger.error(f"Error in batched {operation}: {e}", exc_info=True)
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
+    if response is None:
+        return JsonResponse({"error": "Invalid operation"}, status=400)
+    return response
+
+
+def _entry(body, response):
+    operation = body.get('operation') if isinstance(body, dict) else None
+    content = response.content
+    if 'json' not in response.get('Content-Type', ''):
+        content = json.dumps(content.decode('utf-8', 'replace')).encode('utf-8')
+    # The operation's JSON is spliced in as is rather than parsed and re-encoded
+    return b''.join([
+        b'{"operation": ', json.dumps(operation).encode('utf-8'),
+        b', "status": ', str(response.status_code).encode('utf-8'),
+        b', "body": ', content, b'}'
+    ])
+
+
+def run_batch(request, operations, route):
+    """Run a batch of router bodies through route(request, body) and combine their responses"""
+    limit = getattr(settings, 'LAMBDA_BATCH_MAX_OPERATIONS', 20)
+    if not operations:
+        return JsonResponse({"error": "A batch needs at least one operation"}, status=400)
+    if len(operations) > limit:
+        return JsonResponse({"error": f"A batch may carry at most {limit} operations"}, status=400)
+
+    _, error = authenticate(request)
+    if error is not None:
+        return error
+    request.jwt_verified = True
+
+    with request_scope():
+        futures = [
+            batch_pool().submit(contextvars.copy_context().run, _run_operation, request, body, route)
+            for body in operations
+        ]
+        responses = [future.result() for future in futures]
+
+    content = b'[' + b', '.join(_entry(body, response) for body, response in zip(operations, responses)) + b']'
+    return HttpResponse(content, content_type='application/json')
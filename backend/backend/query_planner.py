@@ -0,0 +1,116 @@
+"""
+Declarative reads planned onto the registered indexes.
+
+Callers state what they want instead of how to read it:
+
+    find_items('stock_transactions', {'operation_type': 'AddStockQuantity', 'date': between(start, end)})
+    find_items('GROUPS', {'parent_id': parent_id})
+
+A plain value is an equality predicate; between(), begins_with(), gt()/gte()/
+lt()/lte() are range predicates and missing() matches items without the
+attribute. The planner picks the ACTIVE index (see backend.index_registry)
+whose hash attribute has an equality predicate, preferring one whose range
+attribute is constrained too, and queries it with the other predicates as a
+filter. When no index fits it logs a warning and runs a parallel filtered
+scan, so a read starts using an index as soon as one is registered and built.
+"""
+import logging
+from functools import reduce
+from boto3.dynamodb.conditions import Attr, Key
+from .dynamodb_service import dynamodb_service
+from .index_registry import index_registry
+
+logger = logging.getLogger(__name__)
+
+
+class Predicate:
+    """A non-equality condition on one attribute; key=True when an index range key can serve it"""
+
+    def __init__(self, op, *values, key=True):
+        self.op = op
+        self.values = values
+        self.key = key
+
+    def condition(self, builder):
+        return getattr(builder, self.op)(*self.values)
+
+    def __repr__(self):
+        return f"{self.op}{self.values}"
+
+
+def between(low, high):
+    return Predicate('between', low, high)
+
+
+def begins_with(prefix):
+    return Predicate('begins_with', prefix)
+
+
+def gt(value):
+    return Predicate('gt', value)
+
+
+def gte(value):
+    return Predicate('gte', value)
+
+
+def lt(value):
+    return Predicate('lt', value)
+
+
+def lte(value):
+    return Predicate('lte', value)
+
+
+def missing():
+    return Predicate('not_exists', key=False)
+
+
+def _condition(builder, value):
+    return value.condition(builder) if isinstance(value, Predicate) else builder.eq(value)
+
+
+def _combine(conditions):
+    return reduce(lambda left, right: left & right, conditions) if conditions else None
+
+
+def plan(table_key, where):
+    """
+    (index name, key condition, filter condition) answering `where` on table_key;
+    the index name is None when no active index fits and the table must be scanned
+    """
+    best = None
+    for name, hash_key, range_key in index_registry.indexes.get(table_key, []):
+        if hash_key not in where or isinstance(where[hash_key], Predicate):
+            continue
+        ranged = range_key in where and getattr(where[range_key], 'key', True)
+        if (best is None or ranged > best[1]) and index_registry.is_active(table_key, name):
+            best = ((name, hash_key, range_key if ranged else None), ranged)
+
+    if best is None:
+        return None, None, _combine([_condition(Attr(attr), value) for attr, value in where.items()])
+
+    name, hash_key, range_key = best[0]
+    key_condition = Key(hash_key).eq(where[hash_key])
+    if range_key:
+        key_condition = key_condition & _condition(Key(range_key), where[range_key])
+    rest = [_condition(Attr(attr), value) for attr, value in where.items() if attr not in (hash_key, range_key)]
+    return name, key_condition, _combine(rest)
+
+
+def find_items(table_key, where, use_cache=True, plain=False, **kwargs):
+    """
+    Items of table_key matching every predicate in where ({attribute: value or
+    Predicate}); extra kwargs (ProjectionExpression, Limit...) go to the query or scan.
+    use_cache only applies to the scan fallback.
+    """
+    index_name, key_condition, filter_condition = plan(table_key, where)
+    if filter_condition is not None:
+        kwargs['FilterExpression'] = filter_condition
+
+    if index_name is None:
+        logger.warning(f"No active index on {table_key} serves {sorted(where)}; scanning")
+        return dynamodb_service.scan_table(table_key, use_cache=use_cache, parallel=True, plain=plain, **kwargs)
+    return dynamodb_service.query_table(
+        table_key, plain=plain, IndexName=index_name, KeyConditionExpression=key_condition, **kwargs
+    )
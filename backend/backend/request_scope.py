@@ -0,0 +1,82 @@
+"""
+Reads shared by the operations of one batched /api/lambda/ request.
+
+Inside request_scope(), DynamoDBService scans and queries are keyed by table
+and arguments and run once: an operation asking for a read another operation
+of the same batch already made (or is making right now) waits for and gets a
+copy of that result instead of going back to DynamoDB. A write to a table
+drops the table's shared reads, so later reads in the batch see it. Outside a
+scope every read goes straight to DynamoDB as before.
+
+The scope lives in a ContextVar: worker threads join it by running under
+contextvars.copy_context() of the thread that opened it.
+"""
+import copy
+import contextvars
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from django.conf import settings
+
+_scope = contextvars.ContextVar('request_reads', default=None)
+
+
+def _table_name(table_key):
+    # Several table keys can name one table (PUSH_TO_PRODUCTION/push_to_production)
+    return settings.DYNAMODB_TABLES.get(table_key, table_key)
+
+
+class RequestReads:
+    """Read results of one request, by (table name, read key)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = {}
+
+    def get_or_load(self, table_key, key, load):
+        slot = (_table_name(table_key), key)
+        with self._lock:
+            future = self._results.get(slot)
+            owner = future is None
+            if owner:
+                future = self._results[slot] = Future()
+        if owner:
+            try:
+                future.set_result(load())
+            except Exception as e:
+                with self._lock:
+                    self._results.pop(slot, None)
+                future.set_exception(e)
+        # Callers mutate what they read, so each one gets its own copy
+        return copy.deepcopy(future.result())
+
+    def forget(self, table_key):
+        name = _table_name(table_key)
+        with self._lock:
+            for slot in [slot for slot in self._results if slot[0] == name]:
+                del self._results[slot]
+
+
+@contextmanager
+def request_scope():
+    """Share reads between everything run in this context until the block exits"""
+    token = _scope.set(RequestReads())
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def shared_read(table_key, key, load):
+    """load() once per request scope for (table_key, key); a plain load() outside a scope"""
+    reads = _scope.get()
+    if reads is None:
+        return load()
+    return reads.get_or_load(table_key, key, load)
+
+
+def forget_reads(table_key):
+    """Drop the current scope's reads of table_key after a write to it"""
+    reads = _scope.get()
+    if reads is not None:
+        reads.forget(table_key)
@@ -1,5 +1,6 @@
 import logging
 from backend.dynamodb_service import dynamodb_service
+from backend.query_planner import find_items
 from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
@@ -9,13 +10,9 @@ class SecureDatabaseService:
     def get_user_products(username, table_name='CASTING_PRODUCTS'):
         """Get products for specific user instead of scanning all"""
         try:
-            # Use query instead of scan for better performance and security
-            response = dynamodb_service.dynamodb.Table(table_name).scan(
-                FilterExpression='username = :username',
-                ExpressionAttributeValues={':username': username},
-                Limit=100  # Limit results to prevent large data exposure
-            )
-            return response.get('Items', [])
+            # Queried through the username index; limit results to prevent large data exposure
+            # (Limit caps the query itself, the slice the pages of a scan fallback)
+            return find_items(table_name, {'username': username}, use_cache=False, Limit=100)[:100]
         except ClientError as e:
             logger.error(f"Error querying user products: {e}")
             return []
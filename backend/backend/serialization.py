@@ -0,0 +1,109 @@
+"""
+Shared JSON pipeline for DynamoDB data.
+
+- DecimalEncoder: the one encoder for Decimal/set values (Decimal -> float).
+- PlainNumberDeserializer: turns DynamoDB numbers into int/float (or exact
+  strings) while boto3 deserializes a response, for read-only paths that only
+  return the data (dynamodb_service reads with plain=True). Those payloads are
+  then encoded without any per-value Python callback.
+- ResponseEncoder: DecimalEncoder applying the configured number policy; the
+  list, report and production views encode with it, directly or through
+  FastJsonResponse.
+- FastJsonResponse: compact JSON response using ResponseEncoder.
+
+JSON_NUMBER_POLICY (setting) picks how numbers leave the API: 'float'
+(default, what the views always returned: int when integral, float
+otherwise) or 'string', where every stored number and every Decimal or
+float of a response becomes a fixed-point string with JSON_NUMBER_DECIMALS
+places (rounded half up), e.g. 12.5 -> "12.50" and 12 -> "12.00", so a field
+has one type whatever its value. Integers a view computes itself (counts,
+page sizes) stay integers. The policy covers the responses above; views that
+answer with a plain JsonResponse (mostly write confirmations) keep Django's
+encoding.
+"""
+import json
+from decimal import Decimal, ROUND_HALF_UP
+from boto3.dynamodb.types import TypeDeserializer
+from django.conf import settings
+from django.http import HttpResponse
+
+NUMBER_POLICIES = ('float', 'string')
+
+
+def number_policy():
+    policy = getattr(settings, 'JSON_NUMBER_POLICY', 'float')
+    return policy if policy in NUMBER_POLICIES else 'float'
+
+
+def fixed_point(value, decimals=None):
+    """value (Decimal or numeric string) as a string with exactly decimals (default JSON_NUMBER_DECIMALS) places"""
+    if decimals is None:
+        decimals = getattr(settings, 'JSON_NUMBER_DECIMALS', 2)
+    return str(Decimal(value).quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_HALF_UP))
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """JSON encoder for Decimal types - exact Lambda match (Decimal -> float)"""
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return float(o)
+        if isinstance(o, (set, frozenset)):
+            return list(o)
+        return super().default(o)
+
+
+def _fixed_point_floats(o):
+    if isinstance(o, float):
+        return fixed_point(str(o))
+    if isinstance(o, dict):
+        return {key: _fixed_point_floats(value) for key, value in o.items()}
+    if isinstance(o, (list, tuple)):
+        return [_fixed_point_floats(value) for value in o]
+    return o
+
+
+class ResponseEncoder(DecimalEncoder):
+    """DecimalEncoder applying JSON_NUMBER_POLICY to the Decimals and the floats a view computed"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._as_string = number_policy() == 'string'
+
+    def iterencode(self, o, _one_shot=False):
+        # Floats never reach default(), so under 'string' they are converted up front
+        if self._as_string:
+            o = _fixed_point_floats(o)
+        return super().iterencode(o, _one_shot)
+
+    def default(self, o):
+        if isinstance(o, Decimal) and self._as_string:
+            return fixed_point(o)
+        return super().default(o)
+
+
+class PlainNumberDeserializer(TypeDeserializer):
+    """TypeDeserializer giving int/float numbers, or fixed-point strings for every number under the 'string' policy"""
+
+    def __init__(self, policy=None):
+        self._as_string = (policy or number_policy()) == 'string'
+
+    def _deserialize_n(self, value):
+        if self._as_string:
+            return fixed_point(value)
+        if '.' not in value and 'e' not in value and 'E' not in value:
+            return int(value)
+        number = float(value)
+        return int(number) if number.is_integer() else number
+
+    def _deserialize_ns(self, value):
+        return set(map(self._deserialize_n, value))
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    JsonResponse counterpart for large payloads: compact separators, no
+    circular-reference bookkeeping and the shared encoder. Lists are allowed.
+    """
+    def __init__(self, data, encoder=ResponseEncoder, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        content = json.dumps(data, cls=encoder, separators=(',', ':'), check_circular=False)
+        super().__init__(content=content, **kwargs)
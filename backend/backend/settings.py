@@ -96,9 +96,39 @@ CACHES = {
         'OPTIONS': {
             'MAX_ENTRIES': 1000,
         }
+    },
+    # Computed report payloads: shared by all workers and kept across restarts
+    'reports': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('REPORT_CACHE_DIR', str(BASE_DIR / 'report_cache')),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        }
     }
 }
 
+# How numbers leave the API: 'float' (int/float) or 'string' (every number as a fixed-point
+# string with JSON_NUMBER_DECIMALS places)
+JSON_NUMBER_POLICY = os.environ.get('JSON_NUMBER_POLICY', 'float')
+JSON_NUMBER_DECIMALS = int(os.environ.get('JSON_NUMBER_DECIMALS', '2'))
+
+# Aggregate ranged reports from the in-memory columnar copy of the stock movements
+# (reports.columnar_store); used once MonthTimestampIndex is ACTIVE, each read first
+# catches up with what other processes logged
+COLUMNAR_STORE_ENABLED = os.environ.get('COLUMNAR_STORE_ENABLED', 'True') == 'True'
+
+# Threads shared by the views' concurrent reads (backend.fetch_planner)
+FETCH_POOL_WORKERS = int(os.environ.get('FETCH_POOL_WORKERS', '8'))
+
+# Batched /api/lambda/ requests (backend.lambda_batch): operations run at once, and the most one request may carry
+LAMBDA_BATCH_WORKERS = int(os.environ.get('LAMBDA_BATCH_WORKERS', '8'))
+LAMBDA_BATCH_MAX_OPERATIONS = int(os.environ.get('LAMBDA_BATCH_MAX_OPERATIONS', '20'))
+
+# Seconds after the last stock write before today's/this week's/this month's reports
+# are recomputed in the background; 0 disables (rely on the warm_reports command)
+REPORT_WARMUP_DELAY = int(os.environ.get('REPORT_WARMUP_DELAY', '10'))
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -155,7 +185,12 @@ DYNAMODB_TABLES = {
     'PUSH_TO_PRODUCTION': 'push_to_production',
     'GRN_TABLE': 'grn_table',
     'FREIGHT_INWARD': 'freight_inward',
-    'FREIGHT_ALLOCATIONS': 'freight_allocations'
+    'FREIGHT_ALLOCATIONS': 'freight_allocations',
+    'BOM_INDEX': 'bom_material_index',
+    'ITEM_DAILY_MOVEMENTS': 'item_daily_movements',
+    'ITEM_BALANCE_CHECKPOINTS': 'item_balance_checkpoints',
+    'ITEM_MOVEMENTS': 'item_movements',
+    'ITEM_PERIOD_ROLLUPS': 'item_period_rollups'
 }
 
 # JWT Configuration
@@ -0,0 +1,82 @@
+"""
+Time-ordered ids: ordering, key ranges and creation times.
+Run with: python manage.py test backend.test_ids
+"""
+import uuid
+from datetime import datetime
+from unittest import mock
+from django.test import SimpleTestCase
+from . import ids
+
+
+class NewIdTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(ids, _last_ms=0, _sequence=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def mint(self, clock_ms):
+        """Ids minted while time.time_ns() reads each of clock_ms in turn"""
+        with mock.patch.object(ids.time, 'time_ns', side_effect=[ms * 1_000_000 for ms in clock_ms]):
+            return [ids.new_id() for _ in clock_ms]
+
+    def test_ids_are_version_7_uuids(self):
+        value = uuid.UUID(self.mint([1_700_000_000_000])[0])
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+
+    def test_strictly_increasing_within_a_millisecond(self):
+        minted = self.mint([1_700_000_000_000] * 50)
+        self.assertEqual(minted, sorted(set(minted)))
+
+    def test_counter_overflow_moves_to_the_next_millisecond(self):
+        ms = 1_700_000_000_000
+        minted = self.mint([ms] * (ids.MAX_SEQUENCE + 2))
+        self.assertEqual(minted, sorted(set(minted)))
+        self.assertEqual(uuid.UUID(minted[-1]).int >> 80, ms + 1)
+
+    def test_clock_stepping_back_keeps_ids_increasing(self):
+        ms = 1_700_000_000_000
+        minted = self.mint([ms, ms - 5_000, ms - 1, ms])
+        self.assertEqual(minted, sorted(set(minted)))
+        self.assertEqual({uuid.UUID(record_id).int >> 80 for record_id in minted}, {ms})
+
+
+class IdRangeTests(SimpleTestCase):
+
+    def test_range_bounds(self):
+        low, high = ids.id_range('2025-04-01', '2025-04-30')
+        self.assertEqual(ids.id_time(low), datetime(2025, 4, 1))
+        self.assertEqual(ids.id_time(high), datetime(2025, 4, 30, 23, 59, 59, 999000))
+        self.assertEqual(low, ids.lowest_id('2025-04-01'))
+        self.assertTrue(low.endswith('-7000-8000-000000000000'))
+        self.assertTrue(high.endswith('-7fff-bfff-ffffffffffff'))
+
+    def test_range_holds_ids_minted_inside_it(self):
+        low, high = ids.id_range('2025-04-01', '2025-04-30')
+        for moment in (datetime(2025, 4, 1), datetime(2025, 4, 15, 12), datetime(2025, 4, 30, 23, 59, 59, 999000)):
+            with mock.patch.multiple(ids, _last_ms=0, _sequence=0), \
+                    mock.patch.object(ids.time, 'time_ns', return_value=int(moment.timestamp() * 1000) * 1_000_000):
+                record_id = ids.new_id()
+            self.assertTrue(low <= record_id <= high, moment)
+        self.assertGreater(ids.lowest_id('2025-05-01'), high)
+        self.assertLess(ids.highest_id('2025-03-31T23:59:59.999'), low)
+
+    def test_datetime_end_is_taken_as_is(self):
+        _, high = ids.id_range('2025-04-01', datetime(2025, 4, 30, 8))
+        self.assertEqual(ids.id_time(high), datetime(2025, 4, 30, 8))
+
+
+class IdTimeTests(SimpleTestCase):
+
+    def test_creation_time_of_a_new_id(self):
+        moment = datetime(2025, 6, 1, 9, 30, 15, 250000)
+        with mock.patch.multiple(ids, _last_ms=0, _sequence=0), \
+                mock.patch.object(ids.time, 'time_ns', return_value=int(moment.timestamp() * 1000) * 1_000_000):
+            self.assertEqual(ids.id_time(ids.new_id()), moment)
+
+    def test_other_ids_have_no_time(self):
+        self.assertIsNone(ids.id_time(str(uuid.uuid4())))
+        self.assertIsNone(ids.id_time('not-an-id'))
+        self.assertIsNone(ids.id_time(None))
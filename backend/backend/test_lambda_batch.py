@@ -0,0 +1,108 @@
+"""
+Batched /api/lambda/ requests and the reads they share.
+Run with: python manage.py test backend.test_lambda_batch
+"""
+import json
+from unittest import mock
+from django.test import SimpleTestCase
+from users.jwt_utils import generate_jwt_token
+from .dynamodb_service import dynamodb_service
+from .request_scope import request_scope
+
+REMARKS = [{'stock': 'bolt', 'description': 'M8 bolt', 'username': 'tester'}]
+
+
+class LambdaBatchTests(SimpleTestCase):
+
+    def setUp(self):
+        self.scans = mock.patch.object(dynamodb_service, '_scan_table', return_value=REMARKS).start()
+        self.table = mock.MagicMock()
+        mock.patch.object(dynamodb_service, 'get_table', return_value=self.table).start()
+        self.addCleanup(mock.patch.stopall)
+        self.token = generate_jwt_token('tester', 'admin')
+
+    def post(self, body, token=True):
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {self.token}"} if token else {}
+        return self.client.post('/api/lambda/', json.dumps(body), content_type='application/json', **headers)
+
+    def test_results_in_request_order(self):
+        response = self.post([
+            {'operation': 'GetAllDescriptions'},
+            {'operation': 'GetDescription'},
+            {'operation': 'CreateDescription', 'stock': 'nut', 'description': 'M8 nut', 'username': 'tester'},
+            {'operation': 'NoSuchOperation'},
+            {'stock': 'bolt'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(entry['operation'], entry['status']) for entry in response.json()],
+            [('GetAllDescriptions', 200), ('GetDescription', 400), ('CreateDescription', 200),
+             ('NoSuchOperation', 400), (None, 400)]
+        )
+        self.assertEqual(response.json()[0]['body'], REMARKS)
+        self.table.put_item.assert_called_once()
+
+    def test_duplicate_reads_run_once(self):
+        response = self.post([{'operation': 'GetAllDescriptions'}] * 5)
+        self.assertEqual([entry['body'] for entry in response.json()], [REMARKS] * 5)
+        self.assertEqual(self.scans.call_count, 1)
+
+    def test_reads_are_not_shared_between_requests(self):
+        self.post([{'operation': 'GetAllDescriptions'}])
+        self.post([{'operation': 'GetAllDescriptions'}])
+        self.assertEqual(self.scans.call_count, 2)
+
+    def test_unbatchable_operation(self):
+        response = self.post([{'operation': 'ExportStockTransactions'}, {'operation': 'GetAllDescriptions'}])
+        self.assertEqual([entry['status'] for entry in response.json()], [400, 200])
+        self.assertIn('cannot be batched', response.json()[0]['body']['error'])
+
+    def test_batch_without_token(self):
+        response = self.post([{'operation': 'GetAllDescriptions'}], token=False)
+        self.assertEqual(response.status_code, 401)
+        self.scans.assert_not_called()
+
+    def test_batch_limits(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        with self.settings(LAMBDA_BATCH_MAX_OPERATIONS=2):
+            self.assertEqual(self.post([{'operation': 'GetAllDescriptions'}] * 3).status_code, 400)
+        self.scans.assert_not_called()
+
+
+class RequestScopeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.scans = mock.patch.object(dynamodb_service, '_scan_table', side_effect=lambda *args, **kwargs: [{'n': 1}]).start()
+        mock.patch.object(dynamodb_service, 'get_table', return_value=mock.MagicMock()).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_reads_shared_inside_a_scope_only(self):
+        with request_scope():
+            dynamodb_service.scan_table('stock_remarks')
+            dynamodb_service.scan_table('stock_remarks')
+            dynamodb_service.scan_table('stock_remarks', ProjectionExpression='stock')
+        self.assertEqual(self.scans.call_count, 2)
+        dynamodb_service.scan_table('stock_remarks')
+        self.assertEqual(self.scans.call_count, 3)
+
+    def test_each_reader_gets_its_own_copy(self):
+        with request_scope():
+            first = dynamodb_service.scan_table('stock_remarks')
+            first[0]['n'] = 2
+            self.assertEqual(dynamodb_service.scan_table('stock_remarks'), [{'n': 1}])
+
+    def test_write_drops_the_tables_shared_reads(self):
+        with request_scope():
+            dynamodb_service.scan_table('stock_remarks')
+            dynamodb_service.scan_table('STOCK')
+            dynamodb_service.put_item('stock_remarks', {'stock': 'nut'})
+            dynamodb_service.scan_table('stock_remarks')
+            dynamodb_service.scan_table('STOCK')
+        self.assertEqual([call.args[0] for call in self.scans.call_args_list], ['stock_remarks', 'STOCK', 'stock_remarks'])
+
+    def test_failed_read_is_not_shared(self):
+        self.scans.side_effect = [RuntimeError('throttled'), [{'n': 1}]]
+        with request_scope():
+            with self.assertRaises(RuntimeError):
+                dynamodb_service.scan_table('stock_remarks')
+            self.assertEqual(dynamodb_service.scan_table('stock_remarks'), [{'n': 1}])
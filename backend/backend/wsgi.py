@@ -5,4 +5,12 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings_debug')
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Cache which registered GSIs are ACTIVE once per worker instead of per request
+try:
+    from backend.index_registry import index_registry
+    index_registry.load()
+except Exception as e:
+    import logging
+    logging.getLogger(__name__).warning(f"Index registry not loaded at boot: {e}")
@@ -16,7 +16,6 @@ def batch_get_stock_items(item_ids):
 def precompute_daily_aggregates():
     """Pre-compute daily aggregates for instant reports"""
     from datetime import datetime, timedelta
-    from backend.dynamodb_service import dynamodb_service
     from collections import defaultdict
     
     today = datetime.now().strftime('%Y-%m-%d')
@@ -30,24 +29,14 @@ def precompute_daily_aggregates():
         'items_affected': 0
     }
     
+    from backend.query_planner import find_items
+    
+    def fetch(op):
+        return find_items('stock_transactions', {'operation_type': op, 'date': today})
+    
     with ThreadPoolExecutor(max_workers=2) as executor:
-        inward_future = executor.submit(
-            dynamodb_service.query_table,
-            'stock_transactions',
-            IndexName='OpTypeDateIndex',
-            KeyConditionExpression='operation_type = :op AND #date = :date',
-            ExpressionAttributeNames={'#date': 'date'},
-            ExpressionAttributeValues={':op': 'AddStockQuantity', ':date': today}
-        )
-        
-        consumption_future = executor.submit(
-            dynamodb_service.query_table,
-            'stock_transactions',
-            IndexName='OpTypeDateIndex', 
-            KeyConditionExpression='operation_type = :op AND #date = :date',
-            ExpressionAttributeNames={'#date': 'date'},
-            ExpressionAttributeValues={':op': 'PushToProduction', ':date': today}
-        )
+        inward_future = executor.submit(fetch, 'AddStockQuantity')
+        consumption_future = executor.submit(fetch, 'PushToProduction')
         
         inward_txns = inward_future.result()
         consumption_txns = consumption_future.result()
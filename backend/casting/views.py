@@ -12,6 +12,7 @@ from backend.error_handlers import SecureErrorHandler
 from backend.secure_db_service import SecureDatabaseService
 from backend.security_monitor import SecurityMonitor
 from users.decorators import jwt_required, admin_required
+from production.cost_rollup import CostRollupService
 from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
@@ -194,6 +195,7 @@ def move_to_production(request):
         
         # Add to production table
         dynamodb_service.put_item('PRODUCTION', production_product)
+        CostRollupService.sync_product(production_product['product_id'], None, stock_needed)
         
         # Remove from casting table
         dynamodb_service.delete_item('CASTING_PRODUCTS', {'product_id': product_id})
@@ -79,6 +79,61 @@ def main():
             'name': 'grn_table',
             'key_schema': [{'AttributeName': 'grn_id', 'KeyType': 'HASH'}],
             'attributes': [{'AttributeName': 'grn_id', 'AttributeType': 'S'}]
+        },
+        {
+            'name': 'bom_material_index',
+            'key_schema': [
+                {'AttributeName': 'item_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'product_id', 'KeyType': 'RANGE'}
+            ],
+            'attributes': [
+                {'AttributeName': 'item_id', 'AttributeType': 'S'},
+                {'AttributeName': 'product_id', 'AttributeType': 'S'}
+            ]
+        },
+        {
+            'name': 'item_daily_movements',
+            'key_schema': [
+                {'AttributeName': 'month', 'KeyType': 'HASH'},
+                {'AttributeName': 'day_item', 'KeyType': 'RANGE'}
+            ],
+            'attributes': [
+                {'AttributeName': 'month', 'AttributeType': 'S'},
+                {'AttributeName': 'day_item', 'AttributeType': 'S'}
+            ]
+        },
+        {
+            'name': 'item_balance_checkpoints',
+            'key_schema': [
+                {'AttributeName': 'month', 'KeyType': 'HASH'},
+                {'AttributeName': 'item_id', 'KeyType': 'RANGE'}
+            ],
+            'attributes': [
+                {'AttributeName': 'month', 'AttributeType': 'S'},
+                {'AttributeName': 'item_id', 'AttributeType': 'S'}
+            ]
+        },
+        {
+            'name': 'item_movements',
+            'key_schema': [
+                {'AttributeName': 'item_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'ts_txn', 'KeyType': 'RANGE'}
+            ],
+            'attributes': [
+                {'AttributeName': 'item_id', 'AttributeType': 'S'},
+                {'AttributeName': 'ts_txn', 'AttributeType': 'S'}
+            ]
+        },
+        {
+            'name': 'item_period_rollups',
+            'key_schema': [
+                {'AttributeName': 'period', 'KeyType': 'HASH'},
+                {'AttributeName': 'item_id', 'KeyType': 'RANGE'}
+            ],
+            'attributes': [
+                {'AttributeName': 'period', 'AttributeType': 'S'},
+                {'AttributeName': 'item_id', 'AttributeType': 'S'}
+            ]
         }
     ]
     
@@ -5,7 +5,8 @@ import boto3
 from decimal import Decimal
 from datetime import datetime
 from django.conf import settings
-import uuid
+from backend.ids import new_id
+from backend.query_planner import find_items
 
 
 class FreightInwardService:
@@ -29,7 +30,7 @@ class FreightInwardService:
         if allocation_sum != Decimal(str(total_amount)):
             raise ValueError(f"Total amount ({total_amount}) does not match sum of allocations ({allocation_sum})")
         
-        freight_id = str(uuid.uuid4())
+        freight_id = new_id()
         timestamp = datetime.now().isoformat()
         
         # Create freight header
@@ -50,7 +51,7 @@ class FreightInwardService:
             # Save allocations
             for allocation in allocations:
                 allocation_item = {
-                    'allocation_id': str(uuid.uuid4()),
+                    'allocation_id': new_id(),
                     'freight_id': freight_id,
                     'supplier_name': allocation['supplier_name'],
                     'amount': Decimal(str(allocation['amount'])),
@@ -79,12 +80,7 @@ class FreightInwardService:
             freight = response['Item']
             
             # Get allocations
-            allocations_response = self.allocation_table.scan(
-                FilterExpression='freight_id = :freight_id',
-                ExpressionAttributeValues={':freight_id': freight_id}
-            )
-            
-            freight['allocations'] = allocations_response.get('Items', [])
+            freight['allocations'] = find_items('FREIGHT_ALLOCATIONS', {'freight_id': freight_id}, use_cache=False)
             return freight
             
         except Exception as e:
@@ -98,11 +94,7 @@ class FreightInwardService:
             
             # Get allocations for each freight note
             for freight in freight_notes:
-                allocations_response = self.allocation_table.scan(
-                    FilterExpression='freight_id = :freight_id',
-                    ExpressionAttributeValues={':freight_id': freight['freight_id']}
-                )
-                freight['allocations'] = allocations_response.get('Items', [])
+                freight['allocations'] = find_items('FREIGHT_ALLOCATIONS', {'freight_id': freight['freight_id']}, use_cache=False)
             
             # Sort by date descending
             freight_notes.sort(key=lambda x: x.get('date', ''), reverse=True)
@@ -147,7 +139,7 @@ class FreightInwardService:
                 timestamp = datetime.now().isoformat()
                 for allocation in allocations:
                     allocation_item = {
-                        'allocation_id': str(uuid.uuid4()),
+                        'allocation_id': new_id(),
                         'freight_id': freight_id,
                         'supplier_name': allocation['supplier_name'],
                         'amount': Decimal(str(allocation['amount'])),
@@ -1,5 +1,4 @@
 import json
-import uuid
 import logging
 from decimal import Decimal
 from datetime import datetime
@@ -7,16 +6,13 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from backend.dynamodb_service import dynamodb_service
+from backend.ids import new_id
+from backend.serialization import FastJsonResponse
+from backend.query_planner import find_items
 from users.decorators import jwt_required, admin_required
 
 logger = logging.getLogger(__name__)
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        return super(DecimalEncoder, self).default(o)
-
 @csrf_exempt
 @require_http_methods(["POST"])
 @jwt_required
@@ -38,7 +34,7 @@ def create_grn(request):
                 return JsonResponse({"error": f"'{field}' is required"}, status=400)
         
         # Generate UUID for grnId
-        grn_id = str(uuid.uuid4())
+        grn_id = new_id()
         
         # Create GRN record
         grn_item = {
@@ -148,32 +144,16 @@ def delete_grn(request, grn_id):
 def get_grn_by_transport(request, transport_type):
     """Get all GRN records filtered by transport type"""
     try:
-        # Query using GSI for efficient transport-based filtering
-        grn_records = dynamodb_service.query_table(
-            'GRN_TABLE',
-            IndexName='transport-index',
-            KeyConditionExpression='transport = :transport_type',
-            ExpressionAttributeValues={
-                ':transport_type': transport_type
-            }
-        )
+        grn_records = find_items('GRN_TABLE', {'transport': transport_type}, plain=True)
         
         if not grn_records:
             return JsonResponse({"message": "No data found", "data": []})
         
-        # Convert Decimal values to float for JSON response
-        response_data = []
-        for record in grn_records:
-            converted_record = {}
-            for key, value in record.items():
-                if isinstance(value, Decimal):
-                    converted_record[key] = float(value)
-                else:
-                    converted_record[key] = value
-            response_data.append(converted_record)
+        # Numbers already arrive as int/float (plain read)
+        response_data = grn_records
         
         logger.info(f"Found {len(response_data)} GRN records for transport: {transport_type}")
-        return JsonResponse({
+        return FastJsonResponse({
             "message": f"Found {len(response_data)} GRN records",
             "transport_type": transport_type,
             "data": response_data
@@ -189,31 +169,16 @@ def get_grn_by_transport(request, transport_type):
 def get_grn_by_supplier_name(request, supplier_name):
     """Get all GRN records filtered by supplier name"""
     try:
-        # Scan table and filter by supplier name
-        grn_records = dynamodb_service.scan_table(
-            'GRN_TABLE',
-            FilterExpression='supplierName = :supplier_name',
-            ExpressionAttributeValues={
-                ':supplier_name': supplier_name
-            }
-        )
+        grn_records = find_items('GRN_TABLE', {'supplierName': supplier_name}, plain=True)
         
         if not grn_records:
             return JsonResponse({"message": "No data found", "data": []})
         
-        # Convert Decimal values to float for JSON response
-        response_data = []
-        for record in grn_records:
-            converted_record = {}
-            for key, value in record.items():
-                if isinstance(value, Decimal):
-                    converted_record[key] = float(value)
-                else:
-                    converted_record[key] = value
-            response_data.append(converted_record)
+        # Numbers already arrive as int/float (plain read)
+        response_data = grn_records
         
         logger.info(f"Found {len(response_data)} GRN records for supplier: {supplier_name}")
-        return JsonResponse({
+        return FastJsonResponse({
             "message": f"Found {len(response_data)} GRN records",
             "supplier_name": supplier_name,
             "data": response_data
@@ -230,27 +195,19 @@ def list_all_grn(request):
     """Get all GRN records from the table"""
     try:
         # Scan entire GRN table
-        grn_records = dynamodb_service.scan_table('GRN_TABLE')
+        grn_records = dynamodb_service.scan_table('GRN_TABLE', plain=True)
         
         if not grn_records:
             return JsonResponse({"message": "No GRN records found", "data": [], "total_count": 0})
         
-        # Convert Decimal values to float for JSON response
-        response_data = []
-        for record in grn_records:
-            converted_record = {}
-            for key, value in record.items():
-                if isinstance(value, Decimal):
-                    converted_record[key] = float(value)
-                else:
-                    converted_record[key] = value
-            response_data.append(converted_record)
+        # Numbers already arrive as int/float (plain read)
+        response_data = grn_records
         
         # Sort by created_at (newest first)
         response_data.sort(key=lambda x: x.get('created_at', ''), reverse=True)
         
         logger.info(f"Retrieved {len(response_data)} GRN records")
-        return JsonResponse({
+        return FastJsonResponse({
             "message": f"Found {len(response_data)} GRN records",
             "total_count": len(response_data),
             "data": response_data
@@ -0,0 +1,151 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Guards floor() against float noise such as 0.3 / 0.1 == 2.9999999999999996
+_EPSILON = 1e-9
+
+
+class CapacityModel:
+    """
+    Bills of materials compiled into a sparse product x material matrix (CSR layout)
+    so capacity questions are answered with vectorized NumPy operations.
+    """
+
+    def __init__(self, product_ids, product_names, material_ids, indptr, indices, data, available):
+        self.product_ids = product_ids
+        self.product_names = product_names
+        self.material_ids = material_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.available = available
+        self.product_index = {product_id: i for i, product_id in enumerate(product_ids)}
+
+    @classmethod
+    def build(cls, products, stock_items):
+        """Compile product BOMs and current stock levels into a CapacityModel"""
+        stock_qty = {item['item_id']: float(item.get('quantity', 0) or 0) for item in stock_items}
+
+        product_ids = []
+        product_names = []
+        material_index = {}
+        indptr = [0]
+        indices = []
+        data = []
+
+        for product in products:
+            product_ids.append(product['product_id'])
+            product_names.append(product.get('product_name', product['product_id']))
+            for item_id, qty in (product.get('stock_needed') or {}).items():
+                try:
+                    qty_each = float(qty)
+                except (TypeError, ValueError):
+                    continue
+                if qty_each <= 0:
+                    continue
+                # Materials missing from stock are kept with zero availability
+                col = material_index.setdefault(item_id, len(material_index))
+                indices.append(col)
+                data.append(qty_each)
+            indptr.append(len(indices))
+
+        material_ids = list(material_index)
+        available = np.array([stock_qty.get(m, 0.0) for m in material_ids], dtype=np.float64)
+        available = np.maximum(available, 0.0)
+
+        return cls(
+            product_ids,
+            product_names,
+            material_ids,
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int64),
+            np.array(data, dtype=np.float64),
+            available,
+        )
+
+    def _row_minimum(self, values):
+        """Per-product minimum of a value defined on each non-zero; empty rows give 0"""
+        result = np.zeros(len(self.product_ids), dtype=np.float64)
+        if not len(values):
+            return result
+        starts = self.indptr[:-1]
+        non_empty = self.indptr[1:] > starts
+        result[non_empty] = np.minimum.reduceat(values, starts[non_empty])
+        return result
+
+    def max_produce(self, available=None):
+        """Units of every product buildable on its own from the given (or current) stock"""
+        available = self.available if available is None else available
+        possible = np.floor(available[self.indices] / self.data + _EPSILON)
+        return self._row_minimum(possible).astype(np.int64)
+
+    def limiting_materials(self, available=None):
+        """The material that caps each product's max_produce (None for products without a BOM)"""
+        available = self.available if available is None else available
+        ratios = available[self.indices] / self.data if len(self.data) else self.data
+        limits = []
+        for row in range(len(self.product_ids)):
+            start, end = self.indptr[row], self.indptr[row + 1]
+            if start == end:
+                limits.append(None)
+                continue
+            limits.append(self.material_ids[self.indices[start + int(np.argmin(ratios[start:end]))]])
+        return limits
+
+    def _row_slice(self, row):
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def allocate_greedy(self, lines, available=None):
+        """
+        Allocate competing products in priority order. Each line is (row, cap) where
+        cap is the requested quantity or None for "as many as possible".
+        Returns (units per line, remaining stock).
+        """
+        remaining = (self.available if available is None else available).copy()
+        allocated = np.zeros(len(lines), dtype=np.int64)
+
+        for i, (row, cap) in enumerate(lines):
+            cols, qty = self._row_slice(row)
+            if not len(cols):
+                continue
+            units = np.floor(np.min(remaining[cols] / qty) + _EPSILON)
+            if cap is not None:
+                units = min(units, cap)
+            units = max(int(units), 0)
+            if units:
+                remaining[cols] = np.maximum(remaining[cols] - units * qty, 0.0)
+            allocated[i] = units
+
+        return allocated, remaining
+
+    def allocate_ratio(self, rows, ratios):
+        """
+        Solve max k subject to k * sum(ratio_p * BOM_p) <= stock, i.e. the largest
+        number of "mix batches" in the requested proportions, and round each line
+        down to whole units. Returns (units per line, remaining stock).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        ratios = np.asarray(ratios, dtype=np.float64)
+        if not len(rows):
+            return np.zeros(0, dtype=np.int64), self.available.copy()
+
+        counts = self.indptr[rows + 1] - self.indptr[rows]
+        positions = np.concatenate([np.arange(self.indptr[r], self.indptr[r + 1]) for r in rows])
+        cols = self.indices[positions]
+        qty = self.data[positions]
+
+        demand = np.bincount(cols, weights=qty * np.repeat(ratios, counts), minlength=len(self.material_ids))
+        constrained = demand > 0
+        if not constrained.any():
+            return np.zeros(len(rows), dtype=np.int64), self.available.copy()
+
+        batches = np.min(self.available[constrained] / demand[constrained])
+        units = np.floor(batches * ratios + _EPSILON).astype(np.int64)
+        units[counts == 0] = 0
+
+        used = np.bincount(cols, weights=qty * np.repeat(units.astype(np.float64), counts), minlength=len(self.material_ids))
+        remaining = np.maximum(self.available - used, 0.0)
+        return units, remaining
@@ -0,0 +1,137 @@
+import logging
+from decimal import Decimal
+from datetime import datetime
+from boto3.dynamodb.conditions import Key
+from backend.dynamodb_service import dynamodb_service
+from .product_service import ProductService
+
+logger = logging.getLogger(__name__)
+
+
+class CostRollupService:
+    """
+    Keeps product costings in step with material prices.
+
+    BOM_INDEX holds one (item_id, product_id) row per BOM line, so a price change
+    on a material only touches the products that consume it.
+    """
+
+    @staticmethod
+    def index_rows(product_id, stock_needed):
+        return [{'item_id': item_id, 'product_id': product_id} for item_id in (stock_needed or {})]
+
+    @classmethod
+    def sync_product(cls, product_id, old_stock_needed=None, new_stock_needed=None):
+        """
+        Update the material -> product index after a product's BOM changed.
+        Failures are logged, not raised: reprice_all() rebuilds the index.
+        """
+        try:
+            old_ids = set(old_stock_needed or {})
+            new_ids = set(new_stock_needed or {})
+            removed = cls.index_rows(product_id, old_ids - new_ids)
+            added = cls.index_rows(product_id, new_ids - old_ids)
+            if added or removed:
+                dynamodb_service.batch_write_items('BOM_INDEX', added, delete_keys=removed)
+        except Exception as e:
+            logger.error(f"Error syncing BOM index for {product_id}: {e}")
+
+    @staticmethod
+    def products_using(item_id):
+        """Product ids whose BOM references the given material"""
+        rows = dynamodb_service.query_table(
+            'BOM_INDEX',
+            KeyConditionExpression=Key('item_id').eq(item_id),
+            ProjectionExpression='product_id'
+        )
+        return [row['product_id'] for row in rows]
+
+    @staticmethod
+    def compute_costs(product, stock_map):
+        """Cost breakdown, wastage and totals for a product, same formula as update_product"""
+        stock_needed = product.get('stock_needed', {})
+        base_cost, _, cost_breakdown = ProductService.compute_bom_costing(stock_needed, stock_map)
+
+        wastage_percent = Decimal(str(product.get('wastage_percent', 0)))
+        transport_cost = Decimal(str(product.get('transport_cost', 0)))
+        labour_cost = Decimal(str(product.get('labour_cost', 0)))
+        other_cost = Decimal(str(product.get('other_cost', 0)))
+
+        wastage_amount = (base_cost * wastage_percent) / Decimal('100')
+        total_cost = base_cost + wastage_amount + transport_cost + labour_cost + other_cost
+        return {
+            'production_cost_breakdown': cost_breakdown,
+            'production_cost_total': base_cost,
+            'wastage_amount': wastage_amount,
+            'total_cost': total_cost
+        }
+
+    @classmethod
+    def reprice(cls, products, stock_map):
+        """Recompute and batch-write costings; returns the products whose totals changed"""
+        now_iso = datetime.now().isoformat()
+        changed = []
+        for product in products:
+            costs = cls.compute_costs(product, stock_map)
+            old_breakdown = {k: Decimal(str(v)) for k, v in (product.get('production_cost_breakdown') or {}).items()}
+            if old_breakdown == costs['production_cost_breakdown'] and all(
+                    Decimal(str(product.get(k, 0))) == costs[k]
+                    for k in ('production_cost_total', 'wastage_amount', 'total_cost')):
+                continue
+            product.update(costs)
+            product['updated_at'] = now_iso
+            changed.append(product)
+
+        if changed:
+            dynamodb_service.batch_write_items('PRODUCTION', changed)
+        return changed
+
+    @classmethod
+    def on_material_cost_change(cls, item_id):
+        """Reprice only the products that use item_id; returns the number updated"""
+        product_ids = cls.products_using(item_id)
+        if not product_ids:
+            return 0
+
+        products = list(ProductService.get_products(product_ids).values())
+        material_ids = {mat_id for product in products for mat_id in product.get('stock_needed', {})}
+        stock_map = ProductService.get_stock_items(list(material_ids))
+
+        changed = cls.reprice(products, stock_map)
+        logger.info(f"Cost rollup for '{item_id}': {len(changed)} of {len(products)} product(s) repriced")
+        return len(changed)
+
+    @classmethod
+    def after_stock_cost_change(cls, item_id):
+        """Write-path hook for stock cost/GST edits; never fails the originating request"""
+        try:
+            return cls.on_material_cost_change(item_id)
+        except Exception as e:
+            logger.error(f"Error in cost rollup for '{item_id}': {e}")
+            return 0
+
+    @classmethod
+    def reprice_all(cls):
+        """
+        Reprice the whole catalogue from one read of PRODUCTION and STOCK and rebuild
+        the material -> product index. Returns (products repriced, index rows written).
+        """
+        products = dynamodb_service.scan_table('PRODUCTION', use_cache=False)
+        stock_items = dynamodb_service.scan_table('STOCK', use_cache=False)
+        stock_map = {item['item_id']: item for item in stock_items}
+
+        changed = cls.reprice(products, stock_map)
+
+        wanted = {(row['item_id'], row['product_id'])
+                  for product in products
+                  for row in cls.index_rows(product['product_id'], product.get('stock_needed'))}
+        existing = {(row['item_id'], row['product_id'])
+                    for row in dynamodb_service.scan_table('BOM_INDEX', use_cache=False)}
+        dynamodb_service.batch_write_items(
+            'BOM_INDEX',
+            [{'item_id': item_id, 'product_id': product_id} for item_id, product_id in wanted - existing],
+            delete_keys=[{'item_id': item_id, 'product_id': product_id} for item_id, product_id in existing - wanted]
+        )
+
+        logger.info(f"Repriced {len(changed)} of {len(products)} product(s); BOM index has {len(wanted)} row(s)")
+        return len(changed), len(wanted)
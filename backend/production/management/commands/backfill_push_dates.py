@@ -0,0 +1,64 @@
+from boto3.dynamodb.conditions import Attr
+from django.core.management.base import BaseCommand
+from backend.dynamodb_service import dynamodb_service
+from backend.index_registry import index_registry
+from production.product_service import ProductService
+
+
+class Command(BaseCommand):
+    help = 'Create the MonthDateIndex GSI on push_to_production and backfill date/month on existing records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skip-index',
+            action='store_true',
+            help='Only backfill attributes, do not create the GSI'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be updated without writing'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if not options['skip_index']:
+            self.ensure_index(dry_run)
+
+        records = dynamodb_service.scan_table(
+            'PUSH_TO_PRODUCTION',
+            FilterExpression=Attr('date').not_exists() | Attr('month').not_exists()
+        )
+        self.stdout.write(f'Found {len(records)} push record(s) without date attributes')
+
+        updated = 0
+        for record in records:
+            timestamp = record.get('timestamp')
+            if not timestamp:
+                self.stdout.write(self.style.WARNING(f"Skipping {record.get('push_id')}: no timestamp"))
+                continue
+            if dry_run:
+                updated += 1
+                continue
+            fields = ProductService.push_date_fields(timestamp)
+            dynamodb_service.update_item(
+                'PUSH_TO_PRODUCTION',
+                {'push_id': record['push_id']},
+                'SET #date = :date, #month = :month',
+                {':date': fields['date'], ':month': fields['month']},
+                ExpressionAttributeNames={'#date': 'date', '#month': 'month'}
+            )
+            updated += 1
+
+        verb = 'Would update' if dry_run else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {updated} push record(s)'))
+
+    def ensure_index(self, dry_run):
+        for _, name, status in index_registry.ensure(create=not dry_run, table_keys=['PUSH_TO_PRODUCTION']):
+            if status == 'MISSING':
+                self.stdout.write(f'Would create {name}')
+            elif status == 'CREATING':
+                self.stdout.write(self.style.SUCCESS(f'Creation of {name} started; it becomes queryable once ACTIVE'))
+            else:
+                self.stdout.write(f'{name}: {status}')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from production.cost_rollup import CostRollupService
+
+
+class Command(BaseCommand):
+    help = 'Recompute every product costing from current stock prices and rebuild the material -> product index'
+
+    def handle(self, *args, **options):
+        repriced, index_rows = CostRollupService.reprice_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Repriced {repriced} product(s); BOM index holds {index_rows} row(s)'
+        ))
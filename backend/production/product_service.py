@@ -0,0 +1,148 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from boto3.dynamodb.conditions import Attr, Key
+from backend.dynamodb_service import dynamodb_service
+from backend.index_registry import index_registry
+
+logger = logging.getLogger(__name__)
+
+# GSI on push_to_production: partition by month ("YYYY-MM"), sorted by day ("YYYY-MM-DD")
+PUSH_DATE_INDEX = 'MonthDateIndex'
+
+
+def months_between(start_date, end_date):
+    """Return every "YYYY-MM" from start_date to end_date ("YYYY-MM-DD" strings), inclusive"""
+    year, month = int(start_date[:4]), int(start_date[5:7])
+    end_year, end_month = int(end_date[:4]), int(end_date[5:7])
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year}-{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+
+class ProductService:
+    """Key-based data access for products and the stock they consume"""
+
+    @staticmethod
+    def get_product(product_id):
+        """Fetch one product by its key, or None"""
+        if not product_id:
+            return None
+        return dynamodb_service.get_item('PRODUCTION', {'product_id': product_id})
+
+    @staticmethod
+    def get_products(product_ids):
+        """Fetch several products in one batched read, keyed by product_id"""
+        product_ids = [product_id for product_id in dict.fromkeys(product_ids) if product_id]
+        if not product_ids:
+            return {}
+        items = dynamodb_service.batch_get_items('PRODUCTION', [{'product_id': product_id} for product_id in product_ids])
+        return {item['product_id']: item for item in items}
+
+    @staticmethod
+    def get_push_record(push_id):
+        """Fetch one push-to-production record by its key, or None"""
+        if not push_id:
+            return None
+        return dynamodb_service.get_item('PUSH_TO_PRODUCTION', {'push_id': push_id})
+
+    @staticmethod
+    def get_stock_items(item_ids):
+        """Fetch exactly the given stock items in one batched read, keyed by item_id"""
+        item_ids = [item_id for item_id in dict.fromkeys(item_ids) if item_id]
+        if not item_ids:
+            return {}
+        items = dynamodb_service.batch_get_items('STOCK', [{'item_id': item_id} for item_id in item_ids])
+        return {item['item_id']: item for item in items}
+
+    @classmethod
+    def get_bom_stock(cls, stock_needed):
+        """Fetch the stock items referenced by a product's bill of materials"""
+        return cls.get_stock_items(list((stock_needed or {}).keys()))
+
+    @classmethod
+    def get_product_with_materials(cls, product_id):
+        """Return (product, stock_map) reading only the product and its BOM materials"""
+        product = cls.get_product(product_id)
+        if not product:
+            return None, {}
+        return product, cls.get_bom_stock(product.get('stock_needed', {}))
+
+    @staticmethod
+    def compute_bom_costing(stock_needed, stock_map):
+        """
+        Return (base_cost, max_produce, cost_breakdown) for a bill of materials.
+        A material missing from stock zeroes the costing, matching update_product.
+        """
+        base_cost = Decimal('0')
+        max_produce = None
+        cost_breakdown = {}
+
+        for item_id, qty_needed in stock_needed.items():
+            qty_needed_dec = Decimal(str(qty_needed))
+            stock_item = stock_map.get(item_id)
+            if not stock_item:
+                return Decimal('0'), Decimal('0'), {}
+
+            available = Decimal(str(stock_item.get('quantity', 0)))
+            possible = available // qty_needed_dec if qty_needed_dec > 0 else Decimal('0')
+            max_produce = possible if max_produce is None else min(max_produce, possible)
+
+            cpu = Decimal(str(stock_item.get('cost_per_unit', 0)))
+            cost_item = cpu * qty_needed_dec
+            cost_breakdown[item_id] = cost_item
+            base_cost += cost_item
+
+        if max_produce is None:
+            max_produce = Decimal('0')
+        return base_cost, max_produce, cost_breakdown
+
+    @staticmethod
+    def push_date_fields(timestamp):
+        """Date attributes stored on every push record so reports can range-query MonthDateIndex"""
+        return {'date': timestamp[:10], 'month': timestamp[:7]}
+
+    @staticmethod
+    def get_push_records_between(start_date, end_date):
+        """
+        Push records whose date falls in [start_date, end_date] ("YYYY-MM-DD"),
+        read with one MonthDateIndex query per month touched by the range.
+        """
+        if start_date > end_date:
+            return []
+        if not index_registry.is_active('PUSH_TO_PRODUCTION', PUSH_DATE_INDEX):
+            # Index not built yet: fall back to a filtered scan on the raw timestamp
+            return dynamodb_service.scan_table(
+                'PUSH_TO_PRODUCTION',
+                FilterExpression=Attr('timestamp').between(start_date, f"{end_date}T99")
+            )
+        items = []
+        for month in months_between(start_date, end_date):
+            items.extend(dynamodb_service.query_table(
+                'PUSH_TO_PRODUCTION',
+                IndexName=PUSH_DATE_INDEX,
+                KeyConditionExpression=Key('month').eq(month) & Key('date').between(start_date, end_date)
+            ))
+        return items
+
+    @staticmethod
+    def summarize_push_records(items):
+        """Per-product quantity totals in a single pass over the records"""
+        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
+        for item in items:
+            entry = product_summary[item.get('product_id', 'Unknown')]
+            entry["product_name"] = item.get('product_name', 'Unknown')
+            entry["total_quantity"] += float(item.get('quantity_produced', 0))
+
+        return [
+            {
+                "product_id": product_id,
+                "product_name": data["product_name"],
+                "total_quantity": data["total_quantity"]
+            }
+            for product_id, data in product_summary.items()
+        ]
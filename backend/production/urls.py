@@ -7,9 +7,12 @@ urlpatterns = [
     path('delete/', views.delete_product, name='delete_product'),
     path('list/', views.get_all_products, name='get_all_products'),
     path('alter/', views.alter_product_components, name='alter_product_components'),
+    path('capacity/', views.get_production_capacity, name='get_production_capacity'),
+    path('reprice-all/', views.reprice_all_products, name='reprice_all_products'),
     path('update-details/', views.update_product_details, name='update_product_details'),
 
     path('push/', views.push_to_production, name='push_to_production'),
+    path('push-batch/', views.batch_push_to_production, name='batch_push_to_production'),
     path('undo/', views.undo_production, name='undo_production'),
     path('delete-push/', views.delete_push_to_production, name='delete_push_to_production'),
     path('daily/', views.get_daily_push_to_production, name='get_daily_push_to_production'),
@@ -7,33 +7,36 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
 from users.decorators import jwt_required, admin_required
+from backend.fetch_planner import FetchPlan
+from backend.ids import new_id
+from backend.serialization import DecimalEncoder, ResponseEncoder
+from .product_service import ProductService
+from .cost_rollup import CostRollupService
+from reports import transaction_hooks
 import logging
 
 logger = logging.getLogger(__name__)
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        return super(DecimalEncoder, self).default(o)
-
 # Helper functions for production operations
 def log_transaction(action, data, username):
     try:
         from backend.dynamodb_service import dynamodb_service
-        transaction_id = str(uuid.uuid4())
+        transaction_id = new_id()
         ts = datetime.now().isoformat()
         date_str = ts.split("T")[0]
         
         transaction_data = {
             'transaction_id': transaction_id,
             'operation_type': action,
-            'details': data,
+            # DynamoDB rejects floats, so round-trip the details into Decimals
+            'details': json.loads(json.dumps(data, cls=DecimalEncoder), parse_float=Decimal),
             'date': date_str,
             'timestamp': ts,
+            'month': date_str[:7],
             'username': username
         }
         dynamodb_service.put_item('stock_transactions', transaction_data)
+        transaction_hooks.dispatch(transaction_data)
         logger.info(f"Transaction logged: {action} by {username}")
     except Exception as e:
         logger.error(f"Error logging transaction: {e}")
@@ -41,7 +44,7 @@ def log_transaction(action, data, username):
 def log_undo_action(action, data, username):
     try:
         from backend.dynamodb_service import dynamodb_service
-        undo_id = str(uuid.uuid4())
+        undo_id = new_id()
         timestamp = datetime.now().isoformat()
         
         undo_data = {
@@ -57,6 +60,27 @@ def log_undo_action(action, data, username):
     except Exception as e:
         logger.error(f"Error logging undo action: {e}")
 
+def deduct_stock(stock_item, deduct_qty, timestamp):
+    """Apply a production deduction to a stock item in place and return it"""
+    current_qty = Decimal(str(stock_item.get('quantity', 0)))
+    defective = Decimal(str(stock_item.get('defective', 0)))
+    cpu = Decimal(str(stock_item.get('cost_per_unit', 0)))
+    total_cost = Decimal(str(stock_item.get('total_cost', 0)))
+    
+    new_available = current_qty - deduct_qty
+    new_total = new_available + defective
+    new_total_cost = total_cost - (cpu * deduct_qty)
+    if new_total_cost < 0:
+        new_total_cost = Decimal('0')
+        
+    stock_item.update({
+        'quantity': new_available,
+        'total_quantity': new_total,
+        'total_cost': new_total_cost,
+        'updated_at': timestamp
+    })
+    return stock_item
+
 def recalc_max_produce(product_id):
     logger.info(f"Recalculating max produce for {product_id}")
 
@@ -112,6 +136,7 @@ def create_product(request):
         }
         
         dynamodb_service.put_item('PRODUCTION', product_item)
+        CostRollupService.sync_product(product_id, None, stock_needed)
         logger.info(f"Product created: {product_id} - {product_name}")
         
         return JsonResponse({
@@ -143,19 +168,12 @@ def alter_product_components(request):
         to_add_map = body.get('stock_add', {})
         
         # Get existing product
-        products = dynamodb_service.scan_table('PRODUCTION')
-        existing = None
-        for product in products:
-            if product.get('product_id') == product_id:
-                existing = product
-                break
-                
+        existing = ProductService.get_product(product_id)
         if not existing:
             return JsonResponse({"error": f"Product '{product_id}' not found"}, status=404)
             
         # Validate materials exist in stock
-        stock_items = dynamodb_service.scan_table('STOCK')
-        stock_ids = {item['item_id'] for item in stock_items}
+        stock_ids = set(ProductService.get_stock_items(list(to_add_map.keys())))
         
         for mat_id in to_add_map:
             if mat_id not in stock_ids:
@@ -190,6 +208,7 @@ def alter_product_components(request):
         existing['updated_at'] = datetime.now().isoformat()
         
         dynamodb_service.put_item('PRODUCTION', existing)
+        CostRollupService.sync_product(product_id, original_map, current_map)
         log_transaction("AlterProductComponents", {
             "product_id": product_id,
             "stock_delete": to_delete,
@@ -223,13 +242,7 @@ def update_product_details(request):
         username = body['username']
         
         # Get existing product
-        products = dynamodb_service.scan_table('PRODUCTION')
-        existing = None
-        for product in products:
-            if product.get('product_id') == product_id:
-                existing = product
-                break
-                
+        existing = ProductService.get_product(product_id)
         if not existing:
             return JsonResponse({"error": "Product not found"}, status=404)
             
@@ -261,7 +274,7 @@ def update_product_details(request):
             "product_id": product_id,
             **{k: float(v) for k, v in updatables.items()},
             "updated_at": existing['updated_at']
-        }, cls=DecimalEncoder)
+        }, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in update_product_details: {e}")
@@ -271,8 +284,6 @@ def update_product_details(request):
 @jwt_required
 def get_monthly_push_to_production(request):
     try:
-        from backend.dynamodb_service import dynamodb_service
-        from collections import defaultdict
         from datetime import datetime
         
         body = json.loads(request.body) if request.body else {}
@@ -283,46 +294,18 @@ def get_monthly_push_to_production(request):
         if not from_str or not to_str:
             return JsonResponse({"error": "'from_date' and 'to_date' are required (format: YYYY-MM-DD)"}, status=400)
             
-        from_date = datetime.strptime(from_str, "%Y-%m-%d").date()
-        to_date = datetime.strptime(to_str, "%Y-%m-%d").date()
+        # Malformed dates fail here rather than range-querying nothing
+        datetime.strptime(from_str, "%Y-%m-%d")
+        datetime.strptime(to_str, "%Y-%m-%d")
         
-        # Get all push records
-        push_records = dynamodb_service.scan_table('PUSH_TO_PRODUCTION')
-        
-        # Filter by date range
-        monthly_items = []
-        for item in push_records:
-            timestamp = item.get('timestamp')
-            if timestamp:
-                dt = datetime.strptime(timestamp[:10], "%Y-%m-%d").date()
-                if from_date <= dt <= to_date:
-                    monthly_items.append(item)
-                    
-        # Group by product for summary
-        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
-        
-        for item in monthly_items:
-            product_id = item.get('product_id', 'Unknown')
-            product_name = item.get('product_name', 'Unknown')
-            quantity = float(item.get('quantity_produced', 0))
-            
-            product_summary[product_id]["product_name"] = product_name
-            product_summary[product_id]["total_quantity"] += quantity
-            
-        # Convert to list
-        summary_list = [
-            {
-                "product_id": product_id,
-                "product_name": data["product_name"],
-                "total_quantity": data["total_quantity"]
-            }
-            for product_id, data in product_summary.items()
-        ]
+        # Range-query only the push records in the period
+        monthly_items = ProductService.get_push_records_between(from_str, to_str)
+        summary_list = ProductService.summarize_push_records(monthly_items)
         
         return JsonResponse({
             "summary": summary_list,
             "items": monthly_items
-        }, cls=DecimalEncoder)
+        }, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_monthly_push_to_production: {e}")
@@ -345,51 +328,21 @@ def update_product(request):
         username = body['username']
         
         # Get existing product
-        products = dynamodb_service.scan_table('PRODUCTION')
-        existing = None
-        for product in products:
-            if product.get('product_id') == product_id:
-                existing = product
-                break
-                
+        existing = ProductService.get_product(product_id)
         if not existing:
             return JsonResponse({"error": "Product not found"}, status=404)
             
         # Load values from body or existing
-        stock_needed = body.get('stock_needed', existing.get('stock_needed', {}))
+        old_stock_needed = dict(existing.get('stock_needed', {}))
+        stock_needed = body.get('stock_needed', old_stock_needed)
         wastage_percent = Decimal(str(body.get('wastage_percent', existing.get('wastage_percent', 0))))
         transport_cost = Decimal(str(body.get('transport_cost', existing.get('transport_cost', 0))))
         labour_cost = Decimal(str(body.get('labour_cost', existing.get('labour_cost', 0))))
         other_cost = Decimal(str(body.get('other_cost', existing.get('other_cost', 0))))
         
-        # Recalculate costs
-        stock_items = dynamodb_service.scan_table('STOCK')
-        stock_map = {item['item_id']: item for item in stock_items}
-        
-        base_cost = Decimal('0')
-        max_produce = None
-        cost_breakdown = {}
-        
-        for item_id, qty_needed in stock_needed.items():
-            qty_needed_dec = Decimal(str(qty_needed))
-            if item_id not in stock_map:
-                max_produce = Decimal('0')
-                base_cost = Decimal('0')
-                cost_breakdown = {}
-                break
-                
-            stock_item = stock_map[item_id]
-            available = Decimal(str(stock_item.get('quantity', 0)))
-            possible = available // qty_needed_dec if qty_needed_dec > 0 else Decimal('0')
-            max_produce = possible if max_produce is None else min(max_produce, possible)
-            
-            cpu = Decimal(str(stock_item.get('cost_per_unit', 0)))
-            cost_item = cpu * qty_needed_dec
-            cost_breakdown[item_id] = cost_item
-            base_cost += cost_item
-            
-        if max_produce is None:
-            max_produce = Decimal('0')
+        # Recalculate costs from the BOM materials only
+        stock_map = ProductService.get_bom_stock(stock_needed)
+        base_cost, max_produce, cost_breakdown = ProductService.compute_bom_costing(stock_needed, stock_map)
             
         # Calculate totals
         wastage_amount = (base_cost * wastage_percent) / Decimal('100')
@@ -412,6 +365,7 @@ def update_product(request):
         })
         
         dynamodb_service.put_item('PRODUCTION', existing)
+        CostRollupService.sync_product(product_id, old_stock_needed, stock_needed)
         log_transaction("UpdateProduct", {
             'product_id': product_id,
             'production_cost_total': float(total_cost),
@@ -448,18 +402,13 @@ def delete_product(request):
         username = body['username']
         
         # Check if product exists
-        products = dynamodb_service.scan_table('PRODUCTION')
-        existing = None
-        for product in products:
-            if product.get('product_id') == product_id:
-                existing = product
-                break
-                
+        existing = ProductService.get_product(product_id)
         if not existing:
             return JsonResponse({"error": "Product not found"}, status=404)
             
         # Delete product
         dynamodb_service.delete_item('PRODUCTION', {'product_id': product_id})
+        CostRollupService.sync_product(product_id, existing.get('stock_needed'), None)
         log_transaction("DeleteProduct", {
             "product_id": product_id,
             "product_name": existing.get('product_name', '')
@@ -480,9 +429,13 @@ def get_all_products(request):
         from backend.dynamodb_service import dynamodb_service
         from django.http import HttpResponse
         
-        # Get all products and stock items
-        products = dynamodb_service.scan_table('PRODUCTION')
-        stock_items = dynamodb_service.scan_table('STOCK')
+        # Get all products and stock items, concurrently
+        data = (FetchPlan()
+                .add('products', dynamodb_service.scan_table, 'PRODUCTION')
+                .add('stock_items', dynamodb_service.scan_table, 'STOCK')
+                .run())
+        products = data['products']
+        stock_items = data['stock_items']
         
         # Build stock map for quick lookup
         stock_map = {item['item_id']: item for item in stock_items}
@@ -510,13 +463,134 @@ def get_all_products(request):
             product['materials'] = materials
             enriched_products.append(product)
         
-        # Serialize with DecimalEncoder
-        response_data = json.dumps(enriched_products, cls=DecimalEncoder)
+        response_data = json.dumps(enriched_products, cls=ResponseEncoder)
         return HttpResponse(response_data, content_type='application/json')
     except Exception as e:
         logger.error(f"Error in get_all_products: {e}")
         return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
 
+@csrf_exempt
+@jwt_required
+@admin_required
+def reprice_all_products(request):
+    """Recompute every product costing from current stock prices in one pass"""
+    try:
+        repriced, index_rows = CostRollupService.reprice_all()
+        return JsonResponse({
+            "message": "Products repriced successfully",
+            "repriced": repriced,
+            "bom_index_rows": index_rows
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in reprice_all_products: {e}")
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
+
+@csrf_exempt
+@jwt_required
+def get_production_capacity(request):
+    """
+    How many units of every product can be built from current stock, and optionally
+    how a chosen mix of products competing for the same materials can be allocated.
+    """
+    try:
+        from backend.dynamodb_service import dynamodb_service
+        from .capacity import CapacityModel
+        
+        body = json.loads(request.body) if request.body else {}
+        product_ids = body.get('product_ids')
+        mix = body.get('mix') or []
+        mode = body.get('mode', 'greedy')
+        
+        if mode not in ('greedy', 'ratio'):
+            return JsonResponse({"error": "'mode' must be 'greedy' or 'ratio'"}, status=400)
+        if not isinstance(mix, list):
+            return JsonResponse({"error": "'mix' must be a list of {product_id, quantity|ratio}"}, status=400)
+        
+        # Load only what the request needs: a product subset reads its BOM materials, otherwise the whole catalogue
+        if product_ids or mix:
+            wanted = list(product_ids or []) + [line.get('product_id') for line in mix if isinstance(line, dict)]
+            products = list(ProductService.get_products(wanted).values())
+            material_ids = {item_id for product in products for item_id in (product.get('stock_needed') or {})}
+            stock_items = list(ProductService.get_stock_items(list(material_ids)).values())
+        else:
+            products = dynamodb_service.scan_table('PRODUCTION')
+            stock_items = dynamodb_service.scan_table('STOCK')
+        
+        model = CapacityModel.build(products, stock_items)
+        max_produce = model.max_produce()
+        limits = model.limiting_materials()
+        
+        catalogue = [
+            {
+                "product_id": product_id,
+                "product_name": model.product_names[row],
+                "max_produce": int(max_produce[row]),
+                "limiting_material": limits[row]
+            }
+            for row, product_id in enumerate(model.product_ids)
+            if not product_ids or product_id in product_ids
+        ]
+        response = {"products": catalogue}
+        
+        if mix:
+            rows = []
+            amounts = []
+            for line in mix:
+                if not isinstance(line, dict) or line.get('product_id') not in model.product_index:
+                    return JsonResponse({"error": f"Unknown product in mix: {line}"}, status=400)
+                key = 'ratio' if mode == 'ratio' else 'quantity'
+                try:
+                    amount = float(line[key]) if line.get(key) is not None else None
+                except (TypeError, ValueError):
+                    return JsonResponse({"error": f"Invalid '{key}' for '{line['product_id']}'"}, status=400)
+                if mode == 'ratio' and (amount is None or amount <= 0):
+                    return JsonResponse({"error": f"'ratio' must be > 0 for '{line['product_id']}'"}, status=400)
+                if amount is not None and amount < 0:
+                    return JsonResponse({"error": f"'quantity' must be >= 0 for '{line['product_id']}'"}, status=400)
+                rows.append(model.product_index[line['product_id']])
+                amounts.append(amount)
+            
+            if mode == 'ratio':
+                allocated, remaining = model.allocate_ratio(rows, amounts)
+            else:
+                allocated, remaining = model.allocate_greedy(list(zip(rows, amounts)))
+            
+            lines = []
+            for (row, amount), units in zip(zip(rows, amounts), allocated):
+                entry = {
+                    "product_id": model.product_ids[row],
+                    "product_name": model.product_names[row],
+                    "allocated": int(units)
+                }
+                if mode == 'ratio':
+                    entry["ratio"] = amount
+                else:
+                    entry["requested"] = amount
+                    entry["shortfall"] = max(amount - int(units), 0) if amount is not None else None
+                lines.append(entry)
+            
+            touched = {model.material_ids[col] for row in rows for col in model.indices[model.indptr[row]:model.indptr[row + 1]]}
+            response["mix"] = {
+                "mode": mode,
+                "lines": lines,
+                "materials": {
+                    material_id: {
+                        "available": float(model.available[col]),
+                        "used": float(model.available[col] - remaining[col]),
+                        "remaining": float(remaining[col])
+                    }
+                    for col, material_id in enumerate(model.material_ids)
+                    if material_id in touched
+                }
+            }
+        
+        return JsonResponse(response)
+        
+    except Exception as e:
+        logger.error(f"Error in get_production_capacity: {e}")
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
+
 @csrf_exempt
 @jwt_required
 def push_to_production(request):
@@ -537,14 +611,8 @@ def push_to_production(request):
         if quantity_to_produce <= 0:
             return JsonResponse({"error": "quantity must be > 0"}, status=400)
             
-        # Get product
-        products = dynamodb_service.scan_table('PRODUCTION')
-        product_item = None
-        for product in products:
-            if product.get('product_id') == product_id:
-                product_item = product
-                break
-                
+        # Get product and only the stock items it consumes
+        product_item, stock_map = ProductService.get_product_with_materials(product_id)
         if not product_item:
             return JsonResponse({"error": f"Product '{product_id}' not found"}, status=404)
             
@@ -555,8 +623,6 @@ def push_to_production(request):
             return JsonResponse({"error": "Product has no 'stock_needed' defined"}, status=400)
             
         # Check stock availability
-        stock_items = dynamodb_service.scan_table('STOCK')
-        stock_map = {item['item_id']: item for item in stock_items}
         
         required_deductions = {}
         cost_per_unit_total = Decimal('0')
@@ -585,28 +651,10 @@ def push_to_production(request):
         # Apply deductions
         now_ist = datetime.now().isoformat()
         for item_id, deduct_qty in required_deductions.items():
-            stock_item = stock_map[item_id]
-            current_qty = Decimal(str(stock_item.get('quantity', 0)))
-            defective = Decimal(str(stock_item.get('defective', 0)))
-            cpu = Decimal(str(stock_item.get('cost_per_unit', 0)))
-            total_cost = Decimal(str(stock_item.get('total_cost', 0)))
-            
-            new_available = current_qty - deduct_qty
-            new_total = new_available + defective
-            new_total_cost = total_cost - (cpu * deduct_qty)
-            if new_total_cost < 0:
-                new_total_cost = Decimal('0')
-                
-            stock_item.update({
-                'quantity': new_available,
-                'total_quantity': new_total,
-                'total_cost': new_total_cost,
-                'updated_at': now_ist
-            })
-            dynamodb_service.put_item('STOCK', stock_item)
+            dynamodb_service.put_item('STOCK', deduct_stock(stock_map[item_id], deduct_qty, now_ist))
             
         # Create push record
-        push_id = str(uuid.uuid4())
+        push_id = new_id()
         total_production_cost = cost_per_unit_total * quantity_to_produce
         
         push_record = {
@@ -619,7 +667,8 @@ def push_to_production(request):
             'username': username,
             'production_cost_per_unit': cost_per_unit_total,
             'total_production_cost': total_production_cost,
-            'timestamp': now_ist
+            'timestamp': now_ist,
+            **ProductService.push_date_fields(now_ist)
         }
         
         dynamodb_service.put_item('PUSH_TO_PRODUCTION', push_record)
@@ -646,6 +695,135 @@ def push_to_production(request):
         logger.error(f"Error in push_to_production: {e}")
         return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
 
+@csrf_exempt
+@jwt_required
+def batch_push_to_production(request):
+    """
+    Push several (product_id, quantity) lines in one request. Material demand is
+    aggregated across all lines and checked once, the combined deductions are
+    written as one batch, and each line gets its own push record.
+    """
+    try:
+        from backend.dynamodb_service import dynamodb_service
+        
+        body = json.loads(request.body)
+        
+        required = ['lines', 'username']
+        missing = [f for f in required if f not in body]
+        if missing:
+            return JsonResponse({"error": f"Missing required field(s): {', '.join(missing)}"}, status=400)
+            
+        username = body['username']
+        lines = body['lines']
+        if not isinstance(lines, list) or not lines:
+            return JsonResponse({"error": "'lines' must be a non-empty list of {product_id, quantity}"}, status=400)
+            
+        parsed_lines = []
+        for index, line in enumerate(lines):
+            if not isinstance(line, dict) or 'product_id' not in line or 'quantity' not in line:
+                return JsonResponse({"error": f"Line {index}: 'product_id' and 'quantity' are required"}, status=400)
+            try:
+                quantity = Decimal(str(line['quantity']))
+            except Exception:
+                return JsonResponse({"error": f"Line {index}: invalid quantity"}, status=400)
+            if quantity <= 0:
+                return JsonResponse({"error": f"Line {index}: quantity must be > 0"}, status=400)
+            parsed_lines.append((line['product_id'], quantity))
+            
+        # One batched read for the products and one for every material they consume
+        products = ProductService.get_products([product_id for product_id, _ in parsed_lines])
+        missing_products = sorted({product_id for product_id, _ in parsed_lines if product_id not in products})
+        if missing_products:
+            return JsonResponse({"error": f"Product(s) not found: {', '.join(missing_products)}"}, status=404)
+            
+        for product_id, _ in parsed_lines:
+            if not products[product_id].get('stock_needed'):
+                return JsonResponse({"error": f"Product '{product_id}' has no 'stock_needed' defined"}, status=400)
+                
+        material_ids = {item_id for product in products.values() for item_id in product['stock_needed']}
+        stock_map = ProductService.get_stock_items(list(material_ids))
+        
+        # Aggregate demand across all lines
+        line_deductions = []
+        total_demand = {}
+        for product_id, quantity in parsed_lines:
+            deductions = {}
+            cost_per_unit_total = Decimal('0')
+            for item_id, qty_each in products[product_id]['stock_needed'].items():
+                qty_each_dec = Decimal(str(qty_each))
+                needed = qty_each_dec * quantity
+                deductions[item_id] = needed
+                total_demand[item_id] = total_demand.get(item_id, Decimal('0')) + needed
+                if item_id in stock_map:
+                    cost_per_unit_total += Decimal(str(stock_map[item_id].get('cost_per_unit', 0))) * qty_each_dec
+            line_deductions.append((deductions, cost_per_unit_total))
+            
+        # Single availability check against the combined demand
+        shortages = []
+        for item_id, needed in total_demand.items():
+            if item_id not in stock_map:
+                shortages.append({"item_id": item_id, "available": 0.0, "required": float(needed), "error": "not found"})
+                continue
+            available = Decimal(str(stock_map[item_id].get('quantity', 0)))
+            if available < needed:
+                shortages.append({"item_id": item_id, "available": float(available), "required": float(needed)})
+                
+        if shortages:
+            return JsonResponse({"error": "Insufficient stock for batch", "shortages": shortages}, status=400)
+            
+        # Apply the combined deductions as one batch of stock writes
+        now_ist = datetime.now().isoformat()
+        updated_stock = [deduct_stock(stock_map[item_id], needed, now_ist) for item_id, needed in total_demand.items()]
+        dynamodb_service.batch_write_items('STOCK', updated_stock)
+        
+        # One push record per line
+        push_records = []
+        for (product_id, quantity), (deductions, cost_per_unit_total) in zip(parsed_lines, line_deductions):
+            push_records.append({
+                'push_id': new_id(),
+                'product_id': product_id,
+                'product_name': products[product_id].get('product_name', product_id),
+                'quantity_produced': quantity,
+                'stock_deductions': deductions,
+                'status': 'ACTIVE',
+                'username': username,
+                'production_cost_per_unit': cost_per_unit_total,
+                'total_production_cost': cost_per_unit_total * quantity,
+                'timestamp': now_ist,
+                **ProductService.push_date_fields(now_ist)
+            })
+        dynamodb_service.batch_write_items('PUSH_TO_PRODUCTION', push_records)
+        
+        for record in push_records:
+            log_transaction("PushToProduction", {
+                "push_id": record['push_id'],
+                "product_id": record['product_id'],
+                "product_name": record['product_name'],
+                "quantity_produced": float(record['quantity_produced']),
+                "deductions": {k: float(v) for k, v in record['stock_deductions'].items()}
+            }, username)
+            
+        return JsonResponse({
+            "message": f"{len(push_records)} production line(s) pushed successfully",
+            "pushes": [
+                {
+                    "push_id": record['push_id'],
+                    "product_id": record['product_id'],
+                    "product_name": record['product_name'],
+                    "quantity_produced": float(record['quantity_produced']),
+                    "production_cost_per_unit": float(record['production_cost_per_unit']),
+                    "total_production_cost": float(record['total_production_cost']),
+                    "stock_deductions": {k: float(v) for k, v in record['stock_deductions'].items()}
+                }
+                for record in push_records
+            ],
+            "total_deductions": {k: float(v) for k, v in total_demand.items()}
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in batch_push_to_production: {e}")
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
+
 @csrf_exempt
 @jwt_required
 def undo_production(request):
@@ -663,13 +841,7 @@ def undo_production(request):
         username = body['username']
         
         # Get push record
-        push_records = dynamodb_service.scan_table('PUSH_TO_PRODUCTION')
-        push_item = None
-        for record in push_records:
-            if record.get('push_id') == push_id:
-                push_item = record
-                break
-                
+        push_item = ProductService.get_push_record(push_id)
         if not push_item:
             return JsonResponse({"error": f"Push '{push_id}' not found"}, status=404)
             
@@ -678,8 +850,7 @@ def undo_production(request):
             
         # Restore stock quantities
         stock_deductions = push_item.get('stock_deductions', {})
-        stock_items = dynamodb_service.scan_table('STOCK')
-        stock_map = {item['item_id']: item for item in stock_items}
+        stock_map = ProductService.get_bom_stock(stock_deductions)
         
         for item_id, deduction in stock_deductions.items():
             if item_id in stock_map:
@@ -738,10 +909,7 @@ def delete_push_to_production(request):
         username = body['username']
         
         # Check if push record exists
-        push_records = dynamodb_service.scan_table('PUSH_TO_PRODUCTION')
-        push_exists = any(record.get('push_id') == push_id for record in push_records)
-        
-        if not push_exists:
+        if not ProductService.get_push_record(push_id):
             return JsonResponse({"error": f"Push record '{push_id}' not found"}, status=404)
             
         # Delete push record
@@ -763,50 +931,22 @@ def delete_push_to_production(request):
 @jwt_required
 def get_daily_push_to_production(request):
     try:
-        from backend.dynamodb_service import dynamodb_service
-        from collections import defaultdict
-        
         body = json.loads(request.body) if request.body else {}
         username = body.get('username', 'Unknown')
         date_str = body.get('date')
         
         if not date_str:
             return JsonResponse({"error": "'date' is required (format: YYYY-MM-DD)"}, status=400)
+        datetime.strptime(date_str, "%Y-%m-%d")
             
-        # Get all push records
-        push_records = dynamodb_service.scan_table('PUSH_TO_PRODUCTION')
-        
-        # Filter by date
-        daily_items = [
-            item for item in push_records
-            if item.get('timestamp', '').startswith(date_str)
-        ]
-        
-        # Group by product for summary
-        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
-        
-        for item in daily_items:
-            product_id = item.get('product_id', 'Unknown')
-            product_name = item.get('product_name', 'Unknown')
-            quantity = float(item.get('quantity_produced', 0))
-            
-            product_summary[product_id]["product_name"] = product_name
-            product_summary[product_id]["total_quantity"] += quantity
-            
-        # Convert to list
-        summary_list = [
-            {
-                "product_id": product_id,
-                "product_name": data["product_name"],
-                "total_quantity": data["total_quantity"]
-            }
-            for product_id, data in product_summary.items()
-        ]
+        # Range-query only the push records in the period
+        daily_items = ProductService.get_push_records_between(date_str, date_str)
+        summary_list = ProductService.summarize_push_records(daily_items)
         
         return JsonResponse({
             "summary": summary_list,
             "items": daily_items
-        }, cls=DecimalEncoder)
+        }, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_daily_push_to_production: {e}")
@@ -816,8 +956,6 @@ def get_daily_push_to_production(request):
 @jwt_required
 def get_weekly_push_to_production(request):
     try:
-        from backend.dynamodb_service import dynamodb_service
-        from collections import defaultdict
         from datetime import datetime
         
         body = json.loads(request.body) if request.body else {}
@@ -828,46 +966,18 @@ def get_weekly_push_to_production(request):
         if not from_str or not to_str:
             return JsonResponse({"error": "'from_date' and 'to_date' are required (format: YYYY-MM-DD)"}, status=400)
             
-        from_date = datetime.strptime(from_str, "%Y-%m-%d").date()
-        to_date = datetime.strptime(to_str, "%Y-%m-%d").date()
-        
-        # Get all push records
-        push_records = dynamodb_service.scan_table('PUSH_TO_PRODUCTION')
-        
-        # Filter by date range
-        weekly_items = []
-        for item in push_records:
-            timestamp = item.get('timestamp')
-            if timestamp:
-                dt = datetime.strptime(timestamp[:10], "%Y-%m-%d").date()
-                if from_date <= dt <= to_date:
-                    weekly_items.append(item)
-                    
-        # Group by product for summary
-        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
+        # Malformed dates fail here rather than range-querying nothing
+        datetime.strptime(from_str, "%Y-%m-%d")
+        datetime.strptime(to_str, "%Y-%m-%d")
         
-        for item in weekly_items:
-            product_id = item.get('product_id', 'Unknown')
-            product_name = item.get('product_name', 'Unknown')
-            quantity = float(item.get('quantity_produced', 0))
-            
-            product_summary[product_id]["product_name"] = product_name
-            product_summary[product_id]["total_quantity"] += quantity
-            
-        # Convert to list
-        summary_list = [
-            {
-                "product_id": product_id,
-                "product_name": data["product_name"],
-                "total_quantity": data["total_quantity"]
-            }
-            for product_id, data in product_summary.items()
-        ]
+        # Range-query only the push records in the period
+        weekly_items = ProductService.get_push_records_between(from_str, to_str)
+        summary_list = ProductService.summarize_push_records(weekly_items)
         
         return JsonResponse({
             "summary": summary_list,
             "items": weekly_items
-        }, cls=DecimalEncoder)
+        }, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_weekly_push_to_production: {e}")
@@ -876,8 +986,6 @@ def get_weekly_push_to_production(request):
 @csrf_exempt
 def get_monthly_push_to_production_public(request):
     try:
-        from backend.dynamodb_service import dynamodb_service
-        from collections import defaultdict
         from datetime import datetime
         
         body = json.loads(request.body) if request.body else {}
@@ -887,46 +995,18 @@ def get_monthly_push_to_production_public(request):
         if not from_str or not to_str:
             return JsonResponse({"error": "'from_date' and 'to_date' are required (format: YYYY-MM-DD)"}, status=400)
             
-        from_date = datetime.strptime(from_str, "%Y-%m-%d").date()
-        to_date = datetime.strptime(to_str, "%Y-%m-%d").date()
-        
-        # Get all push records
-        push_records = dynamodb_service.scan_table('PUSH_TO_PRODUCTION')
+        # Malformed dates fail here rather than range-querying nothing
+        datetime.strptime(from_str, "%Y-%m-%d")
+        datetime.strptime(to_str, "%Y-%m-%d")
         
-        # Filter by date range
-        monthly_items = []
-        for item in push_records:
-            timestamp = item.get('timestamp')
-            if timestamp:
-                dt = datetime.strptime(timestamp[:10], "%Y-%m-%d").date()
-                if from_date <= dt <= to_date:
-                    monthly_items.append(item)
-                    
-        # Group by product for summary
-        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
-        
-        for item in monthly_items:
-            product_id = item.get('product_id', 'Unknown')
-            product_name = item.get('product_name', 'Unknown')
-            quantity = float(item.get('quantity_produced', 0))
-            
-            product_summary[product_id]["product_name"] = product_name
-            product_summary[product_id]["total_quantity"] += quantity
-            
-        # Convert to list
-        summary_list = [
-            {
-                "product_id": product_id,
-                "product_name": data["product_name"],
-                "total_quantity": data["total_quantity"]
-            }
-            for product_id, data in product_summary.items()
-        ]
+        # Range-query only the push records in the period
+        monthly_items = ProductService.get_push_records_between(from_str, to_str)
+        summary_list = ProductService.summarize_push_records(monthly_items)
         
         return JsonResponse({
             "summary": summary_list,
             "items": monthly_items
-        }, cls=DecimalEncoder)
+        }, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_monthly_push_to_production_public: {e}")
@@ -2,4 +2,13 @@ from django.apps import AppConfig
 
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'reports'
\ No newline at end of file
+    name = 'reports'
+
+    def ready(self):
+        # Register the stock_transactions write-path hooks
+        from . import daily_movements  # noqa: F401
+        from . import item_movements  # noqa: F401
+        from . import columnar_store  # noqa: F401
+        from . import period_rollups  # noqa: F401
+        from . import report_cache  # noqa: F401
+        from . import report_warmer  # noqa: F401
@@ -0,0 +1,125 @@
+"""
+Monthly closing-balance checkpoints per item.
+
+The monthly grids need each item's opening balance. Instead of walking every
+movement from the viewed month up to today, the closing quantity of each month
+is persisted in ITEM_BALANCE_CHECKPOINTS (month, item_id) by the
+close_stock_month command at rollover. Reads derive the balances a month has
+no checkpoint for without storing them, so a balance computed from movement
+aggregates that are later rebuilt is never frozen. A rebuild of the
+aggregates drops the checkpoints derived from them (invalidate()).
+"""
+import calendar
+import logging
+from datetime import datetime
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from backend.dynamodb_service import dynamodb_service
+
+logger = logging.getLogger(__name__)
+
+TABLE_KEY = 'ITEM_BALANCE_CHECKPOINTS'
+
+
+def shift_month(month, offset):
+    """The "YYYY-MM" month offset months away from month"""
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + offset
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+def month_bounds(month):
+    """First and last day ("YYYY-MM-DD") of a "YYYY-MM" month"""
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{month}-01", f"{month}-{calendar.monthrange(year, mon)[1]:02d}"
+
+
+class BalanceCheckpointService:
+    """Opening/closing balances for the monthly grids, backed by persisted checkpoints"""
+
+    @staticmethod
+    def get_checkpoints(month):
+        """Persisted closing quantities for a month, keyed by item_id"""
+        rows = dynamodb_service.query_table(TABLE_KEY, KeyConditionExpression=Key('month').eq(month))
+        return {row['item_id']: Decimal(str(row['closing_qty'])) for row in rows}
+
+    @staticmethod
+    def net_movement(start_date, end_date):
+        """Inward minus consumption per item over a date range"""
+        from .columnar_store import movement_totals
+        totals = movement_totals(start_date, end_date)
+        return {
+            item_id: t.get('inward_qty', Decimal('0')) - t.get('consumption_qty', Decimal('0'))
+            for item_id, t in totals.items()
+        }
+
+    @staticmethod
+    def save_checkpoints(month, balances):
+        now_iso = datetime.now().isoformat()
+        dynamodb_service.batch_write_items(TABLE_KEY, [
+            {'month': month, 'item_id': item_id, 'closing_qty': qty, 'created_at': now_iso}
+            for item_id, qty in balances.items()
+        ])
+
+    @staticmethod
+    def invalidate(start_date=None):
+        """
+        Drop every checkpoint that may have been derived from movements dated start_date
+        or later (all of them by default): those of its month onwards, and any created
+        since, whose live-quantity derivation walked back over those dates
+        """
+        rows = dynamodb_service.scan_table(TABLE_KEY, use_cache=False)
+        stale = [
+            {'month': row['month'], 'item_id': row['item_id']}
+            for row in rows
+            if start_date is None or row['month'] >= start_date[:7] or row.get('created_at', '') >= start_date
+        ]
+        dynamodb_service.batch_write_items(TABLE_KEY, [], delete_keys=stale)
+        return len(stale)
+
+    @classmethod
+    def closing_balances(cls, month, stock_items, recompute=False, persist=False):
+        """
+        Closing quantity of every stock item at the end of month. Resolved, per item, from:
+        1. the month's checkpoint;
+        2. the previous month's checkpoint plus this month's movements;
+        3. the live quantity minus every movement since the month ended.
+        persist=True (close_stock_month) stores the derived balances of a finished month.
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+        first_day, last_day = month_bounds(month)
+        item_ids = [item['item_id'] for item in stock_items]
+
+        balances = {} if recompute else cls.get_checkpoints(month)
+        missing = [item_id for item_id in item_ids if item_id not in balances]
+        if not missing:
+            return balances
+
+        derived = {}
+        if not recompute:
+            earlier = cls.get_checkpoints(shift_month(month, -1))
+            if any(item_id in earlier for item_id in missing):
+                month_net = cls.net_movement(first_day, last_day)
+                for item_id in missing:
+                    if item_id in earlier:
+                        derived[item_id] = earlier[item_id] + month_net.get(item_id, Decimal('0'))
+
+        rest = [item_id for item_id in missing if item_id not in derived]
+        if rest:
+            since_net = cls.net_movement(month_bounds(shift_month(month, 1))[0], today)
+            current = {item['item_id']: Decimal(str(item.get('quantity', 0))) for item in stock_items}
+            for item_id in rest:
+                derived[item_id] = current[item_id] - since_net.get(item_id, Decimal('0'))
+
+        if persist and last_day < today:
+            try:
+                cls.save_checkpoints(month, derived)
+            except Exception as e:
+                logger.error(f"Error saving balance checkpoints for {month}: {e}")
+
+        balances.update(derived)
+        return balances
+
+    @classmethod
+    def opening_balances(cls, month, stock_items):
+        """Opening quantity of every stock item for a month, i.e. the previous month's closing"""
+        return cls.closing_balances(shift_month(month, -1), stock_items)
@@ -0,0 +1,413 @@
+"""
+Columnar, in-memory copy of the stock movements in stock_transactions.
+
+Every movement (an inward, one material of a PushToProduction, a defective
+entry) is one row across parallel NumPy arrays: day number, interned item
+index, op code, quantity and cost. Per-day breakdowns of a range are a mask and
+a few bincounts instead of a loop over DynamoDB items; per-item totals over a
+range come from a prefix-sum ledger built from the same rows.
+
+Each process loads the store once (from the snapshot shared through the
+'reports' cache when there is one, otherwise a full scan), appends what it
+logs itself through the write-path hook, and catches up on what other
+processes logged from the MonthTimestampIndex before each read. reset()
+(transaction data deleted) makes every process reload. Until that index is
+ACTIVE the store stays unused and reports read the per-day aggregates
+(ITEM_DAILY_MOVEMENTS).
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import numpy as np
+from boto3.dynamodb.conditions import Attr
+from django.conf import settings
+from django.core.cache import caches
+from backend.dynamodb_service import dynamodb_service
+from backend.index_registry import index_registry
+from backend.serialization import number_policy
+from production.product_service import months_between
+from . import transaction_hooks
+from .daily_movements import DailyMovementService, MOVEMENT_OPERATIONS
+from .prefix_ledger import PrefixLedger
+from .transaction_listing import TransactionListingService, INDEX_NAME
+
+logger = logging.getLogger(__name__)
+
+TABLE_KEY = 'stock_transactions'
+CACHE_ALIAS = 'reports'
+EPOCH_KEY = 'columnar:epoch'
+SNAPSHOT_KEY = 'columnar:snapshot'
+
+OP_INWARD, OP_PUSH, OP_DEFECTIVE = 0, 1, 2
+CONSUMPTION_OPS = (OP_PUSH, OP_DEFECTIVE)
+OP_FIELDS = ((OP_INWARD, 'inward_qty', 'inward_cost'), (OP_PUSH, 'push_qty', None), (OP_DEFECTIVE, 'defective_qty', None))
+
+COLUMN_TYPES = {'day': np.int32, 'item': np.int32, 'op': np.int8, 'qty': np.float64, 'cost': np.float64}
+
+# A catch-up re-reads this far behind the latest timestamp seen, for writes that landed late
+SYNC_OVERLAP = timedelta(minutes=5)
+
+# Re-share the snapshot once this many rows were added since the last one
+SNAPSHOT_EVERY = 1000
+
+# Larger batches of new rows rebuild the ledger instead of updating it row by row
+LEDGER_REBUILD_AT = 256
+
+_PROJECTION = {'#id': 'transaction_id', '#op': 'operation_type', '#date': 'date', '#ts': 'timestamp', '#details': 'details'}
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def day_number(date_str):
+    """Days since 1970-01-01 of a "YYYY-MM-DD" date"""
+    return date.fromisoformat(date_str).toordinal() - _EPOCH_ORDINAL
+
+
+def day_string(number):
+    return date.fromordinal(int(number) + _EPOCH_ORDINAL).strftime('%Y-%m-%d')
+
+
+def _plain_reads():
+    # Plain reads carry int/float only under the 'float' policy; fixed-point strings would drop digits
+    return number_policy() == 'float'
+
+
+def transaction_movements(transaction):
+    """(item_id, op, quantity, cost) for each movement of one transaction, as the daily aggregates count them"""
+    rows = []
+    for item_id, delta in DailyMovementService.transaction_deltas(transaction).items():
+        if 'inward_qty' in delta:
+            rows.append((item_id, OP_INWARD, float(delta['inward_qty']), float(delta['inward_cost'])))
+        if 'push_qty' in delta:
+            rows.append((item_id, OP_PUSH, float(delta['push_qty']), 0.0))
+        if 'defective_qty' in delta:
+            rows.append((item_id, OP_DEFECTIVE, float(delta['defective_qty']), 0.0))
+    return rows
+
+
+def _empty_columns():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMN_TYPES.items()}
+
+
+def _ledger_values(columns):
+    """Ledger measures of movement rows: quantity, cost and a row count per op code"""
+    ops = columns['op'].astype(np.int64)
+    rows = np.arange(len(ops))
+    values = np.zeros((len(ops), 3 * len(OP_FIELDS)))
+    values[rows, ops * 3] = columns['qty']
+    values[rows, ops * 3 + 1] = columns['cost']
+    values[rows, ops * 3 + 2] = 1
+    return values
+
+
+class TransactionColumns:
+    """The per-process columnar movement store"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._loaded = False
+        self._epoch = None
+        self._items = []
+        self._item_index = {}
+        self._columns = _empty_columns()
+        self._pending = []
+        # Latest timestamp read from DynamoDB, and the ids ingested within SYNC_OVERLAP of it
+        self._high_water = ''
+        self._recent = {}
+        self._unshared = 0
+        self._ledger = None
+
+    @staticmethod
+    def _cache():
+        return caches[CACHE_ALIAS]
+
+    def _current_epoch(self):
+        cache = self._cache()
+        epoch = cache.get(EPOCH_KEY)
+        if epoch is None:
+            epoch = uuid.uuid4().hex
+            cache.add(EPOCH_KEY, epoch, timeout=None)
+            epoch = cache.get(EPOCH_KEY, epoch)
+        return epoch
+
+    # Ingestion
+
+    def _intern(self, item_id):
+        index = self._item_index.get(item_id)
+        if index is None:
+            index = self._item_index[item_id] = len(self._items)
+            self._items.append(item_id)
+        return index
+
+    def _ingest(self, transaction):
+        """Queue the movements of a transaction unless it was already ingested"""
+        if transaction.get('operation_type') not in MOVEMENT_OPERATIONS or not transaction.get('date'):
+            return
+        transaction_id = transaction.get('transaction_id')
+        if transaction_id in self._recent:
+            return
+        self._recent[transaction_id] = transaction.get('timestamp', '')
+
+        day = day_number(transaction['date'])
+        for item_id, op, quantity, cost in transaction_movements(transaction):
+            self._pending.append((day, self._intern(item_id), op, quantity, cost))
+
+    def _compact(self):
+        """Move queued rows into the arrays"""
+        if not self._pending:
+            return
+        fresh = {
+            name: np.asarray(values, dtype=COLUMN_TYPES[name])
+            for name, values in zip(COLUMN_TYPES, zip(*self._pending))
+        }
+        self._columns = {name: np.concatenate([self._columns[name], fresh[name]]) for name in COLUMN_TYPES}
+
+        if self._ledger is not None:
+            if len(self._pending) > LEDGER_REBUILD_AT:
+                self._ledger = None
+            else:
+                for item, day, values in zip(fresh['item'].tolist(), fresh['day'].tolist(), _ledger_values(fresh)):
+                    self._ledger.add(item, day, values)
+        self._unshared += len(self._pending)
+        self._pending = []
+
+    def _advance(self, timestamps):
+        """Raise the high-water mark and forget ids that fell out of the overlap window"""
+        # Clamped to now: a clock-skewed future timestamp would make catch-ups skip real writes
+        latest = min(max(timestamps, default=''), datetime.now().isoformat())
+        if latest > self._high_water:
+            self._high_water = latest
+        cutoff = self._overlap_start()
+        self._recent = {tid: ts for tid, ts in self._recent.items() if ts >= cutoff}
+
+    def _overlap_start(self):
+        try:
+            return (datetime.fromisoformat(self._high_water) - SYNC_OVERLAP).isoformat()
+        except ValueError:
+            return ''
+
+    # Loading and catching up
+
+    def _load(self):
+        epoch = self._current_epoch()
+        snapshot = self._cache().get(SNAPSHOT_KEY)
+        if snapshot and snapshot.get('epoch') == epoch:
+            self._items = list(snapshot['items'])
+            self._item_index = {item_id: i for i, item_id in enumerate(self._items)}
+            self._columns = snapshot['columns']
+            self._high_water = snapshot['high_water']
+            self._recent = dict(snapshot['recent'])
+            self._loaded, self._epoch = True, epoch
+            self._unshared = 0
+            self._catch_up()
+            logger.info(f"Columnar store loaded from snapshot: {len(self._columns['day'])} rows")
+            return
+
+        started = time.monotonic()
+        timestamps = [datetime.now().isoformat()]
+        for page in dynamodb_service.iter_scan(
+            TABLE_KEY,
+            plain=_plain_reads(),
+            FilterExpression=Attr('operation_type').is_in(list(MOVEMENT_OPERATIONS)),
+            ProjectionExpression=', '.join(_PROJECTION),
+            ExpressionAttributeNames=_PROJECTION
+        ):
+            for transaction in page:
+                self._ingest(transaction)
+                timestamps.append(transaction.get('timestamp', ''))
+        self._compact()
+        self._advance(timestamps)
+        self._loaded, self._epoch = True, epoch
+        self._share()
+        logger.info(f"Columnar store loaded from a scan: {len(self._columns['day'])} rows "
+                    f"in {time.monotonic() - started:.2f}s")
+
+    def _catch_up(self):
+        """Ingest the movements logged since the high-water mark (minus the overlap)"""
+        since = self._overlap_start() or datetime.now().strftime('%Y-%m-%d')
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        if not index_registry.is_active(TABLE_KEY, INDEX_NAME):
+            raise RuntimeError(f"{INDEX_NAME} is not active, the columnar store cannot catch up")
+        transactions = []
+        for month in months_between(since[:10], max(today, since[:10])):
+            start_key = None
+            while True:
+                response = TransactionListingService.query_month(
+                    month, None, start_key, start_date=since, newest_first=False, plain=_plain_reads()
+                )
+                transactions.extend(response.get('Items', []))
+                start_key = response.get('LastEvaluatedKey')
+                if not start_key:
+                    break
+
+        for transaction in transactions:
+            self._ingest(transaction)
+        self._compact()
+        self._advance(t.get('timestamp', '') for t in transactions if t.get('operation_type') in MOVEMENT_OPERATIONS)
+        if self._unshared >= SNAPSHOT_EVERY:
+            self._share()
+
+    def _share(self):
+        """Publish the current state as the snapshot new processes start from"""
+        try:
+            self._cache().set(SNAPSHOT_KEY, {
+                'epoch': self._epoch,
+                'items': self._items,
+                'columns': self._columns,
+                'high_water': self._high_water,
+                'recent': self._recent,
+            }, timeout=None)
+            self._unshared = 0
+        except Exception as e:
+            logger.error(f"Error sharing the columnar store snapshot: {e}")
+
+    def _ensure(self):
+        """
+        Load on first use, reload after a reset(), otherwise catch up before every read.
+        The store is read when a report is computed on a ReportResultCache miss, which
+        another process's write may have caused: a catch-up on a timer could compute
+        the fresh version key from data older than that write.
+        """
+        if not self._loaded:
+            self._load()
+        elif self._current_epoch() != self._epoch:
+            self._clear()
+            self._load()
+        else:
+            self._catch_up()
+        self._compact()
+
+    def on_transaction(self, transaction):
+        """Write-path hook: append a freshly logged transaction if the store is loaded"""
+        with self._lock:
+            if self._loaded:
+                self._ingest(transaction)
+
+    def reset(self):
+        """Drop the store in every process (stock_transactions was cleared)"""
+        with self._lock:
+            self._clear()
+            try:
+                self._cache().set(EPOCH_KEY, uuid.uuid4().hex, timeout=None)
+                self._cache().delete(SNAPSHOT_KEY)
+            except Exception as e:
+                logger.error(f"Error resetting the columnar store: {e}")
+
+    # Aggregations
+
+    def _range_mask(self, start_date, end_date):
+        days = self._columns['day']
+        return (days >= day_number(start_date)) & (days <= day_number(end_date))
+
+    @staticmethod
+    def _sums(keys, quantities, costs, size):
+        """(key, quantity, cost) for every key with at least one row, sums as Decimals"""
+        present = np.flatnonzero(np.bincount(keys, minlength=size))
+        quantities = np.bincount(keys, weights=quantities, minlength=size)[present]
+        costs = np.bincount(keys, weights=costs, minlength=size)[present]
+        # Rounded first: float sums of decimal quantities carry noise such as 0.30000000000000004
+        return zip(
+            present.tolist(),
+            map(Decimal, map(str, np.round(quantities, 6).tolist())),
+            map(Decimal, map(str, np.round(costs, 6).tolist())),
+        )
+
+    def _prefix_ledger(self):
+        if self._ledger is None:
+            self._ledger = PrefixLedger.build(self._columns['item'], self._columns['day'], _ledger_values(self._columns))
+        return self._ledger
+
+    def item_totals(self, start_date, end_date):
+        """
+        {item_id: {'inward_qty', 'inward_cost', 'consumption_qty', 'push_qty', 'defective_qty'}}
+        over a date range, only with the fields that occurred, like DailyMovementService.totals_by_item().
+        Read from the prefix-sum ledger, so the cost does not grow with the length of the range.
+        """
+        with self._lock:
+            self._ensure()
+            sums = self._prefix_ledger().range_totals(len(self._items), day_number(start_date), day_number(end_date))
+            # Rounded first: float sums of decimal quantities carry noise such as 0.30000000000000004
+            sums = np.round(sums, 6) + 0.0
+
+            totals = {}
+            for op, qty_field, cost_field in OP_FIELDS:
+                quantities, costs, counts = sums[:, op * 3], sums[:, op * 3 + 1], sums[:, op * 3 + 2]
+                for index in np.flatnonzero(counts > 0).tolist():
+                    entry = totals.setdefault(self._items[index], {})
+                    quantity = Decimal(str(quantities[index]))
+                    entry[qty_field] = quantity
+                    if cost_field:
+                        entry[cost_field] = Decimal(str(costs[index]))
+                    if op in CONSUMPTION_OPS:
+                        entry['consumption_qty'] = entry.get('consumption_qty', Decimal('0')) + quantity
+            return totals
+
+    def daily_rows(self, start_date, end_date):
+        """
+        Per-(date, item) rows with inward_qty/inward_cost/consumption_qty over a date
+        range, only with the fields that occurred, like DailyMovementService.get_range()
+        """
+        with self._lock:
+            self._ensure()
+            first = day_number(start_date)
+            width = day_number(end_date) - first + 1
+            if width <= 0:
+                return []
+            in_range = self._range_mask(start_date, end_date)
+            columns = {name: values[in_range] for name, values in self._columns.items()}
+            ops = columns['op']
+            # One key per (item, day) cell of the range
+            cells = columns['item'].astype(np.int64) * width + (columns['day'] - first)
+            size = len(self._items) * width
+            days = [day_string(first + offset) for offset in range(width)]
+
+            rows = {}
+            for mask, qty_field, cost_field in ((ops == OP_INWARD, 'inward_qty', 'inward_cost'),
+                                                (np.isin(ops, CONSUMPTION_OPS), 'consumption_qty', None)):
+                for cell, quantity, cost in self._sums(cells[mask], columns['qty'][mask], columns['cost'][mask], size):
+                    row = rows.get(cell)
+                    if row is None:
+                        item_id, day = self._items[cell // width], days[cell % width]
+                        row = rows[cell] = {'month': day[:7], 'day_item': f"{day}#{item_id}", 'date': day, 'item_id': item_id}
+                    row[qty_field] = quantity
+                    if cost_field:
+                        row[cost_field] = cost
+            return sorted(rows.values(), key=lambda row: row['day_item'])
+
+
+transaction_columns = TransactionColumns()
+
+
+def store_enabled():
+    """True when ranged movement reads are served by the columnar store"""
+    # Without MonthTimestampIndex every catch-up would be a full scan: the per-day aggregates are cheaper
+    return getattr(settings, 'COLUMNAR_STORE_ENABLED', False) and index_registry.is_active(TABLE_KEY, INDEX_NAME)
+
+
+def movement_totals(start_date, end_date):
+    """Per-item movement totals over a date range, from the columnar store when enabled"""
+    if store_enabled():
+        try:
+            return transaction_columns.item_totals(start_date, end_date)
+        except Exception as e:
+            logger.error(f"Columnar store unavailable, reading the daily aggregates: {e}")
+    return DailyMovementService.totals_by_item(DailyMovementService.get_range(start_date, end_date))
+
+
+def movement_rows_between(start_date, end_date):
+    """Per-(date, item) movement rows over a date range, from the columnar store when enabled"""
+    if store_enabled():
+        try:
+            return transaction_columns.daily_rows(start_date, end_date)
+        except Exception as e:
+            logger.error(f"Columnar store unavailable, reading the daily aggregates: {e}")
+    return DailyMovementService.get_range(start_date, end_date)
+
+
+transaction_hooks.register(transaction_columns.on_transaction)
@@ -0,0 +1,283 @@
+"""
+Per-(date, item) stock movement aggregates, maintained on the write path.
+
+Each row of ITEM_DAILY_MOVEMENTS holds one item's inward, consumption and
+defective totals for one day, keyed by month (partition) and
+"YYYY-MM-DD#item_id" (sort), so a date range is read with one query per month
+instead of re-scanning stock_transactions.
+
+Two reserved partitions keep the rows trustworthy:
+- "#meta"/"backfilled" is written by backfill_daily_movements once every
+  earlier transaction is in the table. Until it exists, ranges are built
+  from stock_transactions instead of returning partial rows.
+- "#dirty"/<date> flags a date whose rows missed a transaction because
+  record() failed. Reads build a flagged date from stock_transactions, and
+  once the date is over, store the rebuilt rows and clear the flag.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from backend.dynamodb_service import dynamodb_service
+from backend.query_planner import between, find_items
+from production.product_service import months_between
+from . import transaction_hooks
+
+logger = logging.getLogger(__name__)
+
+TABLE_KEY = 'ITEM_DAILY_MOVEMENTS'
+
+# Operations that move stock in or out, as the consumption/inward reports count them
+MOVEMENT_OPERATIONS = ('AddStockQuantity', 'PushToProduction', 'AddDefectiveGoods')
+
+# Summed across the day's transactions
+SUM_FIELDS = ('inward_qty', 'inward_cost', 'gst_amount', 'consumption_qty', 'push_qty', 'defective_qty', 'txn_count')
+# Overwritten by the latest transaction
+LAST_FIELDS = ('gst_percentage', 'new_quantity')
+# Kept from the first transaction of the day
+FIRST_FIELDS = ('existing_quantity',)
+
+# Sorts after every "YYYY-MM-DD#<item_id>" of a day
+_KEY_END = '\uffff'
+
+BACKFILLED_KEY = {'month': '#meta', 'day_item': 'backfilled'}
+DIRTY_MONTH = '#dirty'
+
+# Set once the backfilled marker has been seen; it is never removed afterwards
+_backfilled = False
+_warned = False
+
+
+def _dec(value):
+    return Decimal(str(value or 0))
+
+
+class DailyMovementService:
+    """Reads and maintains the per-(date, item) movement aggregates"""
+
+    @staticmethod
+    def row_key(date_str, item_id):
+        return {'month': date_str[:7], 'day_item': f"{date_str}#{item_id}"}
+
+    @staticmethod
+    def transaction_deltas(transaction):
+        """
+        The per-item movement carried by one transaction, as {item_id: delta}.
+        Consumption counts PushToProduction deductions plus defective goods,
+        matching extract_consumption_details().
+        """
+        op = transaction.get('operation_type')
+        details = transaction.get('details') or {}
+        deltas = {}
+
+        if op == 'AddStockQuantity':
+            item_id = details.get('item_id')
+            if item_id:
+                quantity = _dec(details.get('quantity_added'))
+                new_available = _dec(details.get('new_available'))
+                delta = {
+                    'inward_qty': quantity,
+                    'inward_cost': _dec(details.get('added_cost')),
+                    'gst_amount': _dec(details.get('gst_amount')),
+                    'gst_percentage': _dec(details.get('gst_percentage')),
+                    'existing_quantity': new_available - quantity,
+                    'new_quantity': new_available,
+                }
+                if details.get('supplier_name'):
+                    delta['suppliers'] = {details['supplier_name']}
+                deltas[item_id] = delta
+
+        elif op == 'PushToProduction':
+            for item_id, qty in (details.get('deductions') or {}).items():
+                deltas[item_id] = {'consumption_qty': _dec(qty), 'push_qty': _dec(qty)}
+
+        elif op == 'AddDefectiveGoods':
+            item_id = details.get('item_id')
+            if item_id:
+                quantity = _dec(details.get('defective_added'))
+                deltas[item_id] = {'consumption_qty': quantity, 'defective_qty': quantity}
+
+        for delta in deltas.values():
+            delta['txn_count'] = Decimal('1')
+        return deltas
+
+    @classmethod
+    def record(cls, transaction):
+        """Fold a freshly logged transaction into its day's rows with atomic updates"""
+        date_str = transaction.get('date')
+        if not date_str or transaction.get('operation_type') not in MOVEMENT_OPERATIONS:
+            return
+        for item_id, delta in cls.transaction_deltas(transaction).items():
+            cls._apply(date_str, item_id, delta)
+
+    @staticmethod
+    def mark_dirty(transaction):
+        """Flag the date of a transaction record() could not fold in, so reads rebuild it"""
+        date_str = transaction.get('date')
+        if not date_str or transaction.get('operation_type') not in MOVEMENT_OPERATIONS:
+            return
+        dynamodb_service.put_item(TABLE_KEY, {
+            'month': DIRTY_MONTH,
+            'day_item': date_str,
+            'transaction_id': transaction.get('transaction_id'),
+            'marked_at': datetime.now().isoformat(),
+        })
+        logger.warning(f"Daily movements of {date_str} will be rebuilt from stock_transactions")
+
+    @classmethod
+    def _apply(cls, date_str, item_id, delta):
+        names = {'#date': 'date', '#item_id': 'item_id'}
+        values = {':date': date_str, ':item_id': item_id}
+        set_clauses = ['#date = :date', '#item_id = :item_id']
+        add_clauses = []
+
+        for field, value in delta.items():
+            names[f'#{field}'] = field
+            values[f':{field}'] = value
+            if field in FIRST_FIELDS:
+                set_clauses.append(f'#{field} = if_not_exists(#{field}, :{field})')
+            elif field in LAST_FIELDS:
+                set_clauses.append(f'#{field} = :{field}')
+            else:
+                add_clauses.append(f'#{field} :{field}')
+
+        dynamodb_service.update_item(
+            TABLE_KEY,
+            cls.row_key(date_str, item_id),
+            f"SET {', '.join(set_clauses)} ADD {', '.join(add_clauses)}",
+            values,
+            ExpressionAttributeNames=names
+        )
+
+    @staticmethod
+    def merge(row, delta):
+        """In-memory equivalent of _apply(), used when rebuilding rows"""
+        for field, value in delta.items():
+            if field in FIRST_FIELDS:
+                row.setdefault(field, value)
+            elif field in LAST_FIELDS:
+                row[field] = value
+            elif field == 'suppliers':
+                row[field] = row.get(field, set()) | value
+            else:
+                row[field] = row.get(field, Decimal('0')) + value
+        return row
+
+    @classmethod
+    def build_rows(cls, transactions):
+        """Aggregate rows for a batch of transactions, keyed by (date, item_id)"""
+        rows = {}
+        ordered = sorted(
+            (t for t in transactions if t.get('operation_type') in MOVEMENT_OPERATIONS and t.get('date')),
+            key=lambda t: t.get('timestamp', '')
+        )
+        for txn in ordered:
+            date_str = txn['date']
+            for item_id, delta in cls.transaction_deltas(txn).items():
+                row = rows.get((date_str, item_id))
+                if row is None:
+                    row = rows[(date_str, item_id)] = {**cls.row_key(date_str, item_id), 'date': date_str, 'item_id': item_id}
+                cls.merge(row, delta)
+        return rows
+
+    @staticmethod
+    def is_backfilled():
+        global _backfilled, _warned
+        if not _backfilled:
+            _backfilled = dynamodb_service.get_item(TABLE_KEY, BACKFILLED_KEY) is not None
+            if not _backfilled and not _warned:
+                _warned = True
+                logger.warning("Daily movements are not backfilled yet (run backfill_daily_movements); "
+                               "reading stock_transactions instead")
+        return _backfilled
+
+    @staticmethod
+    def mark_backfilled():
+        """Record that every transaction so far is in the table (backfill_daily_movements)"""
+        dynamodb_service.put_item(TABLE_KEY, {**BACKFILLED_KEY, 'backfilled_at': datetime.now().isoformat()})
+
+    @classmethod
+    def rows_from_transactions(cls, start_date, end_date):
+        """The rows of [start_date, end_date] built from stock_transactions, sorted like stored rows"""
+        transactions = []
+        for op in MOVEMENT_OPERATIONS:
+            transactions.extend(find_items(
+                'stock_transactions', {'operation_type': op, 'date': between(start_date, end_date)}, use_cache=False
+            ))
+        return sorted(cls.build_rows(transactions).values(), key=lambda row: row['day_item'])
+
+    @staticmethod
+    def _stored_rows(start_date, end_date):
+        rows = []
+        for month in months_between(start_date, end_date):
+            rows.extend(dynamodb_service.query_table(
+                TABLE_KEY,
+                KeyConditionExpression=Key('month').eq(month) & Key('day_item').between(start_date, f"{end_date}#{_KEY_END}")
+            ))
+        return rows
+
+    @staticmethod
+    def dirty_dates(start_date, end_date):
+        rows = dynamodb_service.query_table(
+            TABLE_KEY, KeyConditionExpression=Key('month').eq(DIRTY_MONTH) & Key('day_item').between(start_date, end_date)
+        )
+        return {row['day_item'] for row in rows}
+
+    @classmethod
+    def clear_dirty(cls, dates):
+        for date_str in dates:
+            dynamodb_service.delete_item(TABLE_KEY, {'month': DIRTY_MONTH, 'day_item': date_str})
+
+    @classmethod
+    def rebuild_date(cls, date_str, stored):
+        """
+        The rows of a flagged date from stock_transactions. A finished date takes
+        no more transactions, so its rebuilt rows replace the stored ones (stored:
+        that date's current rows) and the flag is cleared.
+        """
+        rows = cls.rows_from_transactions(date_str, date_str)
+        if date_str < datetime.now().strftime('%Y-%m-%d'):
+            rebuilt = {row['day_item'] for row in rows}
+            stale = [
+                {'month': row['month'], 'day_item': row['day_item']} for row in stored if row['day_item'] not in rebuilt
+            ]
+            try:
+                dynamodb_service.batch_write_items(TABLE_KEY, rows, delete_keys=stale)
+                cls.clear_dirty([date_str])
+            except Exception as e:
+                logger.error(f"Error storing the rebuilt daily movements of {date_str}: {e}")
+        return rows
+
+    @classmethod
+    def get_range(cls, start_date, end_date):
+        """Rows for every item touched between start_date and end_date ("YYYY-MM-DD"), one query per month"""
+        if start_date > end_date:
+            return []
+        if not cls.is_backfilled():
+            return cls.rows_from_transactions(start_date, end_date)
+
+        rows = cls._stored_rows(start_date, end_date)
+        dirty = cls.dirty_dates(start_date, end_date)
+        if not dirty:
+            return rows
+        kept = [row for row in rows if row['date'] not in dirty]
+        for date_str in sorted(dirty):
+            kept.extend(cls.rebuild_date(date_str, [row for row in rows if row['date'] == date_str]))
+        return sorted(kept, key=lambda row: row['day_item'])
+
+    @staticmethod
+    def totals_by_item(rows):
+        """Sum rows into {item_id: {field: Decimal, 'suppliers': set}}, keeping only fields that occurred"""
+        totals = defaultdict(dict)
+        for row in rows:
+            entry = totals[row['item_id']]
+            for field in SUM_FIELDS:
+                if field in row:
+                    entry[field] = entry.get(field, Decimal('0')) + _dec(row[field])
+            if row.get('suppliers'):
+                entry['suppliers'] = entry.get('suppliers', set()) | set(row['suppliers'])
+        return totals
+
+
+transaction_hooks.register(DailyMovementService.record, on_failure=DailyMovementService.mark_dirty)
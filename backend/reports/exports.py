@@ -0,0 +1,321 @@
+"""
+Streaming CSV/XLSX exports.
+
+Rows are produced lazily (transactions page by page from DynamoDB, grids from
+the report cache) and encoded as they go, so memory stays flat and the first
+bytes leave immediately. XLSX files are zipped on the fly with inline strings,
+which needs no third-party writer.
+"""
+import csv
+import json
+import re
+import zipfile
+import logging
+from decimal import Decimal
+from datetime import datetime, date
+from xml.sax.saxutils import escape
+from boto3.dynamodb.conditions import Attr
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from backend.dynamodb_service import dynamodb_service
+from backend.serialization import DecimalEncoder
+from users.decorators import jwt_required
+from .report_cache import ReportResultCache
+from .balance_checkpoints import month_bounds
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'xlsx')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Rows encoded between two chunks handed to the server
+CHUNK_ROWS = 200
+
+TRANSACTION_COLUMNS = ['transaction_id', 'date', 'timestamp', 'operation_type', 'username', 'item_id', 'details']
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Echo:
+    """File-like object whose write() hands back what it was given, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+class _Chunks:
+    """Unseekable file that collects what zipfile writes until drained"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def csv_stream(header, rows):
+    """Yield a CSV file (with a BOM so Excel detects UTF-8) a chunk of rows at a time"""
+    writer = csv.writer(_Echo())
+    chunk = ['\ufeff' + writer.writerow(header)]
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _column(index):
+    """Spreadsheet column letters of a 0-based index"""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _xlsx_row(row_num, values):
+    cells = []
+    for col, value in enumerate(values):
+        ref = f"{_column(col)}{row_num}"
+        if value is None or value == '':
+            continue
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_INVALID_XML.sub('', str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_num}">{"".join(cells)}</row>'
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def xlsx_stream(header, rows, sheet_name='Sheet1'):
+    """Yield a single-sheet XLSX workbook, zipped as the rows are produced"""
+    out = _Chunks()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, content in _XLSX_PARTS.items():
+            zf.writestr(name, content)
+        zf.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield out.drain()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(1, header)
+            ).encode())
+            for row_num, row in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(row_num, row).encode())
+                if row_num % CHUNK_ROWS == 0:
+                    yield out.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield out.drain()
+
+
+def _guarded(chunks, label):
+    """Log a failure once streaming has started; the status line is already sent"""
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.error(f"Error streaming {label} export: {e}", exc_info=True)
+        raise
+
+
+def export_response(fmt, filename, header, rows, sheet_name='Sheet1'):
+    """StreamingHttpResponse downloading rows as filename.<fmt>"""
+    if fmt == 'xlsx':
+        chunks = xlsx_stream(header, rows, sheet_name)
+    else:
+        chunks = csv_stream(header, rows)
+    response = StreamingHttpResponse(_guarded(chunks, filename), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _params(request, body):
+    """Export parameters from the lambda body, a JSON POST or the GET query string"""
+    if body is not None:
+        return body
+    if request.method == 'GET':
+        return request.GET.dict()
+    return json.loads(request.body) if request.body else {}
+
+
+def _format(params):
+    fmt = str(params.get('format', 'csv')).strip().lower()
+    return fmt if fmt in FORMATS else None
+
+
+def transaction_rows(start_date=None, end_date=None, operation_type=None):
+    """Export rows of stock_transactions, read one DynamoDB page at a time"""
+    conditions = []
+    if start_date:
+        conditions.append(Attr('date').gte(start_date))
+    if end_date:
+        conditions.append(Attr('date').lte(end_date))
+    if operation_type:
+        conditions.append(Attr('operation_type').eq(operation_type))
+
+    scan_kwargs = {}
+    if conditions:
+        filter_expression = conditions[0]
+        for condition in conditions[1:]:
+            filter_expression &= condition
+        scan_kwargs['FilterExpression'] = filter_expression
+
+    for page in dynamodb_service.iter_scan('stock_transactions', plain=True, **scan_kwargs):
+        for tx in page:
+            details = tx.get('details') or {}
+            yield [
+                tx.get('transaction_id', ''),
+                tx.get('date', ''),
+                tx.get('timestamp', ''),
+                tx.get('operation_type', ''),
+                tx.get('username', ''),
+                details.get('item_id', '') if isinstance(details, dict) else '',
+                json.dumps(details, cls=DecimalEncoder, sort_keys=True),
+            ]
+
+
+def grid_rows(payload, days):
+    """Export rows of a monthly inward/outward grid payload, one per item"""
+    days_key = 'inward_days' if payload['type'] == 'INWARD' else 'outward_days'
+    total_key = 'total_inward' if payload['type'] == 'INWARD' else 'total_outward'
+    for group_name in sorted(payload['grid_data']):
+        for entry in sorted(payload['grid_data'][group_name], key=lambda e: e.get('item_name') or ''):
+            per_day = entry.get(days_key, {})
+            yield (
+                [group_name, entry['item_id'], entry.get('item_name', ''), entry.get('opening_balance', 0)]
+                + [per_day.get(str(day), '') for day in range(1, days + 1)]
+                + [entry.get(total_key, 0)]
+            )
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@jwt_required
+def export_stock_transactions(request, body=None):
+    """Stream stock_transactions as CSV/XLSX, optionally limited by date range and operation"""
+    try:
+        params = _params(request, body)
+        fmt = _format(params)
+        if not fmt:
+            return JsonResponse({"error": "'format' must be 'csv' or 'xlsx'"}, status=400)
+
+        start_date = (params.get('start_date') or '').strip() or None
+        end_date = (params.get('end_date') or '').strip() or None
+        for value in filter(None, (start_date, end_date)):
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return JsonResponse({"error": "Dates must be in format YYYY-MM-DD"}, status=400)
+        operation_type = (params.get('operation_type') or '').strip() or None
+
+        filename = f"stock_transactions_{start_date or 'start'}_{end_date or date.today().isoformat()}"
+        return export_response(
+            fmt, filename, TRANSACTION_COLUMNS,
+            transaction_rows(start_date, end_date, operation_type), sheet_name='Transactions'
+        )
+
+    except Exception as e:
+        logger.error(f"Error in export_stock_transactions: {e}", exc_info=True)
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@jwt_required
+def export_monthly_grid(request, body=None):
+    """Stream the monthly inward or outward grid as CSV/XLSX"""
+    from .views import compute_monthly_inward_grid, compute_monthly_outward_grid
+
+    try:
+        params = _params(request, body)
+        fmt = _format(params)
+        if not fmt:
+            return JsonResponse({"error": "'format' must be 'csv' or 'xlsx'"}, status=400)
+
+        grid_type = str(params.get('type', '')).strip().lower()
+        if grid_type not in ('inward', 'outward'):
+            return JsonResponse({"error": "'type' must be 'inward' or 'outward'"}, status=400)
+
+        month_str = params.get('month')
+        if not isinstance(month_str, str):
+            return JsonResponse({"error": "'month' parameter is required in format YYYY-MM"}, status=400)
+        month_str = month_str.strip()
+        try:
+            datetime.strptime(month_str, '%Y-%m')
+        except ValueError:
+            return JsonResponse({"error": "'month' must be in format YYYY-MM"}, status=400)
+
+        start_date, end_date = month_bounds(month_str)
+        compute = compute_monthly_inward_grid if grid_type == 'inward' else compute_monthly_outward_grid
+        payload = ReportResultCache.get_or_compute(
+            f"monthly_{grid_type}_grid", {"month": month_str}, start_date, end_date,
+            lambda: compute(month_str)
+        )
+
+        days = int(end_date[-2:])
+        header = ['Group', 'Item ID', 'Item Name', 'Opening Balance'] + [str(d) for d in range(1, days + 1)] + ['Total']
+        return export_response(
+            fmt, f"{grid_type}_grid_{month_str}", header, grid_rows(payload, days),
+            sheet_name=f"{grid_type.title()} {month_str}"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in export_monthly_grid: {e}", exc_info=True)
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
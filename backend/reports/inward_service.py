@@ -5,9 +5,10 @@ Handles inward stock reporting with group hierarchy nesting
 import logging
 from decimal import Decimal
 from datetime import datetime, timedelta
-from collections import defaultdict
 from backend.dynamodb_service import dynamodb_service
-from boto3.dynamodb.conditions import Attr
+from production.product_service import ProductService
+from .daily_movements import DailyMovementService
+from .services import batch_get_group_chains
 
 logger = logging.getLogger(__name__)
 
@@ -15,83 +16,65 @@ class InwardService:
     """Service class for inward stock reporting - exact Lambda port"""
     
     @staticmethod
-    def _get_inward_data(start_date, end_date):
+    def _inward_rows(start_date, end_date):
+        """One date-range read of the per-item daily aggregates that carry inward stock"""
+        start_str = datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        end_str = datetime.strptime(end_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        return [row for row in DailyMovementService.get_range(start_str, end_str) if 'inward_qty' in row]
+    
+    @staticmethod
+    def _to_record(row, stock_item):
+        """Inward summary for one item on one date - exact Lambda format"""
+        return {
+            "stock_name": stock_item.get("name", row["item_id"]) if stock_item else row["item_id"],
+            "existing_quantity": float(row.get("existing_quantity", 0)),
+            "inward_quantity": float(row["inward_qty"]),
+            "new_quantity": float(row.get("new_quantity", 0)),
+            "gst_percentage": float(row.get("gst_percentage", 0)),
+            "gst_amount": float(row.get("gst_amount", 0)),
+            "added_cost": float(row.get("inward_cost", 0)),
+            "date": row["date"]
+        }
+    
+    @classmethod
+    def _get_inward_data(cls, start_date, end_date):
         """
         Aggregates inward stock data per item per date.
         Shows only stock name, quantities, cost and date.
-        Exact port from Lambda _get_inward_data function.
+        Returns { "YYYY-MM-DD": [ {...}, ... ] } like the Lambda _get_inward_data function.
         """
-        result = {}
-        
-        # Format dates
-        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-        start_str = start_dt.strftime("%Y-%m-%d")
-        end_str = end_dt.strftime("%Y-%m-%d")
+        rows = cls._inward_rows(start_date, end_date)
+        stock_map = ProductService.get_stock_items([row["item_id"] for row in rows])
         
-        # Scan AddStockQuantity transactions - exact Lambda filter
-        transactions = dynamodb_service.scan_table(
-            'stock_transactions',
-            FilterExpression=Attr("operation_type").eq("AddStockQuantity") & Attr("date").between(start_str, end_str)
-        )
-        
-        # Aggregate by date and item - exact Lambda logic
-        aggregated = defaultdict(lambda: defaultdict(lambda: {
-            "stock_name": "",
-            "inward_quantity": 0,
-            "added_cost": 0,
-            "gst_percentage": 0,
-            "gst_amount": 0,
-            "existing_quantity": None,
-            "new_quantity": None
+        result = {}
+        for row in rows:
+            result.setdefault(row["date"], []).append(cls._to_record(row, stock_map.get(row["item_id"])))
+        return result
+    
+    @classmethod
+    def _get_nested_inward(cls, start_date, end_date):
+        """
+        Inward records nested as { date: { group: { subgroup: [records…] } } }.
+        Batched join: one range read of inward rows, one batched STOCK lookup by
+        item_id and group chains resolved in memory from a single GROUPS read.
+        """
+        rows = cls._inward_rows(start_date, end_date)
+        stock_map = ProductService.get_stock_items([row["item_id"] for row in rows])
+        group_chains = batch_get_group_chains(list({
+            item["group_id"] for item in stock_map.values() if item.get("group_id")
         }))
         
-        for txn in transactions:
-            date_str = txn.get("date")
-            if not date_str:
-                continue
-                
-            details = txn.get("details", {})
-            item_id = details.get("item_id")
-            quantity_added = float(details.get("quantity_added", 0))
-            new_available = float(details.get("new_available", 0))
-            added_cost = float(details.get("added_cost", 0))
-            existing_qty = new_available - quantity_added
-            
-            # Fetch stock name from stock table - exact Lambda lookup
-            stock_item = dynamodb_service.get_item('STOCK', {"item_id": item_id})
-            stock_name = stock_item.get("name", item_id) if stock_item else item_id
-            
-            # Extract GST details from transaction
-            gst_percentage = float(details.get("gst_percentage", 0))
-            gst_amount = float(details.get("gst_amount", 0))
-            
-            item = aggregated[date_str][item_id]
-            item["stock_name"] = stock_name
-            item["inward_quantity"] += quantity_added
-            item["added_cost"] += added_cost
-            item["gst_percentage"] = gst_percentage
-            item["gst_amount"] += gst_amount
-            item["new_quantity"] = new_available
-            if item["existing_quantity"] is None:
-                item["existing_quantity"] = existing_qty
-        
-        # Flatten into result[date] = [list of stock inward summaries] - exact Lambda format
-        for date_str, items in aggregated.items():
-            result[date_str] = []
-            for item_id, data in items.items():
-                result[date_str].append({
-                    "stock_name": data["stock_name"],
-                    "existing_quantity": data["existing_quantity"],
-                    "inward_quantity": data["inward_quantity"],
-                    "new_quantity": data["new_quantity"],
-                    "gst_percentage": data["gst_percentage"],
-                    "gst_amount": data["gst_amount"],
-                    "added_cost": data["added_cost"],
-                    "date": date_str
-                })
-        
-        return result
+        nested = {}
+        for row in rows:
+            stock_item = stock_map.get(row["item_id"])
+            group_id = stock_item.get("group_id") if stock_item else None
+            chain = group_chains.get(group_id, []) if group_id else []
+            grp = chain[0] if len(chain) >= 1 else "Unknown"
+            sub = chain[1] if len(chain) >= 2 else "Unknown"
+            nested.setdefault(row["date"], {}).setdefault(grp, {}).setdefault(sub, []).append(
+                cls._to_record(row, stock_item)
+            )
+        return nested
     
     @staticmethod
     def get_group_chain(group_id):
@@ -128,31 +111,8 @@ class InwardService:
                 raise ValueError("report_date must be a string")
             report_date = report_date.strip()
             
-            # 2) Fetch raw inward data for that single day - exact Lambda call
-            raw = cls._get_inward_data(report_date, report_date)  # { "YYYY-MM-DD": [ {...}, ... ] }
-            
-            # 3) Lookup groups & nest - exact Lambda logic
-            nested = {}
-            for dt, records in raw.items():
-                grouped = {}
-                for rec in records:
-                    # Find the stock item to get group_id - exact Lambda lookup
-                    stock_items = dynamodb_service.scan_table(
-                        'STOCK',
-                        FilterExpression=Attr("name").eq(rec["stock_name"])
-                    )
-                    item = stock_items[0] if stock_items else None
-                    group_id = item.get("group_id") if item else None
-                    
-                    # Build chain - exact Lambda chain building
-                    chain = cls.get_group_chain(group_id) if group_id else []
-                    grp = chain[0] if len(chain) >= 1 else "Unknown"
-                    sub = chain[1] if len(chain) >= 2 else "Unknown"
-                    
-                    # Nest under grouped[grp][sub] - exact Lambda nesting
-                    grouped.setdefault(grp, {}).setdefault(sub, []).append(rec)
-                
-                nested[dt] = grouped
+            # 2) Fetch, join and nest that single day's inward data
+            nested = cls._get_nested_inward(report_date, report_date)
             
             # 4) Return - exact Lambda payload format
             payload = {
@@ -186,34 +146,17 @@ class InwardService:
             sd_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
             ed_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
             
-            # 2) Fetch raw inward data for the range - exact Lambda call
-            raw = cls._get_inward_data(start_date, end_date)  # { date: [ {...}, ... ] }
-            
-            # 3) Initialize nested structure with all dates in range - exact Lambda logic
+            # 2) Initialize nested structure with all dates in range - exact Lambda logic
             nested = {}
             cur = sd_dt
             while cur <= ed_dt:
                 nested[cur.strftime("%Y-%m-%d")] = {}
                 cur += timedelta(days=1)
             
-            # 4) Enrich and group - exact Lambda logic
-            for dt, recs in raw.items():
-                for rec in recs:
-                    item_id = rec["stock_name"]  # Note: Lambda uses stock_name as lookup key
-                    
-                    # Lookup group_id by item_id - exact Lambda lookup
-                    stock_item = dynamodb_service.get_item('STOCK', {"item_id": item_id})
-                    group_id = stock_item.get("group_id") if stock_item else None
-                    
-                    # Build group chain - exact Lambda chain building
-                    chain = cls.get_group_chain(group_id) if group_id else []
-                    grp = chain[0] if len(chain) >= 1 else "Unknown"
-                    sub = chain[1] if len(chain) >= 2 else "Unknown"
-                    
-                    # Insert rec under nested[dt][grp][sub] - exact Lambda nesting
-                    nested.setdefault(dt, {}).setdefault(grp, {}).setdefault(sub, []).append(rec)
+            # 3) Fetch, join and nest the range with the same engine as the daily report
+            nested.update(cls._get_nested_inward(start_date, end_date))
             
-            # 5) Compute grand totals - exact Lambda calculation
+            # 4) Compute grand totals - exact Lambda calculation
             total_qty = 0
             total_amt = Decimal("0")
             for dt_recs in nested.values():
@@ -223,7 +166,7 @@ class InwardService:
                             total_qty += rec.get("inward_quantity", 0)
                             total_amt += Decimal(str(rec.get("added_cost", 0)))
             
-            # 6) Return payload - exact Lambda format
+            # 5) Return payload - exact Lambda format
             payload = {
                 "report_period": {
                     "start_date": start_date,
@@ -0,0 +1,116 @@
+"""
+Per-item movement index, maintained on the write path.
+
+ITEM_MOVEMENTS holds one row per (item, transaction), keyed by item_id
+(partition) and "timestamp#transaction_id" (sort). Single-item operations
+copy their details; a PushToProduction is fanned out into one row per
+material it deducted. An item's history in a date range is then one Query.
+"""
+import json
+import base64
+import logging
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from backend.dynamodb_service import dynamodb_service
+from . import transaction_hooks
+
+logger = logging.getLogger(__name__)
+
+TABLE_KEY = 'ITEM_MOVEMENTS'
+
+# Sorts after every "<timestamp>#<transaction_id>" of a day
+_KEY_END = '\uffff'
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Query key encoded by encode_cursor(); ValueError when the cursor is not one"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict) or set(key) != {'item_id', 'ts_txn'}:
+        raise ValueError("Invalid cursor")
+    return key
+
+
+class ItemMovementService:
+    """Builds, stores and reads the per-item movement rows"""
+
+    @staticmethod
+    def rows_for(transaction):
+        """The movement rows of one transaction, one per item it touched"""
+        timestamp = transaction.get('timestamp')
+        details = transaction.get('details') or {}
+        if not timestamp or not isinstance(details, dict):
+            return []
+
+        base = {
+            'transaction_id': transaction['transaction_id'],
+            'date': transaction.get('date', timestamp[:10]),
+            'timestamp': timestamp,
+            'operation_type': transaction.get('operation_type', ''),
+            'username': transaction.get('username', ''),
+        }
+        ts_txn = f"{timestamp}#{transaction['transaction_id']}"
+
+        if transaction.get('operation_type') == 'PushToProduction':
+            return [
+                {
+                    **base,
+                    'item_id': item_id,
+                    'ts_txn': ts_txn,
+                    'details': {
+                        'push_id': details.get('push_id', ''),
+                        'product_id': details.get('product_id', ''),
+                        'product_name': details.get('product_name', ''),
+                        'quantity_produced': details.get('quantity_produced', Decimal('0')),
+                        'quantity_consumed': quantity,
+                    }
+                }
+                for item_id, quantity in (details.get('deductions') or {}).items()
+            ]
+
+        item_id = details.get('item_id')
+        if not isinstance(item_id, str) or not item_id:
+            return []
+        return [{**base, 'item_id': item_id, 'ts_txn': ts_txn, 'details': details}]
+
+    @classmethod
+    def record(cls, transaction):
+        """Index a freshly logged transaction under every item it touched"""
+        rows = cls.rows_for(transaction)
+        if rows:
+            dynamodb_service.batch_write_items(TABLE_KEY, rows)
+
+    @staticmethod
+    def history(item_id, date_from=None, date_to=None, newest_first=False, limit=None, cursor=None):
+        """
+        Movement rows of an item between "YYYY-MM-DD" dates, ordered by timestamp.
+        With limit, one page is read and (rows, next_cursor) resumes it; otherwise
+        every row is returned and next_cursor is None.
+        """
+        condition = Key('item_id').eq(item_id)
+        if date_from and date_to:
+            condition &= Key('ts_txn').between(date_from, date_to + _KEY_END)
+        elif date_from:
+            condition &= Key('ts_txn').gte(date_from)
+        elif date_to:
+            condition &= Key('ts_txn').lte(date_to + _KEY_END)
+
+        kwargs = {'KeyConditionExpression': condition, 'ScanIndexForward': not newest_first}
+        if not limit:
+            return dynamodb_service.query_table(TABLE_KEY, **kwargs), None
+
+        kwargs['Limit'] = limit
+        if cursor:
+            kwargs['ExclusiveStartKey'] = decode_cursor(cursor)
+        response = dynamodb_service.query_page(TABLE_KEY, **kwargs)
+        last_key = response.get('LastEvaluatedKey')
+        return response.get('Items', []), encode_cursor(last_key) if last_key else None
+
+
+transaction_hooks.register(ItemMovementService.record)
@@ -0,0 +1,74 @@
+from boto3.dynamodb.conditions import Attr
+from django.core.management.base import BaseCommand
+from backend.dynamodb_service import dynamodb_service
+from reports.balance_checkpoints import BalanceCheckpointService
+from reports.daily_movements import DailyMovementService, MOVEMENT_OPERATIONS, TABLE_KEY
+from reports.period_rollups import PeriodRollupService
+from reports.report_cache import ReportResultCache
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the per-(date, item) movement aggregates from stock_transactions. '
+            'Rows in the range are replaced, so run it while no stock is being moved. '
+            'A run over all history marks the table as backfilled; until then reports read stock_transactions.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='First date to rebuild (YYYY-MM-DD); default is all history')
+        parser.add_argument('--end-date', help='Last date to rebuild (YYYY-MM-DD); default is all history')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be written without writing'
+        )
+
+    def handle(self, *args, **options):
+        start_date = options['start_date']
+        end_date = options['end_date']
+
+        filter_expression = Attr('operation_type').is_in(list(MOVEMENT_OPERATIONS))
+        if start_date:
+            filter_expression &= Attr('date').gte(start_date)
+        if end_date:
+            filter_expression &= Attr('date').lte(end_date)
+
+        # Read first: a date flagged while the scan runs keeps its flag
+        dirty = DailyMovementService.dirty_dates(start_date or '0000-00-00', end_date or '9999-99-99')
+
+        transactions = dynamodb_service.scan_table('stock_transactions', use_cache=False, FilterExpression=filter_expression)
+        rows = DailyMovementService.build_rows(transactions)
+        self.stdout.write(f'Aggregated {len(transactions)} transaction(s) into {len(rows)} daily row(s)')
+
+        # Rows in the range with no transactions behind them are stale; "#" partitions are markers
+        existing = [
+            row for row in dynamodb_service.scan_table(TABLE_KEY, use_cache=False)
+            if not row['month'].startswith('#')
+        ]
+        stale = [
+            {'month': row['month'], 'day_item': row['day_item']}
+            for row in existing
+            if (not start_date or row['date'] >= start_date)
+            and (not end_date or row['date'] <= end_date)
+            and (row['date'], row['item_id']) not in rows
+        ]
+        months = {date_str[:7] for date_str, _ in rows} | {key['month'] for key in stale}
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Would write {len(rows)} row(s), delete {len(stale)} stale row(s) and clear {len(dirty)} flagged date(s)'
+            ))
+            return
+
+        dynamodb_service.batch_write_items(TABLE_KEY, list(rows.values()), delete_keys=stale)
+        DailyMovementService.clear_dirty(dirty)
+        # Rollups of closed months were summed from the rows just replaced
+        for month in sorted(months):
+            PeriodRollupService.invalidate(f'{month}-01')
+        # So were the closing balances derived from them; close_stock_month persists them again
+        dropped = BalanceCheckpointService.invalidate(start_date)
+        if not start_date and not end_date:
+            DailyMovementService.mark_backfilled()
+        ReportResultCache.touch_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(rows)} row(s), deleted {len(stale)} stale row(s), cleared {len(dirty)} flagged date(s), '
+            f'dropped {dropped} balance checkpoint(s)'
+        ))
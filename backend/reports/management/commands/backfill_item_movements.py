@@ -0,0 +1,40 @@
+from boto3.dynamodb.conditions import Attr
+from django.core.management.base import BaseCommand
+from backend.dynamodb_service import dynamodb_service
+from reports.item_movements import ItemMovementService, TABLE_KEY
+
+
+class Command(BaseCommand):
+    help = 'Index existing stock_transactions into the per-item movement table (safe to rerun)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='First date to index (YYYY-MM-DD); default is all history')
+        parser.add_argument('--end-date', help='Last date to index (YYYY-MM-DD); default is all history')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be written without writing'
+        )
+
+    def handle(self, *args, **options):
+        scan_kwargs = {}
+        if options['start_date'] or options['end_date']:
+            filter_expression = Attr('date').exists()
+            if options['start_date']:
+                filter_expression &= Attr('date').gte(options['start_date'])
+            if options['end_date']:
+                filter_expression &= Attr('date').lte(options['end_date'])
+            scan_kwargs['FilterExpression'] = filter_expression
+
+        transactions = 0
+        written = 0
+        # One scan page at a time, so the whole table is never held in memory
+        for page in dynamodb_service.iter_scan('stock_transactions', **scan_kwargs):
+            rows = [row for txn in page for row in ItemMovementService.rows_for(txn)]
+            transactions += len(page)
+            if rows and not options['dry_run']:
+                dynamodb_service.batch_write_items(TABLE_KEY, rows)
+            written += len(rows)
+
+        verb = 'Would write' if options['dry_run'] else 'Wrote'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {written} movement row(s) for {transactions} transaction(s)'))
@@ -0,0 +1,64 @@
+from boto3.dynamodb.conditions import Attr
+from django.core.management.base import BaseCommand
+from backend.dynamodb_service import dynamodb_service
+from backend.index_registry import index_registry
+from reports.transaction_listing import transaction_month
+
+
+class Command(BaseCommand):
+    help = 'Create the MonthTimestampIndex GSI on stock_transactions and backfill month on existing records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skip-index',
+            action='store_true',
+            help='Only backfill attributes, do not create the GSI'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be updated without writing'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if not options['skip_index']:
+            self.ensure_index(dry_run)
+
+        records = dynamodb_service.scan_table(
+            'stock_transactions',
+            use_cache=False,
+            FilterExpression=Attr('month').not_exists(),
+            ProjectionExpression='transaction_id, #ts',
+            ExpressionAttributeNames={'#ts': 'timestamp'}
+        )
+        self.stdout.write(f'Found {len(records)} transaction(s) without month')
+
+        updated = 0
+        for record in records:
+            timestamp = record.get('timestamp')
+            if not timestamp:
+                self.stdout.write(self.style.WARNING(f"Skipping {record.get('transaction_id')}: no timestamp"))
+                continue
+            if not dry_run:
+                dynamodb_service.update_item(
+                    'stock_transactions',
+                    {'transaction_id': record['transaction_id']},
+                    'SET #month = :month',
+                    {':month': transaction_month(timestamp)},
+                    ExpressionAttributeNames={'#month': 'month'}
+                )
+            updated += 1
+
+        verb = 'Would update' if dry_run else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {updated} transaction(s)'))
+
+    def ensure_index(self, dry_run):
+        for _, name, status in index_registry.ensure(create=not dry_run, table_keys=['stock_transactions']):
+            if status == 'MISSING':
+                self.stdout.write(f'Would create {name}')
+            elif status == 'CREATING':
+                self.stdout.write(self.style.SUCCESS(f'Creation of {name} started; it becomes queryable once ACTIVE'))
+            else:
+                self.stdout.write(f'{name}: {status}')
@@ -0,0 +1,44 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from backend.dynamodb_service import dynamodb_service
+from reports.balance_checkpoints import BalanceCheckpointService, shift_month, month_bounds
+from reports.period_rollups import PeriodRollupService, fiscal_year
+from reports.report_cache import ReportResultCache
+
+
+class Command(BaseCommand):
+    help = ('Persist per-item closing-balance checkpoints and the movement rollup of a finished month, '
+            'and of its fiscal year when the month is March (run at month rollover)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to close (YYYY-MM); defaults to the previous month')
+        parser.add_argument(
+            '--recompute',
+            action='store_true',
+            help='Rebuild every checkpoint of the month from live stock instead of filling gaps'
+        )
+
+    def handle(self, *args, **options):
+        month = options['month'] or shift_month(datetime.now().strftime('%Y-%m'), -1)
+        try:
+            datetime.strptime(month, '%Y-%m')
+        except ValueError:
+            raise CommandError("'--month' must be in YYYY-MM format")
+        if month_bounds(month)[1] >= datetime.now().strftime('%Y-%m-%d'):
+            raise CommandError(f'{month} has not finished yet')
+
+        stock_items = dynamodb_service.scan_table('STOCK', use_cache=False)
+        balances = BalanceCheckpointService.closing_balances(
+            month, stock_items, recompute=options['recompute'], persist=True
+        )
+        if options['recompute']:
+            # Every later month's opening balances may have moved
+            ReportResultCache.touch_catalog()
+        self.stdout.write(self.style.SUCCESS(f'{month} closed with {len(balances)} item checkpoint(s)'))
+
+        totals = PeriodRollupService.finalize_month(month)
+        self.stdout.write(self.style.SUCCESS(f'{month} rolled up for {len(totals)} item(s)'))
+        if month.endswith('-03'):
+            fy = fiscal_year(month)
+            totals = PeriodRollupService.finalize_fiscal_year(fy)
+            self.stdout.write(self.style.SUCCESS(f'{fy} rolled up for {len(totals)} item(s)'))
@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from backend.index_registry import index_registry
+
+
+class Command(BaseCommand):
+    help = 'Verify the registered DynamoDB GSIs and create the missing ones (run at deploy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report index status, do not create anything'
+        )
+        parser.add_argument(
+            '--wait',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Wait up to SECONDS for every index to become ACTIVE'
+        )
+
+    def handle(self, *args, **options):
+        report = index_registry.ensure(create=not options['check'])
+        deadline = time.monotonic() + options['wait']
+        while options['wait'] and any(status != 'ACTIVE' for _, _, status in report) and time.monotonic() < deadline:
+            time.sleep(10)
+            report = index_registry.ensure(create=not options['check'])
+
+        for table_key, name, status in report:
+            line = f'{table_key}.{name}: {status}'
+            if status == 'ACTIVE':
+                self.stdout.write(self.style.SUCCESS(line))
+            elif status.startswith('ERROR'):
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(self.style.WARNING(line))
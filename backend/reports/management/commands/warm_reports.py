@@ -0,0 +1,32 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from reports.report_warmer import ReportWarmer
+
+
+class Command(BaseCommand):
+    help = ("Pre-compute today's, the last 7 days' and this month's reports into the report cache "
+            "(schedule it from cron, e.g. every 5 minutes)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Warm the periods around this date (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        now = None
+        if options['date']:
+            try:
+                now = datetime.strptime(options['date'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError("'--date' must be in YYYY-MM-DD format")
+
+        failed = 0
+        for name, error in ReportWarmer.warm(now):
+            if error:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'{name}: {error}'))
+            else:
+                self.stdout.write(f'{name}: warmed')
+
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} report(s) could not be warmed'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All reports warmed'))
@@ -12,18 +12,14 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
+from backend.serialization import ResponseEncoder
+from backend.query_planner import find_items
 import logging
 
 logger = logging.getLogger(__name__)
 
 dynamodb = boto3.resource('dynamodb', region_name=settings.AWS_REGION)
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        return super().default(o)
-
 def get_group_chain(group_id):
     chain = []
     tbl = dynamodb.Table('Groups')
@@ -94,9 +90,7 @@ def extract_consumption_details(transactions):
 
 def get_existing_stock_record(operation, report_date):
     try:
-        tbl = dynamodb.Table('stock_transactions')
-        resp = tbl.scan(FilterExpression=Attr('operation_type').eq(operation) & Attr('date').eq(report_date))
-        items = resp.get('Items', [])
+        items = find_items('stock_transactions', {'operation_type': operation, 'date': report_date}, use_cache=False)
         if items:
             return min(items, key=lambda x: x.get('timestamp', ''))
         return None
@@ -179,55 +173,9 @@ def compute_item_rows_and_totals(start_date, end_date):
     return rows, totals
 
 def _build_transactions_section_without_opening(start_date, end_date):
-    tx_table = dynamodb.Table('stock_transactions')
-    tx_section = {}
-    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-    end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-
-    for n in range((end_dt - start_dt).days + 1):
-        day = (start_dt + timedelta(days=n)).strftime('%Y-%m-%d')
-        response = tx_table.scan(FilterExpression=Attr('date').eq(day))
-        txs = response.get('Items', [])
-
-        for tx in txs:
-            details = tx.get('details')
-            if isinstance(details, dict):
-                details.pop('per_item_opening', None)
-                details.pop('per_item_closing', None)
-
-        inward_qty = 0
-        inward_amt = 0
-        consumed_qty = 0
-        consumed_amt = 0
-        balance_qty = 0
-        balance_amt = 0
-
-        for tx in txs:
-            op = tx.get('operation_type', '') or tx.get('operation', '')
-            qty = float(tx.get('qty', 0))
-            amt = float(tx.get('amount', 0.0))
-
-            if op == 'Inward':
-                inward_qty += qty
-                inward_amt += amt
-            elif op == 'Consume':
-                consumed_qty += qty
-                consumed_amt += amt
-            elif op == 'SaveClosingStock':
-                balance_qty += qty
-                balance_amt += amt
-
-        tx_section[day] = {
-            'operations': txs,
-            'inward_qty': inward_qty,
-            'inward_amount': inward_amt,
-            'consumption_qty': consumed_qty,
-            'consumption_amount': consumed_amt,
-            'balance_qty': balance_qty,
-            'balance_amount': balance_amt
-        }
-
-    return tx_section
+    """Single range read bucketed by day - shared with the optimized reports"""
+    from .optimized_normal_reports import build_transactions_section
+    return build_transactions_section(start_date, end_date)
 
 @csrf_exempt
 @require_http_methods(['POST'])
@@ -371,7 +319,7 @@ def get_daily_report_old(request):
             'group_summary': group_summary_list
         }
 
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        return JsonResponse(payload, encoder=ResponseEncoder)
 
     except Exception as e:
         logger.error(f'Error in get_daily_report: {e}', exc_info=True)
@@ -478,7 +426,7 @@ def get_weekly_report_old(request):
             'transactions': tx_section,
             'group_summary': group_summary_list
         }
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        return JsonResponse(payload, encoder=ResponseEncoder)
 
     except Exception as e:
         logger.error(f'Error in get_weekly_report: {e}', exc_info=True)
@@ -602,7 +550,7 @@ def get_monthly_report_old(request):
             'items': items_with_totals,
             'group_summary': group_summary_list
         }
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        return JsonResponse(payload, encoder=ResponseEncoder)
 
     except Exception as e:
         logger.error(f'Error in get_monthly_report: {e}', exc_info=True)
@@ -11,71 +11,35 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.cache import cache
 from backend.dynamodb_service import dynamodb_service
-from boto3.dynamodb.conditions import Attr
+from backend.fetch_planner import FetchPlan
+from backend.serialization import ResponseEncoder
+from .report_inputs import ReportInputs
+from .report_cache import ReportResultCache
 import logging
 
 logger = logging.getLogger(__name__)
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        return super().default(o)
-
-def extract_consumption_details(transactions):
-    details = []
-    for tx in transactions:
-        op = tx.get('operation_type')
-        if op == 'PushToProduction':
-            d = tx.get('details', {})
-            for item_id, qty in d.get('deductions', {}).items():
-                details.append({
-                    'item_id': item_id,
-                    'quantity_consumed': Decimal(str(qty)),
-                    'timestamp': tx.get('timestamp', '')
-                })
-        elif op == 'AddDefectiveGoods':
-            d = tx.get('details', {})
-            details.append({
-                'item_id': d.get('item_id', 'Unknown'),
-                'quantity_consumed': Decimal(str(d.get('defective_added', 0))),
-                'timestamp': tx.get('timestamp', '')
-            })
-    return details
-
-def compute_item_rows_and_totals(start_date, end_date):
+def compute_item_rows_and_totals(start_date, end_date, inputs=None):
     """Optimized computation with batch operations"""
-    # Batch get all stock items
-    stock_items = dynamodb_service.scan_table('STOCK')
+    inputs = inputs or ReportInputs()
+
+    # Stock items, per-item movement totals over the range and the opening snapshot, read concurrently
+    data = (FetchPlan()
+            .add('stock_items', inputs.stock_items)
+            .add('totals', inputs.movement_totals, start_date, end_date)
+            .add('opening_txns', inputs.opening_transactions, start_date)
+            .run())
+    stock_items = data['stock_items']
     stock_map = {it['item_id']: Decimal(str(it.get('cost_per_unit', 0))) for it in stock_items}
     
-    # Get transactions in range
-    txns = dynamodb_service.scan_table(
-        'stock_transactions',
-        FilterExpression=Attr('date').between(start_date, end_date)
-    )
-    
-    # Process inward
-    inward_map = defaultdict(Decimal)
-    for t in txns:
-        if t.get('operation_type') == 'AddStockQuantity':
-            details = t.get('details', {})
-            item_id = details.get('item_id')
-            qty_added = Decimal(str(details.get('quantity_added', 0)))
-            inward_map[item_id] += qty_added
-    
-    # Process consumption
-    consumption_details = extract_consumption_details(txns)
-    consumption_map = defaultdict(Decimal)
-    for d in consumption_details:
-        consumption_map[d['item_id']] += d['quantity_consumed']
+    # Per-item inward and consumption over the range
+    totals = data['totals']
+    inward_map = {item_id: t['inward_qty'] for item_id, t in totals.items() if 'inward_qty' in t}
+    consumption_map = {item_id: t['consumption_qty'] for item_id, t in totals.items() if 'consumption_qty' in t}
     
     # Get opening stock
     opening_map = defaultdict(lambda: Decimal('0'))
-    opening_txns = dynamodb_service.scan_table(
-        'stock_transactions',
-        FilterExpression=Attr('operation_type').eq('SaveOpeningStock') & Attr('date').eq(start_date)
-    )
+    opening_txns = data['opening_txns']
     if opening_txns:
         opening_record = min(opening_txns, key=lambda x: x.get('timestamp', ''))
         for entry in opening_record.get('details', {}).get('per_item_opening', []):
@@ -123,20 +87,17 @@ def compute_item_rows_and_totals(start_date, end_date):
     
     return rows, totals
 
-def build_transactions_section(start_date, end_date):
-    """Optimized transaction section building"""
+def build_transactions_section(start_date, end_date, inputs=None):
+    """Transactions section from a single range read, bucketed by day in one pass"""
+    inputs = inputs or ReportInputs()
     start_dt = datetime.strptime(start_date, '%Y-%m-%d')
     end_dt = datetime.strptime(end_date, '%Y-%m-%d')
     
-    # Get all transactions in range at once
-    txns = dynamodb_service.scan_table(
-        'stock_transactions',
-        FilterExpression=Attr('date').between(start_date, end_date)
-    )
+    txns = inputs.section_transactions(start_date, end_date)
     
-    # Group by date
+    # Group by date, oldest first (segments of a parallel scan come back interleaved)
     txns_by_date = defaultdict(list)
-    for tx in txns:
+    for tx in sorted(txns, key=lambda t: t.get('timestamp', '')):
         tx_date = tx.get('date')
         if tx_date:
             details = tx.get('details')
@@ -182,15 +143,15 @@ def build_transactions_section(start_date, end_date):
 
 def enrich_with_groups(items):
     """Batch enrich items with group information"""
-    # Get cached groups
-    cache_key = "all_groups_stock_map"
+    # Get cached groups, renewed whenever the catalog changes
+    cache_key = f"all_groups_stock_map:{ReportResultCache.catalog_version()}"
     cached = cache.get(cache_key)
     
     if cached:
         stock_items, groups = cached
     else:
-        stock_items = dynamodb_service.scan_table('STOCK')
-        groups = dynamodb_service.scan_table('GROUPS')
+        stock_items = dynamodb_service.scan_table('STOCK', use_cache=False)
+        groups = dynamodb_service.scan_table('GROUPS', use_cache=False)
         cache.set(cache_key, (stock_items, groups), 600)
     
     name_to_group_id = {
@@ -284,6 +245,22 @@ def build_summaries(items):
     
     return items_with_totals, group_summary_list
 
+def compute_daily_report(rd, inputs=None):
+    """Normal report for one day"""
+    items, _ = compute_item_rows_and_totals(rd, rd, inputs)
+    tx_section = build_transactions_section(rd, rd, inputs)
+    enrich_with_groups(items)
+    items_with_totals, group_summary_list = build_summaries(items)
+
+    payload = {
+        'report_period': {'start_date': rd, 'end_date': rd},
+        'items': items_with_totals,
+        'transactions': tx_section,
+        'group_summary': group_summary_list
+    }
+
+    return payload
+
 @csrf_exempt
 @require_http_methods(['POST'])
 def get_daily_report(request):
@@ -294,30 +271,32 @@ def get_daily_report(request):
             rd = (datetime.utcnow() + timedelta(hours=5, minutes=30)).strftime('%Y-%m-%d')
         rd = rd.strip()
         
-        cache_key = f"normal_daily_{rd}"
-        cached = cache.get(cache_key)
-        if cached:
-            return JsonResponse(cached, encoder=DecimalEncoder)
-        
-        items, _ = compute_item_rows_and_totals(rd, rd)
-        tx_section = build_transactions_section(rd, rd)
-        enrich_with_groups(items)
-        items_with_totals, group_summary_list = build_summaries(items)
-        
-        payload = {
-            'report_period': {'start_date': rd, 'end_date': rd},
-            'items': items_with_totals,
-            'transactions': tx_section,
-            'group_summary': group_summary_list
-        }
-        
-        cache.set(cache_key, payload, 300)
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        payload = ReportResultCache.get_or_compute(
+            'normal_daily', {'report_date': rd}, rd, rd,
+            lambda: compute_daily_report(rd)
+        )
+        return JsonResponse(payload, encoder=ResponseEncoder)
     
     except Exception as e:
         logger.error(f'Error in get_daily_report: {e}', exc_info=True)
         return JsonResponse({'error': f'Internal error: {str(e)}'}, status=500)
 
+def compute_weekly_report(sd, ed, inputs=None):
+    """Normal report over [sd, ed]"""
+    items, _ = compute_item_rows_and_totals(sd, ed, inputs)
+    tx_section = build_transactions_section(sd, ed, inputs)
+    enrich_with_groups(items)
+    items_with_totals, group_summary_list = build_summaries(items)
+
+    payload = {
+        'report_period': {'start_date': sd, 'end_date': ed},
+        'items': items_with_totals,
+        'transactions': tx_section,
+        'group_summary': group_summary_list
+    }
+
+    return payload
+
 @csrf_exempt
 @require_http_methods(['POST'])
 def get_weekly_report(request):
@@ -327,30 +306,36 @@ def get_weekly_report(request):
         ed = body.get('end_date', now.strftime('%Y-%m-%d')).strip()
         sd = body.get('start_date', (now - timedelta(days=7)).strftime('%Y-%m-%d')).strip()
         
-        cache_key = f"normal_weekly_{sd}_{ed}"
-        cached = cache.get(cache_key)
-        if cached:
-            return JsonResponse(cached, encoder=DecimalEncoder)
-        
-        items, _ = compute_item_rows_and_totals(sd, ed)
-        tx_section = build_transactions_section(sd, ed)
-        enrich_with_groups(items)
-        items_with_totals, group_summary_list = build_summaries(items)
-        
-        payload = {
-            'report_period': {'start_date': sd, 'end_date': ed},
-            'items': items_with_totals,
-            'transactions': tx_section,
-            'group_summary': group_summary_list
-        }
-        
-        cache.set(cache_key, payload, 300)
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        payload = ReportResultCache.get_or_compute(
+            'normal_weekly', {'start_date': sd, 'end_date': ed}, sd, ed,
+            lambda: compute_weekly_report(sd, ed)
+        )
+        return JsonResponse(payload, encoder=ResponseEncoder)
     
     except Exception as e:
         logger.error(f'Error in get_weekly_report: {e}', exc_info=True)
         return JsonResponse({'error': str(e)}, status=500)
 
+def compute_monthly_report(m, inputs=None):
+    """Normal report for a "YYYY-MM" month"""
+    yr, mo = map(int, m.split('-'))
+    
+    first = date(yr, mo, 1)
+    last = date(yr, mo, calendar.monthrange(yr, mo)[1])
+    sd, ed = first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')
+
+    items, _ = compute_item_rows_and_totals(sd, ed, inputs)
+    enrich_with_groups(items)
+    items_with_totals, group_summary_list = build_summaries(items)
+
+    payload = {
+        'report_period': {'start_date': sd, 'end_date': ed},
+        'items': items_with_totals,
+        'group_summary': group_summary_list
+    }
+
+    return payload
+
 @csrf_exempt
 @require_http_methods(['POST'])
 def get_monthly_report(request):
@@ -366,27 +351,13 @@ def get_monthly_report(request):
         except ValueError:
             return JsonResponse({'error': "'month' must be in YYYY-MM"}, status=400)
         
-        cache_key = f"normal_monthly_{m}"
-        cached = cache.get(cache_key)
-        if cached:
-            return JsonResponse(cached, encoder=DecimalEncoder)
-        
-        first = date(yr, mo, 1)
-        last = date(yr, mo, calendar.monthrange(yr, mo)[1])
-        sd, ed = first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')
-        
-        items, _ = compute_item_rows_and_totals(sd, ed)
-        enrich_with_groups(items)
-        items_with_totals, group_summary_list = build_summaries(items)
-        
-        payload = {
-            'report_period': {'start_date': sd, 'end_date': ed},
-            'items': items_with_totals,
-            'group_summary': group_summary_list
-        }
-        
-        cache.set(cache_key, payload, 600)
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        sd = date(yr, mo, 1).strftime('%Y-%m-%d')
+        ed = date(yr, mo, calendar.monthrange(yr, mo)[1]).strftime('%Y-%m-%d')
+        payload = ReportResultCache.get_or_compute(
+            'normal_monthly', {'month': m}, sd, ed,
+            lambda: compute_monthly_report(m)
+        )
+        return JsonResponse(payload, encoder=ResponseEncoder)
     
     except Exception as e:
         logger.error(f'Error in get_monthly_report: {e}', exc_info=True)
@@ -0,0 +1,200 @@
+"""
+Month and fiscal-year rollups of the per-item movement aggregates.
+
+ITEM_PERIOD_ROLLUPS holds, per period (partition: "YYYY-MM" for a month,
+"FY2025-26" for an April-March fiscal year) and item (sort), the sums of the
+daily aggregate fields. A "#summary" row marks the period as finalized. Only
+closed periods are rolled up: a month from its ITEM_DAILY_MOVEMENTS rows, a
+fiscal year from its twelve month rollups. They are written the first time
+they are needed (or by close_stock_month), so a fiscal-year or year-to-date
+statement reads at most one rollup per closed month plus the open month's
+daily rows. A late write dated in a closed period drops its summary marks
+and the rollups are rebuilt on the next read.
+"""
+import logging
+from datetime import datetime
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from backend.dynamodb_service import dynamodb_service
+from production.product_service import months_between
+from . import transaction_hooks
+from .balance_checkpoints import month_bounds
+from .daily_movements import DailyMovementService, MOVEMENT_OPERATIONS, SUM_FIELDS
+
+logger = logging.getLogger(__name__)
+
+TABLE_KEY = 'ITEM_PERIOD_ROLLUPS'
+SUMMARY_ITEM = '#summary'
+
+
+def fiscal_year(date_str):
+    """The "FY2025-26" fiscal year (April-March) of a "YYYY-MM-DD" or "YYYY-MM" date"""
+    year, month = int(date_str[:4]), int(date_str[5:7])
+    start = year if month >= 4 else year - 1
+    return f"FY{start}-{(start + 1) % 100:02d}"
+
+
+def parse_fiscal_year(value):
+    """Start year of "2025-26"/"FY2025-26"; ValueError when it is not a fiscal year"""
+    text = str(value).strip().upper()
+    if text.startswith('FY'):
+        text = text[2:]
+    try:
+        start, end = text.split('-')
+        start_year = int(start)
+    except ValueError:
+        raise ValueError("'fiscal_year' must be in format YYYY-YY")
+    if len(start) != 4 or end != f"{(start_year + 1) % 100:02d}":
+        raise ValueError("'fiscal_year' must be in format YYYY-YY")
+    return start_year
+
+
+def fiscal_year_months(fy):
+    """The twelve "YYYY-MM" months of a "FY2025-26" fiscal year"""
+    start_year = parse_fiscal_year(fy)
+    return months_between(f"{start_year}-04-01", f"{start_year + 1}-03-01")
+
+
+def _today():
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def _is_closed_month(month):
+    return month_bounds(month)[1] < _today()
+
+
+def merge_totals(totals_list):
+    """Sum several {item_id: {field: Decimal}} maps"""
+    merged = {}
+    for totals in totals_list:
+        for item_id, fields in totals.items():
+            entry = merged.setdefault(item_id, {})
+            for field, value in fields.items():
+                entry[field] = entry.get(field, Decimal('0')) + value
+    return merged
+
+
+class PeriodRollupService:
+    """Reads, builds and invalidates the month and fiscal-year rollups"""
+
+    @staticmethod
+    def _read(period):
+        """(summary row or None, {item_id: {field: Decimal}}) of a stored period"""
+        rows = dynamodb_service.query_table(TABLE_KEY, KeyConditionExpression=Key('period').eq(period))
+        summary = None
+        totals = {}
+        for row in rows:
+            if row['item_id'] == SUMMARY_ITEM:
+                summary = row
+            else:
+                totals[row['item_id']] = {field: row[field] for field in SUM_FIELDS if field in row}
+        return summary, totals
+
+    @staticmethod
+    def _write(period, totals, source):
+        now_iso = datetime.now().isoformat()
+        rows = [{'period': period, 'item_id': item_id, **fields} for item_id, fields in totals.items()]
+        # The summary mark goes last: a half-written period is never read as finalized
+        dynamodb_service.batch_write_items(TABLE_KEY, rows)
+        dynamodb_service.put_item(TABLE_KEY, {
+            'period': period,
+            'item_id': SUMMARY_ITEM,
+            'item_count': len(rows),
+            'source': source,
+            'finalized_at': now_iso,
+        })
+
+    @staticmethod
+    def _daily_totals(start_date, end_date):
+        totals = DailyMovementService.totals_by_item(DailyMovementService.get_range(start_date, end_date))
+        return {
+            item_id: {field: value for field, value in fields.items() if field in SUM_FIELDS}
+            for item_id, fields in totals.items()
+        }
+
+    @classmethod
+    def finalize_month(cls, month):
+        """Build and store a closed month's rollup from its daily aggregates"""
+        first_day, last_day = month_bounds(month)
+        totals = cls._daily_totals(first_day, last_day)
+        cls._write(month, totals, 'daily')
+        return totals
+
+    @classmethod
+    def month_totals(cls, month, end_date=None):
+        """
+        Per-item totals of a month: the stored rollup of a closed month (built on
+        first use), the daily aggregates up to end_date (default today) of an open one
+        """
+        if not _is_closed_month(month):
+            first_day, last_day = month_bounds(month)
+            return cls._daily_totals(first_day, min(last_day, end_date or _today()))
+
+        summary, totals = cls._read(month)
+        if summary is not None:
+            return totals
+        try:
+            return cls.finalize_month(month)
+        except Exception as e:
+            logger.error(f"Error storing the {month} rollup: {e}")
+            return cls._daily_totals(*month_bounds(month))
+
+    @classmethod
+    def finalize_fiscal_year(cls, fy):
+        """Build and store a closed fiscal year's rollup from its month rollups"""
+        totals = merge_totals(cls.month_totals(month) for month in fiscal_year_months(fy))
+        cls._write(fy, totals, 'months')
+        return totals
+
+    @classmethod
+    def fiscal_year_totals(cls, fy):
+        """Per-item totals of a closed fiscal year, from its stored rollup (built on first use)"""
+        summary, totals = cls._read(fy)
+        if summary is not None:
+            return totals
+        try:
+            return cls.finalize_fiscal_year(fy)
+        except Exception as e:
+            logger.error(f"Error storing the {fy} rollup: {e}")
+            return merge_totals(cls.month_totals(month) for month in fiscal_year_months(fy))
+
+    @classmethod
+    def range_totals(cls, start_month, end_date):
+        """
+        Per-item totals from the first day of start_month to end_date, and the
+        periods they were read from: one fiscal-year rollup when the range is a
+        whole closed fiscal year, otherwise one rollup per closed month plus the
+        open month's daily aggregates.
+        """
+        end_month = end_date[:7]
+        fy = fiscal_year(start_month)
+        months = fiscal_year_months(fy)
+        if start_month == months[0] and end_date == month_bounds(months[-1])[1] and _is_closed_month(months[-1]):
+            return cls.fiscal_year_totals(fy), [fy]
+
+        periods = []
+        parts = []
+        for month in months_between(f"{start_month}-01", end_date):
+            if month == end_month and end_date < month_bounds(month)[1]:
+                parts.append(cls._daily_totals(f"{month}-01", end_date))
+            else:
+                parts.append(cls.month_totals(month))
+            periods.append(month)
+        return merge_totals(parts), periods
+
+    @staticmethod
+    def invalidate(date_str):
+        """Drop the finalized marks of the closed periods containing date_str"""
+        month = date_str[:7]
+        periods = [month, fiscal_year(month)] if _is_closed_month(month) else []
+        for period in periods:
+            dynamodb_service.delete_item(TABLE_KEY, {'period': period, 'item_id': SUMMARY_ITEM})
+
+    @classmethod
+    def on_transaction(cls, transaction):
+        # Only a movement dated in a closed period (a backdated write) changes a rollup
+        if transaction.get('operation_type') in MOVEMENT_OPERATIONS and transaction.get('date'):
+            cls.invalidate(transaction['date'])
+
+
+transaction_hooks.register(PeriodRollupService.on_transaction)
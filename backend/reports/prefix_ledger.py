@@ -0,0 +1,73 @@
+"""
+Prefix-sum ledger: cumulative per-item counters by day.
+
+One cell per (item, day) that had movements, sorted by item then day, holding
+the item's running sum of every measure up to and including that day. An
+item's total over any [start, end] is then cum[last cell <= end] minus
+cum[last cell < start]: two binary searches whatever the length of the range,
+done for every item at once by one vectorized searchsorted.
+
+A new movement adds its values to the item's cells from its day onwards
+(inserting the cell when the day is new to the item), so backdated writes
+are handled the same way as today's.
+"""
+import numpy as np
+
+# Keys are item * DAY_SPAN + day; days since 1970 stay far below 2**20
+DAY_SPAN = 1 << 20
+
+
+def cell_keys(items, days):
+    return np.asarray(items, dtype=np.int64) * DAY_SPAN + np.asarray(days, dtype=np.int64)
+
+
+class PrefixLedger:
+    """Running per-item sums by (item, day) cell; range_totals() answers any date range per item"""
+
+    def __init__(self, keys, cum):
+        self.keys = keys
+        self.cum = cum
+
+    @classmethod
+    def build(cls, items, days, values):
+        """Ledger of movement rows: item and day indexes, and an (n rows, n measures) value matrix"""
+        keys, cells = np.unique(cell_keys(items, days), return_inverse=True)
+        sums = np.zeros((len(keys), values.shape[1]))
+        for m in range(values.shape[1]):
+            sums[:, m] = np.bincount(cells, weights=values[:, m], minlength=len(keys))
+
+        # Running sums restart at each item's first cell, which also keeps their magnitude per item
+        cum = np.empty_like(sums)
+        item_of = keys // DAY_SPAN
+        bounds = np.flatnonzero(np.r_[True, item_of[1:] != item_of[:-1], True]) if len(keys) else []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            np.cumsum(sums[start:end], axis=0, out=cum[start:end])
+        return cls(keys, cum)
+
+    def add(self, item, day, values):
+        """Fold one movement into the ledger: the item's cells from day onwards grow by values"""
+        key = item * DAY_SPAN + day
+        position = int(np.searchsorted(self.keys, key))
+        if position == len(self.keys) or self.keys[position] != key:
+            same_item = position > 0 and self.keys[position - 1] // DAY_SPAN == item
+            carried = self.cum[position - 1] if same_item else np.zeros(self.cum.shape[1])
+            self.keys = np.insert(self.keys, position, key)
+            self.cum = np.insert(self.cum, position, carried, axis=0)
+        end = int(np.searchsorted(self.keys, (item + 1) * DAY_SPAN))
+        self.cum[position:end] += values
+
+    def range_totals(self, item_count, start_day, end_day):
+        """(item_count, n measures) totals of every item over days [start_day, end_day]"""
+        totals = np.zeros((item_count, self.cum.shape[1]))
+        if not len(self.keys) or end_day < start_day:
+            return totals
+        items = np.arange(item_count, dtype=np.int64) * DAY_SPAN
+        segment = np.searchsorted(self.keys, items, side='left')
+        first = np.searchsorted(self.keys, items + start_day, side='left')
+        last = np.searchsorted(self.keys, items + end_day, side='right')
+
+        through_end = last > segment
+        totals[through_end] = self.cum[last[through_end] - 1]
+        before_start = first > segment
+        totals[before_start] -= self.cum[first[before_start] - 1]
+        return totals
@@ -0,0 +1,122 @@
+"""
+Several report periods around one anchor date in a single request.
+
+The dashboard shows the daily, week-to-date and month-to-date consumption and
+normal reports of the same day. Computed one request at a time, each re-reads
+the overlapping date range and rebuilds the same stock maps. Here the widest
+range is read once through PrefetchedReportInputs and every period is cut from
+it. Each payload is cached under the same key as the single-report endpoints,
+so periods already cached are not recomputed at all.
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from backend.serialization import ResponseEncoder
+from users.decorators import jwt_required
+from .optimized_consumption import compute_daily_consumption, compute_weekly_consumption
+from .optimized_normal_reports import compute_daily_report, compute_weekly_report
+from .report_cache import ReportResultCache
+from .report_inputs import PrefetchedReportInputs
+
+logger = logging.getLogger(__name__)
+
+REPORTS = ('consumption', 'normal')
+
+
+def bundle_periods(anchor_date, start_date=None, end_date=None):
+    """{period: (start_date, end_date)}: the anchor day, its week (from Monday) and month to date, and the custom range"""
+    anchor = datetime.strptime(anchor_date, '%Y-%m-%d')
+    periods = {
+        'daily': (anchor_date, anchor_date),
+        'week_to_date': ((anchor - timedelta(days=anchor.weekday())).strftime('%Y-%m-%d'), anchor_date),
+        'month_to_date': (anchor.strftime('%Y-%m-01'), anchor_date),
+    }
+    if start_date and end_date:
+        periods['custom'] = (start_date, end_date)
+    return periods
+
+
+def _targets(report, period, start_date, end_date, inputs):
+    """(cache name, params, compute) of one report over one period"""
+    if report == 'consumption':
+        if period == 'daily':
+            return "daily_consumption", {"report_date": start_date}, lambda: compute_daily_consumption(start_date, inputs)
+        return ("weekly_consumption", {"start_date": start_date, "end_date": end_date},
+                lambda: compute_weekly_consumption(start_date, end_date, inputs))
+    if period == 'daily':
+        return 'normal_daily', {'report_date': start_date}, lambda: compute_daily_report(start_date, inputs)
+    return ('normal_weekly', {'start_date': start_date, 'end_date': end_date},
+            lambda: compute_weekly_report(start_date, end_date, inputs))
+
+
+def compute_bundle(anchor_date, reports=REPORTS, start_date=None, end_date=None):
+    """Every requested report over every period, from one read of the widest range"""
+    periods = bundle_periods(anchor_date, start_date, end_date)
+    inputs = PrefetchedReportInputs(
+        min(start for start, _ in periods.values()),
+        max(end for _, end in periods.values())
+    )
+
+    payload = {
+        'anchor_date': anchor_date,
+        'periods': {name: {'start_date': start, 'end_date': end} for name, (start, end) in periods.items()},
+    }
+    for report in reports:
+        payload[report] = {}
+        for period, (start, end) in periods.items():
+            name, params, compute = _targets(report, period, start, end, inputs)
+            payload[report][period] = ReportResultCache.get_or_compute(name, params, start, end, compute)
+    return payload
+
+
+def _date_param(body, field):
+    value = body.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' must be in format YYYY-MM-DD")
+    value = value.strip()
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"'{field}' must be in format YYYY-MM-DD")
+    return value
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def get_report_bundle(request, body=None):
+    """Daily, week-to-date, month-to-date (and optional custom range) reports of one anchor date"""
+    try:
+        if body is None:
+            body = json.loads(request.body) if request.body else {}
+
+        try:
+            anchor_date = _date_param(body, 'anchor_date')
+            start_date = _date_param(body, 'start_date')
+            end_date = _date_param(body, 'end_date')
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        if bool(start_date) != bool(end_date):
+            return JsonResponse({"error": "'start_date' and 'end_date' must be given together"}, status=400)
+        if start_date and start_date > end_date:
+            return JsonResponse({"error": "'start_date' must not be after 'end_date'"}, status=400)
+        if not anchor_date:
+            anchor_date = (datetime.utcnow() + timedelta(hours=5, minutes=30)).strftime('%Y-%m-%d')
+
+        reports = body.get('reports', list(REPORTS))
+        if isinstance(reports, str):
+            reports = [reports]
+        if not isinstance(reports, list) or not reports or any(r not in REPORTS for r in reports):
+            return JsonResponse({"error": f"'reports' must be a list of {', '.join(REPORTS)}"}, status=400)
+
+        payload = compute_bundle(anchor_date, list(dict.fromkeys(reports)), start_date, end_date)
+        return JsonResponse(payload, encoder=ResponseEncoder)
+
+    except Exception as e:
+        logger.error(f"Error in get_report_bundle: {e}", exc_info=True)
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
@@ -0,0 +1,136 @@
+"""
+Shared, versioned cache for computed report payloads.
+
+Entries live in the 'reports' cache (on disk, shared by every worker, survives
+restarts). Each key embeds a version stamp for every date in the report's
+period plus a catalog stamp (stock names, rates, groups), so:
+- a write dated inside the period (log_transaction, opening/closing
+  snapshots, undo) re-stamps that date and the next read misses;
+- closed periods never expire on their own;
+- entries orphaned by a new stamp are culled by the cache backend.
+"""
+import json
+import uuid
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from django.core.cache import caches
+from . import transaction_hooks
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'reports'
+
+# Periods reaching today also depend on live stock, so they expire as a safety net
+CURRENT_PERIOD_TIMEOUT = 300
+
+CATALOG_KEY = 'version:catalog'
+
+# Logged operations that change what every report shows (names, rates, groups)
+CATALOG_OPERATIONS = ('CreateStock', 'UpdateStock', 'DeleteStock')
+
+
+def _date_key(date_str):
+    return f"version:date:{date_str}"
+
+
+def _dates(start_date, end_date):
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    return [(start + timedelta(days=n)).strftime('%Y-%m-%d') for n in range((end - start).days + 1)]
+
+
+class ReportResultCache:
+    """get_or_compute() for report payloads, invalidated per date by version stamps"""
+
+    @staticmethod
+    def _cache():
+        return caches[CACHE_ALIAS]
+
+    @classmethod
+    def _versions(cls, keys):
+        """Current stamps for keys; missing (never written or culled) stamps are created"""
+        cache = cls._cache()
+        versions = cache.get_many(keys)
+        missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+        if missing:
+            cache.set_many(missing, timeout=None)
+            versions.update(missing)
+        return [versions[key] for key in keys]
+
+    @classmethod
+    def catalog_version(cls):
+        """Current catalog stamp, for caches of stock/group data that reports are built from"""
+        try:
+            return cls._versions([CATALOG_KEY])[0]
+        except Exception as e:
+            logger.error(f"Report catalog version unavailable: {e}")
+            return None
+
+    @classmethod
+    def key(cls, name, params, start_date, end_date):
+        version_keys = [_date_key(d) for d in _dates(start_date, end_date)] + [CATALOG_KEY]
+        digest = hashlib.sha1(
+            json.dumps([params, cls._versions(version_keys)], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"report:{name}:{digest}"
+
+    @classmethod
+    def get_or_compute(cls, name, params, start_date, end_date, compute):
+        """
+        Return the cached payload of report `name` for params over [start_date, end_date],
+        computing and storing it on a miss. Cache errors fall back to computing.
+        """
+        try:
+            key = cls.key(name, params, start_date, end_date)
+            cached = cls._cache().get(key)
+        except Exception as e:
+            logger.error(f"Report cache unavailable for {name}: {e}")
+            return compute()
+        if cached is not None:
+            return cached
+
+        payload = compute()
+        cls._store(name, key, end_date, payload)
+        return payload
+
+    @classmethod
+    def refresh(cls, name, params, start_date, end_date, compute):
+        """Recompute report `name` and store it under its current key, hit or not"""
+        key = cls.key(name, params, start_date, end_date)
+        payload = compute()
+        cls._store(name, key, end_date, payload)
+        return payload
+
+    @classmethod
+    def _store(cls, name, key, end_date, payload):
+        timeout = None if end_date < datetime.now().strftime('%Y-%m-%d') else CURRENT_PERIOD_TIMEOUT
+        try:
+            cls._cache().set(key, payload, timeout)
+        except Exception as e:
+            logger.error(f"Error caching report {name}: {e}")
+
+    @classmethod
+    def touch_dates(cls, dates):
+        """Invalidate every cached report whose period contains one of dates"""
+        try:
+            cls._cache().set_many({_date_key(d): uuid.uuid4().hex for d in set(dates) if d}, timeout=None)
+        except Exception as e:
+            logger.error(f"Error invalidating report dates {dates}: {e}")
+
+    @classmethod
+    def touch_catalog(cls):
+        """Invalidate every cached report (stock catalog, groups or derived tables changed)"""
+        try:
+            cls._cache().set(CATALOG_KEY, uuid.uuid4().hex, timeout=None)
+        except Exception as e:
+            logger.error(f"Error invalidating report catalog: {e}")
+
+    @classmethod
+    def on_transaction(cls, transaction):
+        cls.touch_dates([transaction.get('date')])
+        if transaction.get('operation_type') in CATALOG_OPERATIONS:
+            cls.touch_catalog()
+
+
+transaction_hooks.register(ReportResultCache.on_transaction)
@@ -0,0 +1,124 @@
+"""
+Data sources of the consumption and normal report computations.
+
+ReportInputs reads each input from DynamoDB when a report asks for it, which
+is what a single report request needs. PrefetchedReportInputs reads a whole
+date range once (movement aggregates, stock, opening snapshots, transactions)
+and serves every narrower window from memory, so reports over overlapping
+periods (a day, its week and its month) share one set of reads.
+"""
+import logging
+from boto3.dynamodb.conditions import Attr
+from backend.dynamodb_service import dynamodb_service
+from backend.query_planner import between, find_items
+from .columnar_store import movement_rows_between, movement_totals, store_enabled
+from .daily_movements import DailyMovementService
+
+logger = logging.getLogger(__name__)
+
+# The only attributes the transactions section reads or returns
+SECTION_ATTRIBUTES = ('transaction_id', 'operation_type', 'operation', 'date', 'timestamp', 'username', 'details', 'qty', 'amount')
+
+
+class ReportInputs:
+    """Reads every report input from DynamoDB on demand"""
+
+    def movement_rows(self, start_date, end_date):
+        """Per-(date, item) movement rows"""
+        return movement_rows_between(start_date, end_date)
+
+    def movement_totals(self, start_date, end_date):
+        """Per-item movement totals"""
+        return movement_totals(start_date, end_date)
+
+    def day_totals(self, report_date):
+        """Per-item totals of one day from the daily aggregates, suppliers included"""
+        return DailyMovementService.totals_by_item(DailyMovementService.get_range(report_date, report_date))
+
+    def stock_items(self):
+        return dynamodb_service.scan_table('STOCK', use_cache=False)
+
+    def stock_lookup(self, item_ids):
+        """{item_id: stock item} for the given ids"""
+        items = dynamodb_service.batch_get_items('STOCK', [{'item_id': item_id} for item_id in item_ids])
+        return {item['item_id']: item for item in items}
+
+    def opening_transactions(self, report_date):
+        """SaveOpeningStock records dated report_date"""
+        return find_items('stock_transactions', {'operation_type': 'SaveOpeningStock', 'date': report_date}, use_cache=False)
+
+    def section_transactions(self, start_date, end_date):
+        """One paginated, parallel, projected scan of the transactions dated in [start_date, end_date]"""
+        names = {f'#a{i}': attr for i, attr in enumerate(SECTION_ATTRIBUTES)}
+        return dynamodb_service.scan_table(
+            'stock_transactions',
+            use_cache=False,
+            parallel=True,
+            FilterExpression=Attr('date').between(start_date, end_date),
+            ProjectionExpression=', '.join(names),
+            ExpressionAttributeNames=names
+        )
+
+
+class PrefetchedReportInputs(ReportInputs):
+    """
+    Reads each input once for [start_date, end_date] (on first use) and filters it
+    in memory; windows reaching outside the range fall back to ReportInputs, and so
+    do the movement inputs while the columnar store serves them.
+    """
+
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+        self._loaded = {}
+
+    def _once(self, name, load):
+        if name not in self._loaded:
+            self._loaded[name] = load()
+        return self._loaded[name]
+
+    def _covers(self, start_date, end_date):
+        return self.start_date <= start_date and end_date <= self.end_date
+
+    def _rows(self, start_date, end_date):
+        rows = self._once('rows', lambda: DailyMovementService.get_range(self.start_date, self.end_date))
+        return [row for row in rows if start_date <= row['date'] <= end_date]
+
+    def movement_rows(self, start_date, end_date):
+        # The columnar store already holds every range in memory; read it as the single reports do
+        if store_enabled() or not self._covers(start_date, end_date):
+            return super().movement_rows(start_date, end_date)
+        return self._rows(start_date, end_date)
+
+    def movement_totals(self, start_date, end_date):
+        if store_enabled() or not self._covers(start_date, end_date):
+            return super().movement_totals(start_date, end_date)
+        return DailyMovementService.totals_by_item(self._rows(start_date, end_date))
+
+    def day_totals(self, report_date):
+        if not self._covers(report_date, report_date):
+            return super().day_totals(report_date)
+        return DailyMovementService.totals_by_item(self._rows(report_date, report_date))
+
+    def stock_items(self):
+        return self._once('stock', super().stock_items)
+
+    def stock_lookup(self, item_ids):
+        stock = self._once('stock_map', lambda: {item['item_id']: item for item in self.stock_items()})
+        return {item_id: stock[item_id] for item_id in item_ids if item_id in stock}
+
+    def opening_transactions(self, report_date):
+        if not self._covers(report_date, report_date):
+            return super().opening_transactions(report_date)
+        records = self._once('openings', lambda: find_items(
+            'stock_transactions',
+            {'operation_type': 'SaveOpeningStock', 'date': between(self.start_date, self.end_date)},
+            use_cache=False
+        ))
+        return [record for record in records if record.get('date') == report_date]
+
+    def section_transactions(self, start_date, end_date):
+        if not self._covers(start_date, end_date):
+            return super().section_transactions(start_date, end_date)
+        transactions = self._once('section', lambda: super(PrefetchedReportInputs, self).section_transactions(self.start_date, self.end_date))
+        return [tx for tx in transactions if start_date <= tx.get('date', '') <= end_date]
@@ -0,0 +1,102 @@
+"""
+Pre-computes the report payloads users open first, so their requests are cache hits.
+
+The targets are the default periods of each report, as the views derive them
+when no dates are sent: today, the last 7 days and the current month (IST).
+They are refreshed:
+- by the warm_reports management command (cron, e.g. every 5 minutes);
+- in a background thread REPORT_WARMUP_DELAY seconds after writes settle
+  (logged transactions, opening/closing snapshots).
+"""
+import calendar
+import logging
+import threading
+from datetime import datetime, timedelta
+from django.conf import settings
+from . import transaction_hooks
+from .report_cache import ReportResultCache
+
+logger = logging.getLogger(__name__)
+
+
+def _today_ist():
+    return datetime.utcnow() + timedelta(hours=5, minutes=30)
+
+
+def warm_targets(now=None):
+    """(name, params, start_date, end_date, compute) for every pre-computed report"""
+    from .optimized_consumption import compute_daily_consumption, compute_weekly_consumption, compute_monthly_consumption
+    from .optimized_normal_reports import compute_daily_report, compute_weekly_report, compute_monthly_report
+    from .views import compute_monthly_inward_grid, compute_monthly_outward_grid
+
+    now = now or _today_ist()
+    today = now.strftime('%Y-%m-%d')
+    week_start = (now - timedelta(days=7)).strftime('%Y-%m-%d')
+    month = now.strftime('%Y-%m')
+    month_start = f"{month}-01"
+    month_end = f"{month}-{calendar.monthrange(now.year, now.month)[1]:02d}"
+
+    return [
+        ("daily_consumption", {"report_date": today}, today, today,
+         lambda: compute_daily_consumption(today)),
+        ("weekly_consumption", {"start_date": week_start, "end_date": today}, week_start, today,
+         lambda: compute_weekly_consumption(week_start, today)),
+        ("monthly_consumption", {"month": month}, month_start, month_end,
+         lambda: compute_monthly_consumption(month)),
+        ('normal_daily', {'report_date': today}, today, today,
+         lambda: compute_daily_report(today)),
+        ('normal_weekly', {'start_date': week_start, 'end_date': today}, week_start, today,
+         lambda: compute_weekly_report(week_start, today)),
+        ('normal_monthly', {'month': month}, month_start, month_end,
+         lambda: compute_monthly_report(month)),
+        ("monthly_inward_grid", {"month": month}, month_start, month_end,
+         lambda: compute_monthly_inward_grid(month)),
+        ("monthly_outward_grid", {"month": month}, month_start, month_end,
+         lambda: compute_monthly_outward_grid(month)),
+    ]
+
+
+class ReportWarmer:
+    """Refreshes the warm targets now, or debounced in the background after writes"""
+
+    _lock = threading.Lock()
+    _timer = None
+
+    @staticmethod
+    def warm(now=None):
+        """Recompute and store every target; returns [(name, error or None)]"""
+        results = []
+        for name, params, start_date, end_date, compute in warm_targets(now):
+            try:
+                ReportResultCache.refresh(name, params, start_date, end_date, compute)
+                results.append((name, None))
+            except Exception as e:
+                logger.error(f"Error warming report {name}: {e}")
+                results.append((name, str(e)))
+        return results
+
+    @classmethod
+    def schedule(cls):
+        """Warm in the background once no write has arrived for REPORT_WARMUP_DELAY seconds"""
+        delay = getattr(settings, 'REPORT_WARMUP_DELAY', 0)
+        if delay <= 0:
+            return
+        with cls._lock:
+            if cls._timer is not None:
+                cls._timer.cancel()
+            cls._timer = threading.Timer(delay, cls._run)
+            cls._timer.daemon = True
+            cls._timer.start()
+
+    @classmethod
+    def _run(cls):
+        with cls._lock:
+            cls._timer = None
+        cls.warm()
+
+    @classmethod
+    def on_transaction(cls, transaction):
+        cls.schedule()
+
+
+transaction_hooks.register(ReportWarmer.on_transaction)
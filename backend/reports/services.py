@@ -6,6 +6,9 @@ import logging
 from decimal import Decimal
 from datetime import datetime, timedelta
 from collections import defaultdict
+from django.core.cache import cache
+from backend.dynamodb_service import dynamodb_service
+from .report_cache import ReportResultCache
 
 logger = logging.getLogger(__name__)
 
@@ -143,4 +146,31 @@ def build_report_for_period(start_date, end_date):
         "total_balance_amount": 0.0,
     }
     
-    return rows, totals
\ No newline at end of file
+    return rows, totals
+
+def batch_get_group_chains(group_ids):
+    """Batch fetch all groups and build chains efficiently"""
+    if not group_ids:
+        return {}
+    
+    # Cache key for groups, renewed whenever the catalog changes
+    cache_key = f"all_groups_map:{ReportResultCache.catalog_version()}"
+    groups_map = cache.get(cache_key)
+    
+    if not groups_map:
+        groups = dynamodb_service.scan_table('GROUPS', use_cache=False)
+        groups_map = {g['group_id']: g for g in groups}
+        cache.set(cache_key, groups_map, 600)  # Cache for 10 minutes
+    
+    # Build chains for all group_ids
+    chains = {}
+    for group_id in group_ids:
+        chain = []
+        current_id = group_id
+        while current_id and current_id in groups_map:
+            grp = groups_map[current_id]
+            chain.insert(0, grp['name'])
+            current_id = grp.get('parent_id')
+        chains[group_id] = chain
+    
+    return chains
@@ -0,0 +1,172 @@
+"""
+Prefix-sum ledger and columnar store aggregations checked against brute-force sums.
+Run with: python manage.py test reports.test_prefix_ledger
+"""
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase
+from . import columnar_store
+from .columnar_store import TransactionColumns, day_number, day_string
+from .prefix_ledger import PrefixLedger
+
+
+def masked_totals(items, days, values, item_count, start_day, end_day):
+    """Per-item sums of the rows dated in [start_day, end_day]"""
+    totals = np.zeros((item_count, values.shape[1]))
+    in_range = (days >= start_day) & (days <= end_day)
+    np.add.at(totals, items[in_range], values[in_range])
+    return totals
+
+
+class PrefixLedgerTests(SimpleTestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.item_count = 6
+        self.items = rng.integers(0, self.item_count, 400)
+        self.days = rng.integers(20000, 20090, 400)
+        self.values = rng.integers(0, 50, (400, 3)).astype(float)
+        self.ledger = PrefixLedger.build(self.items, self.days, self.values)
+        self.windows = [(20000, 20089), (20010, 20010), (20030, 20060), (19000, 20005), (20085, 21000), (20050, 20040)]
+
+    def assert_matches(self, items, days, values):
+        for start_day, end_day in self.windows:
+            np.testing.assert_allclose(
+                self.ledger.range_totals(self.item_count, start_day, end_day),
+                masked_totals(items, days, values, self.item_count, start_day, end_day)
+            )
+
+    def test_range_totals_match_masked_sums(self):
+        self.assert_matches(self.items, self.days, self.values)
+
+    def test_empty_ledger(self):
+        ledger = PrefixLedger.build(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.zeros((0, 3)))
+        np.testing.assert_array_equal(ledger.range_totals(2, 0, 100), np.zeros((2, 3)))
+
+    def test_add_into_a_new_cell_and_an_existing_one(self):
+        rows = [(2, 20100, [1.0, 2.0, 1.0]), (2, int(self.days[self.items == 2][0]), [3.0, 0.0, 1.0])]
+        items, days, values = list(self.items), list(self.days), list(self.values)
+        for item, day, row in rows:
+            self.ledger.add(item, day, np.array(row))
+            items.append(item)
+            days.append(day)
+            values.append(row)
+        self.windows.append((20095, 20100))
+        self.assert_matches(np.array(items), np.array(days), np.array(values))
+
+    def test_backdated_add_updates_every_later_cell(self):
+        # Earlier than every existing cell of item 4, and for an item with no cell at all
+        first_day = int(self.days[self.items == 4].min())
+        rows = [(4, first_day - 3, [5.0, 1.0, 1.0]), (self.item_count, 20020, [1.0, 1.0, 1.0])]
+        self.item_count += 1
+        items, days, values = list(self.items), list(self.days), list(self.values)
+        for item, day, row in rows:
+            self.ledger.add(item, day, np.array(row))
+            items.append(item)
+            days.append(day)
+            values.append(row)
+        self.windows.append((first_day - 3, first_day - 3))
+        self.assert_matches(np.array(items), np.array(days), np.array(values))
+
+
+def defective(transaction_id, date_str, item_id, quantity):
+    return {
+        'transaction_id': transaction_id, 'operation_type': 'AddDefectiveGoods', 'date': date_str,
+        'timestamp': f"{date_str}T10:00:00", 'details': {'item_id': item_id, 'defective_added': quantity},
+    }
+
+
+def inward(transaction_id, date_str, item_id, quantity, cost):
+    return {
+        'transaction_id': transaction_id, 'operation_type': 'AddStockQuantity', 'date': date_str,
+        'timestamp': f"{date_str}T09:00:00",
+        'details': {'item_id': item_id, 'quantity_added': quantity, 'added_cost': cost, 'new_available': quantity},
+    }
+
+
+class ColumnarStoreTests(SimpleTestCase):
+    """TransactionColumns aggregations on ingested rows, without DynamoDB or the shared cache"""
+
+    def setUp(self):
+        self.store = TransactionColumns()
+        self.store._loaded = True
+        patcher = mock.patch.object(self.store, '_ensure', self.store._compact)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.transactions = []
+        rng = np.random.default_rng(11)
+        for n in range(120):
+            date_str = day_string(day_number('2025-04-01') + int(rng.integers(0, 40)))
+            item_id = f"item{int(rng.integers(0, 5))}"
+            if n % 2:
+                self.log(inward(f"t{n}", date_str, item_id, Decimal(int(rng.integers(1, 9))), Decimal('2.5')))
+            else:
+                self.log(defective(f"t{n}", date_str, item_id, Decimal(int(rng.integers(1, 4)))))
+
+    def log(self, transaction):
+        self.transactions.append(transaction)
+        self.store._ingest(transaction)
+
+    def expected_totals(self, start_date, end_date):
+        totals = {}
+        for tx in self.transactions:
+            if start_date <= tx['date'] <= end_date:
+                entry = totals.setdefault(tx['details']['item_id'], {})
+                if tx['operation_type'] == 'AddStockQuantity':
+                    for field, value in (('inward_qty', tx['details']['quantity_added']), ('inward_cost', tx['details']['added_cost'])):
+                        entry[field] = entry.get(field, Decimal('0')) + value
+                else:
+                    for field in ('defective_qty', 'consumption_qty'):
+                        entry[field] = entry.get(field, Decimal('0')) + tx['details']['defective_added']
+        return totals
+
+    def expected_rows(self, start_date, end_date):
+        rows = {}
+        for tx in self.transactions:
+            if start_date <= tx['date'] <= end_date:
+                row = rows.setdefault((tx['date'], tx['details']['item_id']), {})
+                if tx['operation_type'] == 'AddStockQuantity':
+                    row['inward_qty'] = row.get('inward_qty', Decimal('0')) + tx['details']['quantity_added']
+                    row['inward_cost'] = row.get('inward_cost', Decimal('0')) + tx['details']['added_cost']
+                else:
+                    row['consumption_qty'] = row.get('consumption_qty', Decimal('0')) + tx['details']['defective_added']
+        return rows
+
+    def assert_totals(self, start_date, end_date):
+        self.assertEqual(self.store.item_totals(start_date, end_date), self.expected_totals(start_date, end_date))
+
+    def test_item_totals(self):
+        for start_date, end_date in (('2025-04-01', '2025-05-10'), ('2025-04-10', '2025-04-10'), ('2025-04-20', '2025-06-30')):
+            self.assert_totals(start_date, end_date)
+
+    def test_daily_rows_cell_keys(self):
+        rows = self.store.daily_rows('2025-04-05', '2025-04-25')
+        self.assertEqual([row['day_item'] for row in rows], sorted(row['day_item'] for row in rows))
+        actual = {
+            (row['date'], row['item_id']): {field: row[field] for field in ('inward_qty', 'inward_cost', 'consumption_qty') if field in row}
+            for row in rows
+        }
+        self.assertEqual(actual, self.expected_rows('2025-04-05', '2025-04-25'))
+        self.assertEqual(self.store.daily_rows('2025-04-25', '2025-04-05'), [])
+
+    def test_ledger_updates_in_place_for_small_batches(self):
+        self.assert_totals('2025-04-01', '2025-05-10')
+        ledger = self.store._ledger
+        self.log(defective('late', '2025-03-30', 'item1', Decimal('4')))
+        self.log(inward('new-item', '2025-04-15', 'item9', Decimal('3'), Decimal('1.5')))
+        self.assert_totals('2025-03-01', '2025-05-10')
+        self.assertIs(self.store._ledger, ledger)
+
+    def test_ledger_rebuilt_after_a_large_batch(self):
+        self.assert_totals('2025-04-01', '2025-05-10')
+        ledger = self.store._ledger
+        for n in range(columnar_store.LEDGER_REBUILD_AT + 1):
+            self.log(defective(f"bulk{n}", '2025-04-02', f"item{n % 3}", Decimal('1')))
+        self.assert_totals('2025-04-01', '2025-05-10')
+        self.assertIsNot(self.store._ledger, ledger)
+
+    def test_ingest_skips_a_transaction_seen_twice(self):
+        self.log(defective('dup', '2025-04-03', 'item0', Decimal('2')))
+        self.store._ingest(self.transactions[-1])
+        self.assert_totals('2025-04-01', '2025-05-10')
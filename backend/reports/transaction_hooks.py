@@ -0,0 +1,45 @@
+"""
+Write-path hooks for stock_transactions.
+
+Every log_transaction() hands the stored record to dispatch(), which runs the
+registered handlers in order. Handlers maintain derived report data, so a
+failing handler never fails the originating request. A handler whose data
+must not silently miss a transaction registers an on_failure callback, which
+flags what it could not update so readers rebuild it from stock_transactions.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+_handlers = []
+
+
+def register(handler, on_failure=None):
+    """
+    Register a callable taking the transaction record, and optionally the callable run
+    with the same record when it raises; returns handler so it can be used as a decorator
+    """
+    if all(registered != handler for registered, _ in _handlers):
+        _handlers.append((handler, on_failure))
+    return handler
+
+
+def _name(handler):
+    return getattr(handler, '__qualname__', handler)
+
+
+def dispatch(transaction):
+    """Run every registered handler for a freshly logged transaction"""
+    for handler, on_failure in list(_handlers):
+        try:
+            handler(transaction)
+        except Exception as e:
+            logger.error(f"Transaction hook {_name(handler)} failed for "
+                         f"{transaction.get('operation_type')} {transaction.get('transaction_id')}: {e}")
+            if on_failure is None:
+                continue
+            try:
+                on_failure(transaction)
+            except Exception as repair_error:
+                logger.critical(f"Transaction {transaction.get('transaction_id')} is missing from the data of "
+                                f"{_name(handler)} and could not be flagged for a rebuild: {repair_error}")
@@ -0,0 +1,206 @@
+"""
+Time-ordered, cursor-paginated reads of stock_transactions.
+
+Every transaction carries a `month` ("YYYY-MM", from its timestamp) so the
+MonthTimestampIndex GSI (month, timestamp) returns a month's transactions
+already sorted. A page walks months newest-first (or oldest-first) with one
+Query per month until it is full; the cursor is the index key of the last
+transaction returned, base64-encoded. Until the index is ACTIVE the same
+pages are cut from a filtered scan.
+"""
+import json
+import base64
+import logging
+from datetime import datetime
+from boto3.dynamodb.conditions import Key, Attr
+from backend.dynamodb_service import dynamodb_service
+from backend.index_registry import index_registry
+from .balance_checkpoints import shift_month
+
+logger = logging.getLogger(__name__)
+
+TABLE_KEY = 'stock_transactions'
+INDEX_NAME = 'MonthTimestampIndex'
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Without a start date, a newest-first walk stops after this many consecutive empty months
+EMPTY_MONTHS_STOP = 12
+
+# Sorts after every timestamp of a day
+_TS_END = '\uffff'
+
+
+def transaction_month(timestamp):
+    """The `month` index attribute of a transaction timestamp"""
+    return timestamp[:7]
+
+
+def encode_cursor(transaction):
+    key = {
+        'transaction_id': transaction['transaction_id'],
+        'month': transaction.get('month') or transaction_month(transaction['timestamp']),
+        'timestamp': transaction['timestamp'],
+    }
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Index key encoded by encode_cursor(); ValueError when the cursor is not one"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict) or set(key) != {'transaction_id', 'month', 'timestamp'}:
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def _timestamp_condition(start_date, end_date):
+    timestamp = Key('timestamp')
+    if start_date and end_date:
+        return timestamp.between(start_date, end_date + _TS_END)
+    if end_date:
+        return timestamp.lte(end_date + _TS_END)
+    if start_date:
+        return timestamp.gte(start_date)
+    return None
+
+
+class TransactionListingService:
+    """Pages of stock_transactions ordered by timestamp"""
+
+    @classmethod
+    def list_page(cls, limit=DEFAULT_PAGE_SIZE, cursor=None, operation_type=None,
+                  start_date=None, end_date=None, newest_first=True, plain=False):
+        """
+        Up to limit transactions after cursor, filtered by operation type and
+        "YYYY-MM-DD" date range. Returns (transactions, next_cursor); next_cursor
+        is None once the range is exhausted. plain=True reads numbers as int/float.
+        """
+        if not newest_first and not start_date:
+            raise ValueError("'start_date' is required for oldest-first listing")
+        start_key = decode_cursor(cursor) if cursor else None
+
+        if index_registry.is_active(TABLE_KEY, INDEX_NAME):
+            return cls._page_from_index(limit, start_key, operation_type, start_date, end_date, newest_first, plain)
+        return cls._page_from_scan(limit, start_key, operation_type, start_date, end_date, newest_first, plain)
+
+    @staticmethod
+    def query_month(month, limit, start_key=None, operation_type=None, start_date=None, end_date=None,
+                    newest_first=True, plain=False):
+        """One index Query within a month (start_date/end_date may also be full timestamps); returns the raw response"""
+        condition = Key('month').eq(month)
+        timestamp_condition = _timestamp_condition(start_date, end_date)
+        if timestamp_condition is not None:
+            condition &= timestamp_condition
+
+        kwargs = {
+            'IndexName': INDEX_NAME,
+            'KeyConditionExpression': condition,
+            'ScanIndexForward': not newest_first,
+        }
+        if limit:
+            kwargs['Limit'] = limit
+        if operation_type:
+            kwargs['FilterExpression'] = Attr('operation_type').eq(operation_type)
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        return dynamodb_service.query_page(TABLE_KEY, plain=plain, **kwargs)
+
+    @classmethod
+    def _page_from_index(cls, limit, start_key, operation_type, start_date, end_date, newest_first, plain):
+        last_month = (end_date or datetime.now().strftime('%Y-%m-%d'))[:7]
+        first_month = start_date[:7] if start_date else None
+        if start_key:
+            month = start_key['month']
+        else:
+            month = last_month if newest_first else first_month
+        step = -1 if newest_first else 1
+
+        items = []
+        empty_run = 0
+        while (first_month is None or month >= first_month) and month <= last_month:
+            scanned = 0
+            exclusive = start_key if start_key and start_key['month'] == month else None
+            while True:
+                response = cls.query_month(
+                    month, limit - len(items), exclusive, operation_type, start_date, end_date, newest_first, plain
+                )
+                items.extend(response.get('Items', []))
+                scanned += response.get('ScannedCount', 0)
+                if len(items) >= limit:
+                    return items, encode_cursor(items[-1])
+                exclusive = response.get('LastEvaluatedKey')
+                if not exclusive:
+                    break
+
+            empty_run = 0 if scanned else empty_run + 1
+            if first_month is None and empty_run >= EMPTY_MONTHS_STOP:
+                break
+            month = shift_month(month, step)
+
+        return items, None
+
+    @classmethod
+    def day_transactions(cls, day, limit=None, since=None, plain=False):
+        """
+        Transactions of a "YYYY-MM-DD" day, newest first, at most limit of them.
+        With since (an ISO timestamp) only the ones logged after it are returned,
+        and a limit keeps the oldest of them: a poller that passes the newest
+        timestamp it got back as the next since skips nothing.
+        """
+        lower = since if since and since > day else day
+        # Walk away from since so a limit cuts off the newest entries, which the next poll picks up
+        newest_first = not since
+
+        if not index_registry.is_active(TABLE_KEY, INDEX_NAME):
+            logger.warning(f"{INDEX_NAME} is not active; reading the day's transactions from a scan")
+            filter_expression = Attr('date').eq(day)
+            if since:
+                filter_expression &= Attr('timestamp').gt(since)
+            transactions = dynamodb_service.scan_table(
+                TABLE_KEY, use_cache=False, plain=plain, FilterExpression=filter_expression
+            )
+            transactions.sort(key=lambda t: t.get('timestamp', ''), reverse=newest_first)
+            items = transactions[:limit] if limit else transactions
+            return items if newest_first else items[::-1]
+
+        items = []
+        start_key = None
+        while True:
+            response = cls.query_month(
+                transaction_month(day), limit - len(items) if limit else None, start_key,
+                start_date=lower, end_date=day, newest_first=newest_first, plain=plain
+            )
+            # The key condition is inclusive; since itself was already delivered
+            items.extend(t for t in response.get('Items', []) if not since or t['timestamp'] > since)
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key or (limit and len(items) >= limit):
+                items = items[:limit] if limit else items
+                return items if newest_first else items[::-1]
+
+    @staticmethod
+    def _page_from_scan(limit, start_key, operation_type, start_date, end_date, newest_first, plain):
+        logger.warning(f"{INDEX_NAME} is not active; listing transactions from a scan")
+        filter_expression = Attr('timestamp').exists()
+        if operation_type:
+            filter_expression &= Attr('operation_type').eq(operation_type)
+        if start_date:
+            filter_expression &= Attr('timestamp').gte(start_date)
+        if end_date:
+            filter_expression &= Attr('timestamp').lte(end_date + _TS_END)
+
+        transactions = dynamodb_service.scan_table(
+            TABLE_KEY, use_cache=False, plain=plain, FilterExpression=filter_expression
+        )
+        order = lambda t: (t['timestamp'], t['transaction_id'])
+        transactions.sort(key=order, reverse=newest_first)
+        if start_key:
+            after = (start_key['timestamp'], start_key['transaction_id'])
+            transactions = [t for t in transactions if (order(t) < after if newest_first else order(t) > after)]
+
+        page = transactions[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(transactions) > limit else None
+        return page, next_cursor
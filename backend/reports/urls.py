@@ -1,6 +1,8 @@
 from django.urls import path
 from . import views
 from . import normal_reports
+from . import exports
+from . import report_bundle
 
 urlpatterns = [
     # Stock reports - comprehensive daily report including inward and consumption
@@ -22,20 +24,31 @@ urlpatterns = [
     path('weekly-consumption-summary/', views.get_weekly_consumption_summary, name='weekly_consumption_summary'),
     path('monthly-consumption-summary/', views.get_monthly_consumption_summary, name='monthly_consumption_summary'),
     
+    # Daily, week-to-date and month-to-date reports of one anchor date in one call
+    path('bundle/', report_bundle.get_report_bundle, name='get_report_bundle'),
+    
     # Inward reports
     path('inward/daily/', views.get_daily_inward, name='get_daily_inward'),
     path('inward/weekly/', views.get_weekly_inward, name='get_weekly_inward'),
     path('inward/monthly/', views.get_monthly_inward, name='get_monthly_inward'),
     path('inward/monthly-grid/', views.get_monthly_inward_grid, name='get_monthly_inward_grid'),
     
+    # Fiscal-year / year-to-date stock statement
+    path('statement/', views.get_stock_statement, name='get_stock_statement'),
+    
     # Outward reports
     path('outward/monthly-grid/', views.get_monthly_outward_grid, name='get_monthly_outward_grid'),
     
     # Transaction reports
     path('transactions/', views.get_all_stock_transactions, name='get_all_stock_transactions'),
+    path('transactions/list/', views.list_stock_transactions, name='list_stock_transactions'),
     path('logs/today/', views.get_today_logs, name='get_today_logs'),
     path('item-history/', views.get_item_history, name='get_item_history'),
     
+    # Streaming CSV/XLSX exports
+    path('export/transactions/', exports.export_stock_transactions, name='export_stock_transactions'),
+    path('export/monthly-grid/', exports.export_monthly_grid, name='export_monthly_grid'),
+    
     # GRN reports
     # path('grn/supplier/', views.get_grn_by_supplier_name, name='get_grn_by_supplier_name'),  # Function not implemented yet
     
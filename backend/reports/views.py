@@ -1,8 +1,6 @@
 import json
 import calendar
 import logging
-import boto3
-from boto3.dynamodb.conditions import Attr, Key
 from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from datetime import datetime, timedelta, date
@@ -14,56 +12,21 @@ from django.views.decorators.cache import cache_page
 from django.core.cache import cache
 from django.conf import settings
 from backend.dynamodb_service import dynamodb_service
+from backend.fetch_planner import FetchPlan
+from backend.serialization import ResponseEncoder, FastJsonResponse
 from botocore.exceptions import ClientError
 from users.decorators import jwt_required
+from production.product_service import ProductService
+from .columnar_store import movement_rows_between
+from .balance_checkpoints import BalanceCheckpointService, month_bounds
+from .period_rollups import PeriodRollupService, fiscal_year, fiscal_year_months, parse_fiscal_year
+from .report_cache import ReportResultCache
+from .item_movements import ItemMovementService
+from .transaction_listing import TransactionListingService, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 
 logger = logging.getLogger(__name__)
 
-def ensure_transactions_index():
-    """
-    Creates a Global Secondary Index (GSI) on stock_transactions
-    to allow fast querying by 'operation_type' and 'date'.
-    """
-    try:
-        client = boto3.client('dynamodb', region_name='us-east-2')
-        table_desc = client.describe_table(TableName='stock_transactions')
-        
-        # Check if index already exists
-        gsi_list = table_desc['Table'].get('GlobalSecondaryIndexes', [])
-        if any(gsi['IndexName'] == 'OpTypeDateIndex' for gsi in gsi_list):
-            logger.info("Index 'OpTypeDateIndex' already exists.")
-            return
-
-        logger.info("Creating index 'OpTypeDateIndex' on table 'stock_transactions'...")
-        client.update_table(
-            TableName='stock_transactions',
-            AttributeDefinitions=[
-                {'AttributeName': 'operation_type', 'AttributeType': 'S'},
-                {'AttributeName': 'date', 'AttributeType': 'S'}
-            ],
-            GlobalSecondaryIndexUpdates=[
-                {
-                    'Create': {
-                        'IndexName': 'OpTypeDateIndex',
-                        'KeySchema': [
-                            {'AttributeName': 'operation_type', 'KeyType': 'HASH'},
-                            {'AttributeName': 'date', 'KeyType': 'RANGE'}
-                        ],
-                        'Projection': {'ProjectionType': 'ALL'},
-                        'ProvisionedThroughput': {
-                            'ReadCapacityUnits': 5,
-                            'WriteCapacityUnits': 5
-                        }
-                    }
-                }
-            ]
-        )
-        logger.info("Index creation initiated for 'OpTypeDateIndex'. It may take a few minutes to become Active.")
-        
-    except Exception as e:
-        logger.error(f"Error ensuring index: {str(e)}")
-
 def extract_consumption_details(transactions):
     """Extract consumption from AddDefectiveGoods & PushToProduction operations - exact Lambda match"""
     ops = ["AddDefectiveGoods", "PushToProduction"]
@@ -114,13 +77,6 @@ def get_group_chain(group_id):
         group_id = grp.get('parent_id')
     return chain
 
-class DecimalEncoder(json.JSONEncoder):
-    """JSON encoder for Decimal types - exact Lambda match"""
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        return super(DecimalEncoder, self).default(o)
-
 @csrf_exempt
 @require_http_methods(["POST"])
 @jwt_required
@@ -157,7 +113,7 @@ def get_daily_inward(request):
         report_date = body.get("report_date")
         
         payload = InwardService.get_daily_inward(report_date)
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        return JsonResponse(payload, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_daily_inward: {e}", exc_info=True)
@@ -176,7 +132,7 @@ def get_weekly_inward(request):
         end_date = body.get("end_date")
         
         payload = InwardService.get_weekly_inward(start_date, end_date)
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        return JsonResponse(payload, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_weekly_inward: {e}", exc_info=True)
@@ -212,7 +168,7 @@ def get_monthly_inward(request):
         payload = InwardService.get_weekly_inward(start_date, end_date)
         payload["month"] = month_str
         
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        return JsonResponse(payload, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_monthly_inward: {e}", exc_info=True)
@@ -224,35 +180,19 @@ def get_monthly_inward(request):
 def get_all_stock_transactions(request):
     """Get all stock transactions - converted from Lambda get_all_stock_transactions function"""
     try:
-        # Get all transactions from DynamoDB - using correct table name
-        transactions = dynamodb_service.scan_table('stock_transactions')
-        
-        # Convert Decimal objects to float for JSON serialization
-        processed_transactions = []
-        for tx in transactions:
-            processed_tx = {
-                'transaction_id': tx.get('transaction_id', ''),
-                'date': tx.get('date', ''),
-                'timestamp': tx.get('timestamp', ''),
-                'operation_type': tx.get('operation_type', ''),
-                'details': {}
-            }
-            
-            # Process details, converting Decimal to float
-            details = tx.get('details', {})
-            for key, value in details.items():
-                if hasattr(value, '__float__'):  # Decimal objects
-                    processed_tx['details'][key] = float(value)
-                else:
-                    processed_tx['details'][key] = value
-            
-            processed_transactions.append(processed_tx)
+        # Only the returned fields are read, with numbers already as int/float
+        transactions = dynamodb_service.scan_table(
+            'stock_transactions',
+            plain=True,
+            ProjectionExpression='transaction_id, #date, #ts, operation_type, details',
+            ExpressionAttributeNames={'#date': 'date', '#ts': 'timestamp'}
+        )
         
         # Sort by timestamp (newest first)
-        processed_transactions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+        transactions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
         
-        logger.info(f"Retrieved {len(processed_transactions)} stock transaction records.")
-        return JsonResponse(processed_transactions, safe=False)
+        logger.info(f"Retrieved {len(transactions)} stock transaction records.")
+        return FastJsonResponse(transactions)
         
     except Exception as e:
         logger.error(f"Error in get_all_stock_transactions: {str(e)}")
@@ -261,10 +201,65 @@ def get_all_stock_transactions(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 @jwt_required
-def get_today_logs(request):
-    """Get today's logs - converted from Lambda get_today_logs function"""
+def list_stock_transactions(request, body=None):
+    """One page of stock transactions, newest first by default, resumed with next_cursor"""
     try:
-        body = json.loads(request.body)
+        if body is None:
+            body = json.loads(request.body) if request.body else {}
+
+        try:
+            limit = int(body.get('limit', DEFAULT_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "'limit' must be an integer"}, status=400)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return JsonResponse({"error": f"'limit' must be between 1 and {MAX_PAGE_SIZE}"}, status=400)
+
+        start_date = (body.get('start_date') or '').strip() or None
+        end_date = (body.get('end_date') or '').strip() or None
+        for value in filter(None, (start_date, end_date)):
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return JsonResponse({"error": "Dates must be in format YYYY-MM-DD"}, status=400)
+
+        order = str(body.get('order', 'desc')).lower()
+        if order not in ('asc', 'desc'):
+            return JsonResponse({"error": "'order' must be 'asc' or 'desc'"}, status=400)
+
+        try:
+            transactions, next_cursor = TransactionListingService.list_page(
+                limit=limit,
+                cursor=body.get('cursor') or None,
+                operation_type=(body.get('operation_type') or '').strip() or None,
+                start_date=start_date,
+                end_date=end_date,
+                newest_first=order == 'desc',
+                plain=True
+            )
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        return FastJsonResponse({
+            "transactions": transactions,
+            "count": len(transactions),
+            "next_cursor": next_cursor
+        })
+
+    except Exception as e:
+        logger.error(f"Error in list_stock_transactions: {e}", exc_info=True)
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def get_today_logs(request, body=None):
+    """
+    Today's logs, newest first; with 'since' (a timestamp) only the entries logged after it,
+    the oldest 'limit' of them when more are waiting (has_more)
+    """
+    try:
+        if body is None:
+            body = json.loads(request.body)
         
         limit = body.get("limit")
         if limit is not None:
@@ -274,60 +269,42 @@ def get_today_logs(request):
                     limit = None
             except (TypeError, ValueError):
                 limit = None
+        since = body.get("since") or None
 
         today = datetime.now().strftime("%Y-%m-%d")
         
-        # Debug: Get all transactions to check date formats - using correct table name
-        all_transactions = dynamodb_service.scan_table('stock_transactions')
-        logger.info(f"Total transactions in DB: {len(all_transactions)}")
-        if all_transactions:
-            sample_dates = [tx.get('date') for tx in all_transactions[:5]]
-            logger.info(f"Sample dates: {sample_dates}")
-        
-        # Get today's transactions from DynamoDB - using correct table name
-        transactions = dynamodb_service.scan_table(
-            'stock_transactions',
-            FilterExpression='#date = :today',
-            ExpressionAttributeNames={'#date': 'date'},
-            ExpressionAttributeValues={':today': today}
-        )
+        # Today's transactions through the month/timestamp index, limit pushed down to the query;
+        # when polling, one extra entry tells whether more are waiting after this batch
+        fetch_limit = limit + 1 if since and limit else limit
+        transactions = TransactionListingService.day_transactions(today, limit=fetch_limit, since=since, plain=True)
+        has_more = bool(since and limit and len(transactions) > limit)
+        if has_more:
+            transactions = transactions[1:]
         
         logger.info(f"Looking for date: {today}, Found {len(transactions)} transactions")
         
-        # Process and convert Decimal objects
-        processed_logs = []
-        for tx in transactions:
-            processed_tx = {
+        # Numbers already arrive as int/float (plain read)
+        processed_logs = [
+            {
                 'transaction_id': tx.get('transaction_id', ''),
                 'date': tx.get('date', ''),
                 'timestamp': tx.get('timestamp', ''),
                 'operation_type': tx.get('operation_type', ''),
-                'details': {}
+                'details': tx.get('details', {})
             }
-            
-            details = tx.get('details', {})
-            for key, value in details.items():
-                if hasattr(value, '__float__'):
-                    processed_tx['details'][key] = float(value)
-                else:
-                    processed_tx['details'][key] = value
-            
-            processed_logs.append(processed_tx)
-        
-        # Sort by timestamp (newest first)
-        processed_logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        
-        # Apply limit if specified
-        if limit:
-            processed_logs = processed_logs[:limit]
+            for tx in transactions
+        ]
         
         payload = {
             "date": today,
             "count": len(processed_logs),
-            "logs": processed_logs
+            "logs": processed_logs,
+            # Pass back as 'since' to poll only newer entries; has_more means poll again right away
+            "latest_timestamp": processed_logs[0]['timestamp'] if processed_logs else since,
+            "has_more": has_more
         }
         
-        return JsonResponse(payload)
+        return FastJsonResponse(payload)
         
     except Exception as e:
         logger.error(f"Error in get_today_logs: {e}")
@@ -339,44 +316,16 @@ def get_today_logs(request):
 def get_daily_push_to_production(request):
     """Get daily push to production report"""
     try:
-        from backend.dynamodb_service import dynamodb_service
-        from collections import defaultdict
-        
         body = json.loads(request.body) if request.body else {}
         date_str = body.get('date')
         
         if not date_str:
             return JsonResponse({"error": "'date' is required (format: YYYY-MM-DD)"}, status=400)
+        datetime.strptime(date_str, "%Y-%m-%d")
             
-        # Get all push records
-        push_records = dynamodb_service.scan_table('push_to_production')
-        
-        # Filter by date
-        daily_items = [
-            item for item in push_records
-            if item.get('timestamp', '').startswith(date_str)
-        ]
-        
-        # Group by product for summary
-        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
-        
-        for item in daily_items:
-            product_id = item.get('product_id', 'Unknown')
-            product_name = item.get('product_name', 'Unknown')
-            quantity = float(item.get('quantity_produced', 0))
-            
-            product_summary[product_id]["product_name"] = product_name
-            product_summary[product_id]["total_quantity"] += quantity
-            
-        # Convert to list
-        summary_list = [
-            {
-                "product_id": product_id,
-                "product_name": data["product_name"],
-                "total_quantity": data["total_quantity"]
-            }
-            for product_id, data in product_summary.items()
-        ]
+        # Range-query only the push records in the period
+        daily_items = ProductService.get_push_records_between(date_str, date_str)
+        summary_list = ProductService.summarize_push_records(daily_items)
         
         return JsonResponse({
             "summary": summary_list,
@@ -393,8 +342,6 @@ def get_daily_push_to_production(request):
 def get_weekly_push_to_production(request):
     """Get weekly push to production report"""
     try:
-        from backend.dynamodb_service import dynamodb_service
-        from collections import defaultdict
         from datetime import datetime
         
         body = json.loads(request.body) if request.body else {}
@@ -404,41 +351,13 @@ def get_weekly_push_to_production(request):
         if not from_str or not to_str:
             return JsonResponse({"error": "'from_date' and 'to_date' are required (format: YYYY-MM-DD)"}, status=400)
             
-        from_date = datetime.strptime(from_str, "%Y-%m-%d").date()
-        to_date = datetime.strptime(to_str, "%Y-%m-%d").date()
-        
-        # Get all push records
-        push_records = dynamodb_service.scan_table('push_to_production')
-        
-        # Filter by date range
-        weekly_items = []
-        for item in push_records:
-            timestamp = item.get('timestamp')
-            if timestamp:
-                dt = datetime.strptime(timestamp[:10], "%Y-%m-%d").date()
-                if from_date <= dt <= to_date:
-                    weekly_items.append(item)
-                    
-        # Group by product for summary
-        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
-        
-        for item in weekly_items:
-            product_id = item.get('product_id', 'Unknown')
-            product_name = item.get('product_name', 'Unknown')
-            quantity = float(item.get('quantity_produced', 0))
-            
-            product_summary[product_id]["product_name"] = product_name
-            product_summary[product_id]["total_quantity"] += quantity
-            
-        # Convert to list
-        summary_list = [
-            {
-                "product_id": product_id,
-                "product_name": data["product_name"],
-                "total_quantity": data["total_quantity"]
-            }
-            for product_id, data in product_summary.items()
-        ]
+        # Malformed dates fail here rather than range-querying nothing
+        datetime.strptime(from_str, "%Y-%m-%d")
+        datetime.strptime(to_str, "%Y-%m-%d")
+        
+        # Range-query only the push records in the period
+        weekly_items = ProductService.get_push_records_between(from_str, to_str)
+        summary_list = ProductService.summarize_push_records(weekly_items)
         
         return JsonResponse({
             "summary": summary_list,
@@ -455,8 +374,6 @@ def get_weekly_push_to_production(request):
 def get_monthly_push_to_production(request):
     """Get monthly push to production report"""
     try:
-        from backend.dynamodb_service import dynamodb_service
-        from collections import defaultdict
         from datetime import datetime
         
         body = json.loads(request.body) if request.body else {}
@@ -466,41 +383,13 @@ def get_monthly_push_to_production(request):
         if not from_str or not to_str:
             return JsonResponse({"error": "'from_date' and 'to_date' are required (format: YYYY-MM-DD)"}, status=400)
             
-        from_date = datetime.strptime(from_str, "%Y-%m-%d").date()
-        to_date = datetime.strptime(to_str, "%Y-%m-%d").date()
-        
-        # Get all push records
-        push_records = dynamodb_service.scan_table('push_to_production')
-        
-        # Filter by date range
-        monthly_items = []
-        for item in push_records:
-            timestamp = item.get('timestamp')
-            if timestamp:
-                dt = datetime.strptime(timestamp[:10], "%Y-%m-%d").date()
-                if from_date <= dt <= to_date:
-                    monthly_items.append(item)
-                    
-        # Group by product for summary
-        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
-        
-        for item in monthly_items:
-            product_id = item.get('product_id', 'Unknown')
-            product_name = item.get('product_name', 'Unknown')
-            quantity = float(item.get('quantity_produced', 0))
-            
-            product_summary[product_id]["product_name"] = product_name
-            product_summary[product_id]["total_quantity"] += quantity
-            
-        # Convert to list
-        summary_list = [
-            {
-                "product_id": product_id,
-                "product_name": data["product_name"],
-                "total_quantity": data["total_quantity"]
-            }
-            for product_id, data in product_summary.items()
-        ]
+        # Malformed dates fail here rather than range-querying nothing
+        datetime.strptime(from_str, "%Y-%m-%d")
+        datetime.strptime(to_str, "%Y-%m-%d")
+        
+        # Range-query only the push records in the period
+        monthly_items = ProductService.get_push_records_between(from_str, to_str)
+        summary_list = ProductService.summarize_push_records(monthly_items)
         
         return JsonResponse({
             "summary": summary_list,
@@ -514,15 +403,14 @@ def get_monthly_push_to_production(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 @jwt_required
-def get_monthly_production_summary(request):
+def get_monthly_production_summary(request, body=None):
     """Get monthly production summary"""
     try:
-        from backend.dynamodb_service import dynamodb_service
-        from collections import defaultdict
         from datetime import datetime
         import calendar
         
-        body = json.loads(request.body) if request.body else {}
+        if body is None:
+            body = json.loads(request.body) if request.body else {}
         month_str = body.get('month')
         
         if not month_str:
@@ -539,36 +427,9 @@ def get_monthly_production_summary(request):
         last_day = calendar.monthrange(year, month)[1]
         end_date = f"{year}-{month:02d}-{last_day:02d}"
         
-        # Get all push records
-        push_records = dynamodb_service.scan_table('push_to_production')
-        
-        # Filter by month
-        monthly_items = []
-        for item in push_records:
-            timestamp = item.get('timestamp')
-            if timestamp and start_date <= timestamp[:10] <= end_date:
-                monthly_items.append(item)
-                
-        # Group by product for summary
-        product_summary = defaultdict(lambda: {"product_name": "", "total_quantity": 0})
-        
-        for item in monthly_items:
-            product_id = item.get('product_id', 'Unknown')
-            product_name = item.get('product_name', 'Unknown')
-            quantity = float(item.get('quantity_produced', 0))
-            
-            product_summary[product_id]["product_name"] = product_name
-            product_summary[product_id]["total_quantity"] += quantity
-            
-        # Convert to list
-        summary_list = [
-            {
-                "product_id": product_id,
-                "product_name": data["product_name"],
-                "total_quantity": data["total_quantity"]
-            }
-            for product_id, data in product_summary.items()
-        ]
+        # Range-query only the push records in the period
+        monthly_items = ProductService.get_push_records_between(start_date, end_date)
+        summary_list = ProductService.summarize_push_records(monthly_items)
         
         return JsonResponse({
             "month": month_str,
@@ -582,13 +443,23 @@ def get_monthly_production_summary(request):
         logger.error(f"Error in get_monthly_production_summary: {e}")
         return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
 
+# operation_type -> (details field, totals key) summed into the item history totals
+HISTORY_TOTALS = {
+    'AddStockQuantity': ('quantity_added', 'added'),
+    'SubtractStockQuantity': ('quantity_subtracted', 'subtracted'),
+    'AddDefectiveGoods': ('defective_added', 'defective_added'),
+    'SubtractDefectiveGoods': ('defective_subtracted', 'defective_subtracted'),
+    'PushToProduction': ('quantity_consumed', 'consumed_by_production'),
+}
+
 @csrf_exempt
 @require_http_methods(["POST"])
 @jwt_required
-def get_item_history(request):
-    """Get item history - converted from Lambda get_item_history function"""
+def get_item_history(request, body=None):
+    """Movements of one item, read from the per-item movement index"""
     try:
-        body = json.loads(request.body)
+        if body is None:
+            body = json.loads(request.body)
         
         item_id = body.get("item_id")
         if not isinstance(item_id, str) or not item_id.strip():
@@ -602,31 +473,23 @@ def get_item_history(request):
         date_from = body.get("date_from")
         date_to = body.get("date_to")
 
-        # Get all transactions - using correct table name
-        filter_expr = None
-        expr_attr_values = {}
-        
-        if date_from and date_to:
-            filter_expr = '#date BETWEEN :date_from AND :date_to'
-            expr_attr_values = {':date_from': date_from, ':date_to': date_to}
-        elif date_from:
-            filter_expr = '#date >= :date_from'
-            expr_attr_values = {':date_from': date_from}
-        elif date_to:
-            filter_expr = '#date <= :date_to'
-            expr_attr_values = {':date_to': date_to}
-        
-        if filter_expr:
-            transactions = dynamodb_service.scan_table(
-                'stock_transactions',
-                FilterExpression=filter_expr,
-                ExpressionAttributeNames={'#date': 'date'},
-                ExpressionAttributeValues=expr_attr_values
+        limit = body.get("limit")
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except (TypeError, ValueError):
+                return JsonResponse({"error": "'limit' must be an integer"}, status=400)
+            if limit <= 0:
+                limit = None
+
+        try:
+            rows, next_cursor = ItemMovementService.history(
+                item_id, date_from, date_to, newest_first=order == "desc",
+                limit=limit, cursor=body.get("cursor") or None
             )
-        else:
-            transactions = dynamodb_service.scan_table('stock_transactions')
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
         
-        # Filter transactions for this item
         item_events = []
         totals = {
             "added": 0.0,
@@ -636,66 +499,32 @@ def get_item_history(request):
             "consumed_by_production": 0.0
         }
         
-        for tx in transactions:
-            details = tx.get('details', {})
-            tx_item_id = details.get('item_id')
-            
-            if tx_item_id == item_id:
-                op_type = tx.get('operation_type', '')
-                event = {
-                    'transaction_id': tx.get('transaction_id', ''),
-                    'date': tx.get('date', ''),
-                    'timestamp': tx.get('timestamp', ''),
-                    'operation_type': op_type,
-                    'details': {}
+        for row in rows:
+            op_type = row.get('operation_type', '')
+            details = {
+                key: float(value) if isinstance(value, Decimal) else value
+                for key, value in (row.get('details') or {}).items()
+            }
+            if op_type in HISTORY_TOTALS:
+                field, total_key = HISTORY_TOTALS[op_type]
+                totals[total_key] += float(details.get(field) or 0)
+
+            if op_type == 'PushToProduction':
+                # One row per material the push deducted
+                op_type = 'ProductionConsumption'
+                details = {
+                    'item_id': item_id,
+                    'username': row.get('username', ''),
+                    **details
                 }
-                
-                # Convert Decimal to float and calculate totals
-                for key, value in details.items():
-                    if hasattr(value, '__float__'):
-                        event['details'][key] = float(value)
-                        
-                        # Calculate totals based on operation type
-                        if op_type == 'AddStockQuantity' and key == 'quantity_added':
-                            totals['added'] += float(value)
-                        elif op_type == 'SubtractStockQuantity' and key == 'quantity_subtracted':
-                            totals['subtracted'] += float(value)
-                        elif op_type == 'AddDefectiveGoods' and key == 'defective_quantity_added':
-                            totals['defective_added'] += float(value)
-                        elif op_type == 'SubtractDefectiveGoods' and key == 'defective_quantity_subtracted':
-                            totals['defective_subtracted'] += float(value)
-                    else:
-                        event['details'][key] = value
-                
-                item_events.append(event)
-        
-        # Get production records that consumed this item
-        production_records = dynamodb_service.scan_table('push_to_production')
-        for record in production_records:
-            components = record.get('components', [])
-            for component in components:
-                if component.get('item_id') == item_id:
-                    consumed_qty = float(component.get('quantity_consumed', 0))
-                    totals['consumed_by_production'] += consumed_qty
-                    
-                    # Add production event
-                    item_events.append({
-                        'transaction_id': record.get('production_id', ''),
-                        'date': record.get('date', ''),
-                        'timestamp': record.get('timestamp', ''),
-                        'operation_type': 'ProductionConsumption',
-                        'details': {
-                            'item_id': item_id,
-                            'quantity_consumed': consumed_qty,
-                            'product_id': record.get('product_id', ''),
-                            'product_name': record.get('product_name', ''),
-                            'username': record.get('username', '')
-                        }
-                    })
-        
-        # Sort events
-        reverse_order = order == "desc"
-        item_events.sort(key=lambda x: x.get('timestamp', ''), reverse=reverse_order)
+
+            item_events.append({
+                'transaction_id': row.get('transaction_id', ''),
+                'date': row.get('date', ''),
+                'timestamp': row.get('timestamp', ''),
+                'operation_type': op_type,
+                'details': details
+            })
         
         payload = {
             "item_id": item_id,
@@ -703,15 +532,95 @@ def get_item_history(request):
             "date_to": date_to,
             "count": len(item_events),
             "events": item_events,
-            "totals": totals
+            "totals": totals,
+            "next_cursor": next_cursor
         }
         
-        return JsonResponse(payload)
+        return JsonResponse(payload, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_item_history: {e}")
         return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
 
+def compute_monthly_inward_grid(month_str):
+    """Inward grid for a "YYYY-MM" month, every material grouped by group name"""
+    year, month = map(int, month_str.split("-"))
+    
+    # 1) Determine first and last day of month
+    first_day = date(year, month, 1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+    start_date_str = first_day.strftime("%Y-%m-%d")
+    end_date_str = last_day.strftime("%Y-%m-%d")
+
+    # 2) Stock items (then the opening balances from the month checkpoints), this month's
+    #    movement rows and the groups, read concurrently
+    data = (FetchPlan()
+            .add('stock_items', dynamodb_service.scan_table, 'STOCK', use_cache=False)
+            .add('opening_map', lambda stock_items: BalanceCheckpointService.opening_balances(f"{year}-{month:02d}", stock_items),
+                 needs=('stock_items',))
+            .add('rows', movement_rows_between, start_date_str, end_date_str)
+            .add('groups', dynamodb_service.scan_table, 'GROUPS', use_cache=False)
+            .run())
+    live_stock_map = {}
+    for item in data['stock_items']:
+        live_stock_map[item['item_id']] = {
+            "group_id": item.get('group_id'),
+            "name": item.get('name')
+        }
+
+    # 3) Opening balances and this month's movement rows
+    opening_map = data['opening_map']
+    rows = data['rows']
+
+    # 4) Process inward rows
+    inward_data = defaultdict(lambda: {
+        'inward_days': {},
+        'total_inward': 0.0
+    })
+
+    for row in rows:
+        if 'inward_qty' not in row:
+            continue
+        item_id = row['item_id']
+        quantity_added = float(row['inward_qty'])
+        day = str(int(row['date'].split('-')[2]))
+        inward_data[item_id]['inward_days'][day] = inward_data[item_id]['inward_days'].get(day, 0.0) + quantity_added
+        inward_data[item_id]['total_inward'] += quantity_added
+
+    # 5) Build response for ALL materials
+    group_map = {g['group_id']: g.get('name', 'Unknown') for g in data['groups']}
+
+    final_output = defaultdict(list)
+    monthly_total = 0.0
+
+    for item_id, info in live_stock_map.items():
+        data = inward_data[item_id]
+
+        opening_balance = float(opening_map.get(item_id, 0))
+
+        monthly_total += data['total_inward']
+
+        item_entry = {
+            "item_id": item_id,
+            "item_name": info['name'],
+            "opening_balance": round(opening_balance, 2),
+            "inward_days": dict(data['inward_days']),
+            "total_inward": round(data['total_inward'], 2)
+        }
+
+        grp_name = group_map.get(info['group_id'], "Ungrouped")
+        final_output[grp_name].append(item_entry)
+
+    # 6) Build payload
+    payload = {
+        "month": month_str,
+        "type": "INWARD",
+        "grid_data": dict(final_output),
+        "monthly_total": monthly_total
+    }
+    
+    return payload
+
 @csrf_exempt
 @require_http_methods(["POST"])
 @jwt_required
@@ -730,119 +639,101 @@ def get_monthly_inward_grid(request, body=None):
         except ValueError:
             return JsonResponse({"error": "'month' must be in format YYYY-MM"}, status=400)
         
-        # 1) Determine first and last day of month
-        first_day = date(year, month, 1)
-        last_day = date(year, month, calendar.monthrange(year, month)[1])
-        start_date_str = first_day.strftime("%Y-%m-%d")
-        end_date_str = last_day.strftime("%Y-%m-%d")
-        
-        # 2) Fetch ALL Stock items first
-        live_stock_map = {}
-        stock_items = dynamodb_service.scan_table('STOCK')
-        for item in stock_items:
-            live_stock_map[item['item_id']] = {
-                "current_qty": float(item.get('quantity', 0)),
-                "group_id": item.get('group_id'),
-                "name": item.get('name')
-            }
-        
-        # 3) Get AddStockQuantity transactions for the month
-        from boto3.dynamodb.conditions import Attr
-        transactions = dynamodb_service.scan_table(
-            'stock_transactions',
-            FilterExpression=Attr('operation_type').eq('AddStockQuantity') & 
-                           Attr('date').between(start_date_str, end_date_str)
-        )
-        
-        # 4) Process inward transactions
-        inward_data = defaultdict(lambda: {
-            'inward_days': {},
-            'total_inward': 0.0,
-            'total_in_period_to_now': 0.0
-        })
-        
-        # Get all AddStockQuantity transactions from month start to calculate opening balance
-        all_inward_txns = dynamodb_service.scan_table(
-            'stock_transactions',
-            FilterExpression=Attr('operation_type').eq('AddStockQuantity') & 
-                           Attr('date').gte(start_date_str)
+        start_date_str = date(year, month, 1).strftime("%Y-%m-%d")
+        end_date_str = date(year, month, calendar.monthrange(year, month)[1]).strftime("%Y-%m-%d")
+        payload = ReportResultCache.get_or_compute(
+            "monthly_inward_grid", {"month": month_str}, start_date_str, end_date_str,
+            lambda: compute_monthly_inward_grid(month_str)
         )
-        
-        # Process all inward transactions for opening balance calculation
-        for txn in all_inward_txns:
-            details = txn.get('details', {})
-            item_id = details.get('item_id')
-            if not item_id:
-                continue
-            quantity_added = float(details.get('quantity_added', 0))
-            inward_data[item_id]['total_in_period_to_now'] += quantity_added
-        
-        # Process month-specific transactions for inward_days
-        for txn in transactions:
-            details = txn.get('details', {})
-            item_id = details.get('item_id')
-            if not item_id:
-                continue
-                
-            # Extract day from date
-            txn_date = txn.get('date', '')
-            day = int(txn_date.split('-')[2]) if txn_date else 0
-            
-            quantity_added = float(details.get('quantity_added', 0))
-            
-            # Update inward data
-            inward_data[item_id]['inward_days'][str(day)] = inward_data[item_id]['inward_days'].get(str(day), 0.0) + quantity_added
-            inward_data[item_id]['total_inward'] += quantity_added
-        
-        # 5) Build response for ALL materials
-        groups_data = dynamodb_service.scan_table('GROUPS')
-        group_map = {g['group_id']: g.get('name', 'Unknown') for g in groups_data}
-        
-        final_output = defaultdict(list)
-        monthly_total = 0.0
-        
-        for item_id, info in live_stock_map.items():
-            data = inward_data[item_id]
-            
-            # Calculate opening balance: current_qty - total_inward_since_month_start
-            opening_balance = info['current_qty'] - data['total_in_period_to_now']
-            
-            monthly_total += data['total_inward']
-            
-            item_entry = {
-                "item_id": item_id,
-                "item_name": info['name'],
-                "opening_balance": round(opening_balance, 2),
-                "inward_days": dict(data['inward_days']),
-                "total_inward": round(data['total_inward'], 2)
-            }
-            
-            grp_name = group_map.get(info['group_id'], "Ungrouped")
-            final_output[grp_name].append(item_entry)
-        
-        # 6) Build payload
-        payload = {
-            "month": month_str,
-            "type": "INWARD",
-            "grid_data": dict(final_output),
-            "monthly_total": monthly_total
-        }
-        
-        return JsonResponse(payload, encoder=DecimalEncoder)
+        return JsonResponse(payload, encoder=ResponseEncoder)
         
     except Exception as e:
         logger.error(f"Error in get_monthly_inward_grid: {e}", exc_info=True)
         return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
 
+def compute_monthly_outward_grid(month_str):
+    """Outward grid for a "YYYY-MM" month, every material grouped by group name"""
+    year, month = map(int, month_str.split("-"))
+    
+    # 1) Determine first and last day of month
+    first_day = date(year, month, 1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+    start_date_str = first_day.strftime("%Y-%m-%d")
+    end_date_str = last_day.strftime("%Y-%m-%d")
+
+    # 2) Stock items (then the opening balances from the month checkpoints), this month's
+    #    movement rows and the groups, read concurrently
+    data = (FetchPlan()
+            .add('stock_items', dynamodb_service.scan_table, 'STOCK', use_cache=False)
+            .add('opening_map', lambda stock_items: BalanceCheckpointService.opening_balances(f"{year}-{month:02d}", stock_items),
+                 needs=('stock_items',))
+            .add('rows', movement_rows_between, start_date_str, end_date_str)
+            .add('groups', dynamodb_service.scan_table, 'GROUPS', use_cache=False)
+            .run())
+    live_stock_map = {}
+    for item in data['stock_items']:
+        live_stock_map[item['item_id']] = {
+            "group_id": item.get('group_id'),
+            "name": item.get('name')
+        }
+
+    # 3) Opening balances and this month's movement rows
+    opening_map = data['opening_map']
+    rows = data['rows']
+
+    # 4) Process Data
+    report_data = defaultdict(lambda: {
+        "out_days": defaultdict(float),
+        "total_out_month": 0.0
+    })
+
+    for row in rows:
+        if 'consumption_qty' not in row:
+            continue
+        item_id = row['item_id']
+        qty = float(row['consumption_qty'])
+        day_num = int(row['date'].split('-')[2])
+        report_data[item_id]["out_days"][str(day_num)] += qty
+        report_data[item_id]["total_out_month"] += qty
+
+    # 5) Build Response with groups
+    group_map = {g['group_id']: g.get('name', 'Unknown') for g in data['groups']}
+
+    final_output = defaultdict(list)
+    monthly_total = 0.0
+
+    for item_id, info in live_stock_map.items():
+        data = report_data[item_id]
+        opening_balance = float(opening_map.get(item_id, 0))
+
+        monthly_total += data["total_out_month"]
+
+        item_entry = {
+            "item_id": item_id,
+            "item_name": info['name'],
+            "opening_balance": round(opening_balance, 2),
+            "outward_days": dict(data["out_days"]),
+            "total_outward": round(data["total_out_month"], 2)
+        }
+        grp_name = group_map.get(info['group_id'], "Ungrouped")
+        final_output[grp_name].append(item_entry)
+
+    # 6) Build payload
+    payload = {
+        "month": month_str,
+        "type": "OUTWARD",
+        "grid_data": dict(final_output),
+        "monthly_total": monthly_total
+    }
+    
+    return payload
+
 @csrf_exempt
 @require_http_methods(["POST"])
 @jwt_required
 def get_monthly_outward_grid(request, body=None):
-    """Get monthly outward grid - optimized with GSI queries"""
+    """Get monthly outward grid - reads the per-item daily movement aggregates"""
     try:
-        # Ensure index exists
-        ensure_transactions_index()
-        
         if body is None:
             body = json.loads(request.body)
         
@@ -855,129 +746,110 @@ def get_monthly_outward_grid(request, body=None):
         except ValueError:
             return JsonResponse({"error": "'month' must be in format YYYY-MM"}, status=400)
         
-        # 1) Determine first and last day of month
-        first_day = date(year, month, 1)
-        last_day = date(year, month, calendar.monthrange(year, month)[1])
-        start_date_str = first_day.strftime("%Y-%m-%d")
-        end_date_str = last_day.strftime("%Y-%m-%d")
-        
-        # 2) Fetch LIVE Stock
-        live_stock_map = {}
-        stock_items = dynamodb_service.scan_table('STOCK')
-        for item in stock_items:
-            live_stock_map[item['item_id']] = {
-                "current_qty": float(item.get('quantity', 0)),
-                "group_id": item.get('group_id'),
-                "name": item.get('name')
-            }
-        
-        # 3) OPTIMIZED FETCH: Query specific operations via Index
-        import boto3
-        dynamodb = boto3.resource('dynamodb', region_name='us-east-2')
-        tx_tbl = dynamodb.Table('stock_transactions')
-        txns = []
-        
-        # List of operations we need for the O/B Math
-        required_ops = ["AddStockQuantity", "PushToProduction", "AddDefectiveGoods"]
+        start_date_str = date(year, month, 1).strftime("%Y-%m-%d")
+        end_date_str = date(year, month, calendar.monthrange(year, month)[1]).strftime("%Y-%m-%d")
+        payload = ReportResultCache.get_or_compute(
+            "monthly_outward_grid", {"month": month_str}, start_date_str, end_date_str,
+            lambda: compute_monthly_outward_grid(month_str)
+        )
+        return JsonResponse(payload, encoder=ResponseEncoder)
         
-        for op in required_ops:
+    except Exception as e:
+        logger.error(f"Error in get_monthly_outward_grid: {e}", exc_info=True)
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
+
+
+def compute_stock_statement(start_month, end_date, label):
+    """Per-item opening, inward, consumption, defective and closing quantities and values from start_month to end_date"""
+    stock_items = dynamodb_service.scan_table('STOCK', use_cache=False)
+    opening_map = BalanceCheckpointService.opening_balances(start_month, stock_items)
+    totals, periods = PeriodRollupService.range_totals(start_month, end_date)
+
+    groups_data = dynamodb_service.scan_table('GROUPS', use_cache=False)
+    group_map = {g['group_id']: g.get('name', 'Unknown') for g in groups_data}
+
+    statement = defaultdict(list)
+    grand = defaultdict(float)
+    for item in stock_items:
+        item_id = item['item_id']
+        rate = Decimal(str(item.get('cost_per_unit', 0)))
+        moved = totals.get(item_id, {})
+        opening_qty = Decimal(str(opening_map.get(item_id, 0)))
+        inward_qty = moved.get('inward_qty', Decimal('0'))
+        consumption_qty = moved.get('consumption_qty', Decimal('0'))
+        closing_qty = opening_qty + inward_qty - consumption_qty
+
+        row = {
+            "item_id": item_id,
+            "item_name": item.get('name'),
+            "rate": float(rate),
+            "opening_qty": float(opening_qty),
+            "opening_value": float(opening_qty * rate),
+            "inward_qty": float(inward_qty),
+            "inward_value": float(moved.get('inward_cost', Decimal('0'))),
+            "consumption_qty": float(consumption_qty),
+            "consumption_value": float(consumption_qty * rate),
+            "defective_qty": float(moved.get('defective_qty', Decimal('0'))),
+            "closing_qty": float(closing_qty),
+            "closing_value": float(closing_qty * rate),
+        }
+        for field, value in row.items():
+            if field.endswith('_qty') or field.endswith('_value'):
+                grand[field] += value
+        statement[group_map.get(item.get('group_id'), "Ungrouped")].append(row)
+
+    return {
+        "statement": label,
+        "start_date": f"{start_month}-01",
+        "end_date": end_date,
+        "groups": dict(statement),
+        "totals": {field: round(value, 2) for field, value in grand.items()},
+        "periods_read": periods,
+    }
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def get_stock_statement(request, body=None):
+    """Fiscal-year (April-March) or year-to-date stock statement assembled from the period rollups"""
+    try:
+        if body is None:
+            body = json.loads(request.body) if request.body else {}
+
+        today = (datetime.utcnow() + timedelta(hours=5, minutes=30)).strftime("%Y-%m-%d")
+        kind = str(body.get("type", "YTD")).strip().upper()
+        if kind == "FY":
             try:
-                # Query GSI: operation_type = op AND date >= start_date
-                query_params = {
-                    'IndexName': 'OpTypeDateIndex',
-                    'KeyConditionExpression': Key('operation_type').eq(op) & Key('date').gte(start_date_str)
-                }
-                
-                resp = tx_tbl.query(**query_params)
-                txns.extend(resp.get("Items", []))
-                
-                while 'LastEvaluatedKey' in resp:
-                    query_params['ExclusiveStartKey'] = resp['LastEvaluatedKey']
-                    resp = tx_tbl.query(**query_params)
-                    txns.extend(resp.get("Items", []))
-            except Exception as query_error:
-                logger.warning(f"GSI query failed for {op}, falling back to scan: {query_error}")
-                # Fallback to scan if GSI not ready
-                fallback_txns = dynamodb_service.scan_table(
-                    'stock_transactions',
-                    FilterExpression=Attr('operation_type').eq(op) & Attr('date').gte(start_date_str)
-                )
-                txns.extend(fallback_txns)
-        
-        # 4) Process Data
-        report_data = defaultdict(lambda: {
-            "out_days": defaultdict(float),
-            "total_in_period_to_now": 0.0,
-            "total_out_period_to_now": 0.0,
-            "total_out_month": 0.0
-        })
-        
-        for tx in txns:
-            tx_date_str = tx.get('date')
+                start_year = parse_fiscal_year(body.get('fiscal_year', fiscal_year(today)))
+            except ValueError as e:
+                return JsonResponse({"error": str(e)}, status=400)
+            fy = fiscal_year(f"{start_year}-04")
+            months = fiscal_year_months(fy)
+            # The current fiscal year runs to today
+            end_date = min(month_bounds(months[-1])[1], today)
+            label = fy
+        elif kind == "YTD":
+            end_date = body.get("as_of", today)
             try:
-                day_num = datetime.strptime(tx_date_str, "%Y-%m-%d").date().day
-            except:
-                continue
-            
-            is_in_view_month = (start_date_str <= tx_date_str <= end_date_str)
-            op_type = tx.get('operation_type')
-            details = tx.get('details', {})
-            
-            if op_type == "AddStockQuantity":
-                item_id = details.get('item_id')
-                report_data[item_id]["total_in_period_to_now"] += float(details.get('quantity_added', 0))
-            
-            elif op_type in ["PushToProduction", "AddDefectiveGoods"]:
-                if op_type == "PushToProduction":
-                    deductions = details.get('deductions', {})
-                    for item_id, qty_dec in deductions.items():
-                        qty = float(qty_dec)
-                        report_data[item_id]["total_out_period_to_now"] += qty
-                        if is_in_view_month:
-                            report_data[item_id]["out_days"][str(day_num)] += qty
-                            report_data[item_id]["total_out_month"] += qty
-                else:
-                    item_id = details.get('item_id')
-                    qty = float(details.get('defective_added', 0))
-                    report_data[item_id]["total_out_period_to_now"] += qty
-                    if is_in_view_month:
-                        report_data[item_id]["out_days"][str(day_num)] += qty
-                        report_data[item_id]["total_out_month"] += qty
-        
-        # 5) Build Response with groups
-        groups_data = dynamodb_service.scan_table('GROUPS')
-        group_map = {g['group_id']: g.get('name', 'Unknown') for g in groups_data}
-        
-        final_output = defaultdict(list)
-        monthly_total = 0.0
-        
-        for item_id, info in live_stock_map.items():
-            data = report_data[item_id]
-            # O/B Formula
-            opening_balance = info['current_qty'] - data["total_in_period_to_now"] + data["total_out_period_to_now"]
-            
-            monthly_total += data["total_out_month"]
-            
-            item_entry = {
-                "item_id": item_id,
-                "item_name": info['name'],
-                "opening_balance": round(opening_balance, 2),
-                "outward_days": dict(data["out_days"]),
-                "total_outward": round(data["total_out_month"], 2)
-            }
-            grp_name = group_map.get(info['group_id'], "Ungrouped")
-            final_output[grp_name].append(item_entry)
-        
-        # 6) Build payload
-        payload = {
-            "month": month_str,
-            "type": "OUTWARD",
-            "grid_data": dict(final_output),
-            "monthly_total": monthly_total
-        }
-        
-        return JsonResponse(payload, encoder=DecimalEncoder)
-        
+                end_date = datetime.strptime(str(end_date).strip(), "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError:
+                return JsonResponse({"error": "'as_of' must be in format YYYY-MM-DD"}, status=400)
+            fy = fiscal_year(end_date)
+            months = fiscal_year_months(fy)
+            label = f"YTD {fy} to {end_date}"
+        else:
+            return JsonResponse({"error": "'type' must be 'FY' or 'YTD'"}, status=400)
+
+        if end_date < months[0] + "-01":
+            return JsonResponse({"error": f"{fy} has not started yet"}, status=400)
+
+        payload = ReportResultCache.get_or_compute(
+            "stock_statement", {"type": kind, "start_month": months[0], "end_date": end_date},
+            f"{months[0]}-01", end_date,
+            lambda: compute_stock_statement(months[0], end_date, label)
+        )
+        return JsonResponse(payload, encoder=ResponseEncoder)
+
     except Exception as e:
-        logger.error(f"Error in get_monthly_outward_grid: {e}", exc_info=True)
-        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
\ No newline at end of file
+        logger.error(f"Error in get_stock_statement: {e}", exc_info=True)
+        return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
@@ -8,36 +8,42 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from backend.dynamodb_service import dynamodb_service
+from backend.ids import new_id
+from backend.query_planner import find_items
+from backend.serialization import DecimalEncoder, FastJsonResponse
 from botocore.exceptions import ClientError
 from users.decorators import jwt_required, admin_required
 from users.jwt_utils import decode_jwt_token
 from users.token_manager import TokenManager
+from production.product_service import ProductService
+from production.cost_rollup import CostRollupService
+from reports import transaction_hooks
+from reports.report_cache import ReportResultCache
+from reports.report_warmer import ReportWarmer
+from reports.transaction_listing import transaction_month
 
 logger = logging.getLogger(__name__)
 
 
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        return super(DecimalEncoder, self).default(o)
-
 # Helper functions for stock operations
 def log_transaction(action, data, username):
     """Log transaction for audit trail"""
-    transaction_id = str(uuid.uuid4())
+    transaction_id = new_id()
     now = datetime.now()
     transaction_data = {
         'transaction_id': transaction_id,
         'operation_type': action,
         'date': now.strftime('%Y-%m-%d'),
         'timestamp': now.isoformat(),
+        'month': now.strftime('%Y-%m'),
         'username': username,
-        'details': data
+        # DynamoDB rejects floats, so round-trip the details into Decimals
+        'details': json.loads(json.dumps(data, cls=DecimalEncoder), parse_float=Decimal)
     }
     print(f"[LOG_TRANSACTION] Attempting to log {action} - ID: {transaction_id}")
     dynamodb_service.put_item('stock_transactions', transaction_data)
+    transaction_hooks.dispatch(transaction_data)
     print(f"[LOG_TRANSACTION] ✓ Successfully logged {action}")
     logger.info(f"✓ Transaction logged: {action} by {username} on {transaction_data['date']} - ID: {transaction_id}")
     return transaction_id
@@ -45,7 +51,7 @@ def log_transaction(action, data, username):
 def log_undo_action(action, data, username):
     """Log undo action for rollback capability"""
     try:
-        undo_id = str(uuid.uuid4())
+        undo_id = new_id()
         undo_data = {
             'undo_id': undo_id,
             'operation': action,
@@ -74,8 +80,8 @@ def recalc_all_production():
 def get_all_stock_transactions(request):
     """Get all stock transactions for reporting"""
     try:
-        transactions = dynamodb_service.scan_table('stock_transactions')
-        return JsonResponse(transactions, safe=False)
+        transactions = dynamodb_service.scan_table('stock_transactions', plain=True)
+        return FastJsonResponse(transactions)
     except Exception as e:
         logger.error(f"Error getting stock transactions: {e}")
         return JsonResponse({"error": f"Internal error: {str(e)}"}, status=500)
@@ -155,6 +161,8 @@ def create_group(request):
             group_item['parent_id'] = parent_id
         
         dynamodb_service.put_item('GROUPS', group_item)
+        ReportResultCache.touch_catalog()
+        ReportWarmer.schedule()
         
         logger.info(f"Group created: {group_id} ('{name}', parent={parent_id})")
 
@@ -189,6 +197,8 @@ def delete_group(request):
         
         # Delete the group
         dynamodb_service.delete_item('GROUPS', {'group_id': group_id})
+        ReportResultCache.touch_catalog()
+        ReportWarmer.schedule()
         
         logger.info(f"Group deleted: {group_id}")
         return JsonResponse({
@@ -211,11 +221,7 @@ def list_groups(request):
         try:
             if parent_id:
                 # Query groups with specific parent_id
-                groups = dynamodb_service.scan_table(
-                    'GROUPS', 
-                    FilterExpression='parent_id = :pid', 
-                    ExpressionAttributeValues={':pid': parent_id}
-                )
+                groups = find_items('GROUPS', {'parent_id': parent_id})
             else:
                 # Get root groups (no parent_id)
                 groups = dynamodb_service.scan_table(
@@ -458,6 +464,10 @@ def update_stock(request):
 
         log_undo_action("UpdateStock", {'item_id': item_id, 'old_state': old_state}, username)
         recalc_all_production()
+        
+        # Reprice the products that consume this material
+        if 'cost_per_unit' in body or 'gst' in body:
+            CostRollupService.after_stock_cost_change(item_id)
 
         return JsonResponse({
             "message": "Stock updated successfully",
@@ -1104,6 +1114,7 @@ def save_opening_stock(request):
             existing['details'] = details
             existing['timestamp'] = timestamp_str
             existing['date'] = report_date
+            existing['month'] = transaction_month(timestamp_str)
             dynamodb_service.put_item('stock_transactions', existing)
             logger.info(f"Updated opening stock transaction with ID: {existing['transaction_id']}")
             
@@ -1112,12 +1123,13 @@ def save_opening_stock(request):
             response_message = "Opening stock updated successfully."
         else:
             # Create new record with immediate verification
-            transaction_id = str(uuid.uuid4())
+            transaction_id = new_id()
             transaction_data = {
                 'transaction_id': transaction_id,
                 'operation_type': 'SaveOpeningStock',
                 'date': report_date,
                 'timestamp': timestamp_str,
+                'month': transaction_month(timestamp_str),
                 'username': username,
                 'details': details
             }
@@ -1140,6 +1152,9 @@ def save_opening_stock(request):
             logger.info(f"Saved opening stock for {username} on {report_date}")
             response_message = "Opening stock saved successfully."
             
+        ReportResultCache.touch_dates([report_date])
+        ReportWarmer.schedule()
+        
         # Verify the record was saved
         verification = get_existing_stock_record('SaveOpeningStock', report_date)
         if verification:
@@ -1256,15 +1271,17 @@ def save_closing_stock(request):
         if existing:
             existing['details'] = details
             existing['timestamp'] = ts
+            existing['month'] = transaction_month(ts)
             dynamodb_service.put_item('stock_transactions', existing)
             logger.info(f"Updated closing stock for {username} on {today}")
             msg = "Closing stock updated successfully."
         else:
             transaction_data = {
-                'transaction_id': str(uuid.uuid4()),
+                'transaction_id': new_id(),
                 'operation_type': 'SaveClosingStock',
                 'date': today,
                 'timestamp': ts,
+                'month': transaction_month(ts),
                 'username': username,
                 'details': details
             }
@@ -1272,6 +1289,8 @@ def save_closing_stock(request):
             logger.info(f"Saved closing stock for {username} on {today}")
             msg = "Closing stock saved successfully."
         
+        ReportResultCache.touch_dates([today])
+        ReportWarmer.schedule()
         return JsonResponse({
             'message': msg,
             'date': today,
@@ -1363,6 +1382,7 @@ def create_product(request):
         }
         
         dynamodb_service.put_item('PRODUCTION', product_item)
+        CostRollupService.sync_product(product_id, None, stock_needed)
         
         # Log transaction and undo
         log_transaction("CreateProduct", {
@@ -1421,30 +1441,9 @@ def update_product(request):
         labour_cost = Decimal(str(body.get('labour_cost', existing.get('labour_cost', 0))))
         other_cost = Decimal(str(body.get('other_cost', existing.get('other_cost', 0))))
         
-        # Recalculate costs and production capacity
-        base_cost = Decimal('0')
-        max_prod = None
-        cost_break = {}
-        
-        for item_id, qty_needed in stock_needed.items():
-            stock_item = dynamodb_service.get_item('STOCK', {'item_id': item_id})
-            if not stock_item:
-                max_prod = Decimal('0')
-                base_cost = Decimal('0')
-                cost_break = {}
-                break
-            
-            available = Decimal(str(stock_item.get('quantity', 0)))
-            possible = available // qty_needed if qty_needed > 0 else Decimal('0')
-            max_prod = possible if max_prod is None else min(max_prod, possible)
-            
-            cpu = Decimal(str(stock_item.get('cost_per_unit', 0)))
-            ci = cpu * qty_needed
-            cost_break[item_id] = ci
-            base_cost += ci
-        
-        if max_prod is None:
-            max_prod = Decimal('0')
+        # Recalculate costs and production capacity from one batched BOM read
+        stock_map = ProductService.get_bom_stock(stock_needed)
+        base_cost, max_prod, cost_break = ProductService.compute_bom_costing(stock_needed, stock_map)
         
         # Compute wastage and total cost
         wastage_amt = (base_cost * wastage_pct) / Decimal('100')
@@ -1471,6 +1470,7 @@ def update_product(request):
         })
         
         dynamodb_service.put_item('PRODUCTION', updated_item)
+        CostRollupService.sync_product(product_id, existing.get('stock_needed'), stock_needed)
         
         # Log transaction
         log_transaction("UpdateProduct", {
@@ -1560,6 +1560,7 @@ def delete_product(request):
         
         # Delete the product
         dynamodb_service.delete_item('PRODUCTION', {'product_id': product_id})
+        CostRollupService.sync_product(product_id, existing.get('stock_needed'), None)
         
         return JsonResponse({"message": "Product deleted successfully", "product_id": product_id})
         
@@ -1820,14 +1821,8 @@ def push_to_production(request):
         if quantity_to_produce <= 0:
             return JsonResponse({"error": "quantity must be > 0"}, status=400)
             
-        # Get product
-        products = dynamodb_service.scan_table('PRODUCTION')
-        product_item = None
-        for product in products:
-            if product.get('product_id') == product_id:
-                product_item = product
-                break
-                
+        # Get product and only the stock items it consumes
+        product_item, stock_map = ProductService.get_product_with_materials(product_id)
         if not product_item:
             return JsonResponse({"error": f"Product '{product_id}' not found"}, status=404)
             
@@ -1838,8 +1833,6 @@ def push_to_production(request):
             return JsonResponse({"error": "Product has no 'stock_needed' defined"}, status=400)
             
         # Check stock availability
-        stock_items = dynamodb_service.scan_table('STOCK')
-        stock_map = {item['item_id']: item for item in stock_items}
         
         required_deductions = {}
         cost_per_unit_total = Decimal(str(provided_cost_per_unit)) if provided_cost_per_unit else Decimal('0')
@@ -1890,7 +1883,7 @@ def push_to_production(request):
             dynamodb_service.put_item('STOCK', stock_item)
             
         # Create push record
-        push_id = str(uuid.uuid4())
+        push_id = new_id()
         total_production_cost = cost_per_unit_total * quantity_to_produce
         
         push_record = {
@@ -1903,7 +1896,8 @@ def push_to_production(request):
             'username': username,
             'production_cost_per_unit': cost_per_unit_total,
             'total_production_cost': total_production_cost,
-            'timestamp': now_ist
+            'timestamp': now_ist,
+            **ProductService.push_date_fields(now_ist)
         }
         
         dynamodb_service.put_item('PUSH_TO_PRODUCTION', push_record)
@@ -1947,13 +1941,7 @@ def undo_production(request):
         username = body['username']
         
         # Get push record
-        push_records = dynamodb_service.scan_table('PUSH_TO_PRODUCTION')
-        push_item = None
-        for record in push_records:
-            if record.get('push_id') == push_id:
-                push_item = record
-                break
-                
+        push_item = ProductService.get_push_record(push_id)
         if not push_item:
             return JsonResponse({"error": f"Push '{push_id}' not found"}, status=404)
             
@@ -1962,8 +1950,7 @@ def undo_production(request):
             
         # Restore stock quantities
         stock_deductions = push_item.get('stock_deductions', {})
-        stock_items = dynamodb_service.scan_table('STOCK')
-        stock_map = {item['item_id']: item for item in stock_items}
+        stock_map = ProductService.get_bom_stock(stock_deductions)
         
         for item_id, deduction in stock_deductions.items():
             if item_id in stock_map:
@@ -2021,10 +2008,7 @@ def delete_push_to_production(request):
         username = body['username']
         
         # Check if push record exists
-        push_records = dynamodb_service.scan_table('PUSH_TO_PRODUCTION')
-        push_exists = any(record.get('push_id') == push_id for record in push_records)
-        
-        if not push_exists:
+        if not ProductService.get_push_record(push_id):
             return JsonResponse({"error": f"Push record '{push_id}' not found"}, status=404)
             
         # Delete push record
@@ -2172,6 +2156,8 @@ def creategroup(request, body):
             group_item['parent_id'] = parent_id
         
         dynamodb_service.put_item('GROUPS', group_item)
+        ReportResultCache.touch_catalog()
+        ReportWarmer.schedule()
         
         logger.info(f"Group created: {group_id} ('{name}', parent={parent_id})")
 
@@ -2202,11 +2188,7 @@ def listgroups(request, body=None):
         try:
             if parent_id:
                 # Query groups with specific parent_id
-                groups = dynamodb_service.scan_table(
-                    'GROUPS', 
-                    FilterExpression='parent_id = :pid', 
-                    ExpressionAttributeValues={':pid': parent_id}
-                )
+                groups = find_items('GROUPS', {'parent_id': parent_id})
             else:
                 # Get root groups (no parent_id)
                 groups = dynamodb_service.scan_table(
@@ -2241,6 +2223,8 @@ def deletegroup(request, body):
         
         # Delete the group
         dynamodb_service.delete_item('GROUPS', {'group_id': group_id})
+        ReportResultCache.touch_catalog()
+        ReportWarmer.schedule()
         
         logger.info(f"Group deleted: {group_id}")
         return JsonResponse({
@@ -1,4 +1,4 @@
-import uuid
+from backend.ids import new_id
 import logging
 from decimal import Decimal
 from datetime import datetime, timedelta
@@ -8,7 +8,7 @@ logger = logging.getLogger(__name__)
 
 def log_transaction(operation, details, username):
     """Log transaction exactly as in Lambda"""
-    transaction_id = str(uuid.uuid4())
+    transaction_id = new_id()
     now = datetime.utcnow() + timedelta(hours=5, minutes=30)
     date_str = now.strftime("%Y-%m-%d")
 
@@ -58,7 +58,7 @@ def log_undo_action(operation, undo_details, username):
         if get_user_active_undo_count(username) >= 3:
             remove_oldest_undo(username)
             
-        undo_id = str(uuid.uuid4())
+        undo_id = new_id()
         timestamp = datetime.utcnow() + timedelta(hours=5, minutes=30)
         
         UndoAction.objects.create(
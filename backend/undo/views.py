@@ -1,22 +1,19 @@
 import json
 import uuid
 import logging
-from decimal import Decimal
 from datetime import datetime
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from backend.dynamodb_service import dynamodb_service
 from botocore.exceptions import ClientError
+from reports.report_cache import ReportResultCache, CATALOG_OPERATIONS
+from reports.report_warmer import ReportWarmer
+from reports.columnar_store import transaction_columns
+from reports.daily_movements import DailyMovementService
 
 logger = logging.getLogger(__name__)
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        return super(DecimalEncoder, self).default(o)
-
 @csrf_exempt
 @require_http_methods(["POST"])
 def undo_action(request):
@@ -71,6 +68,9 @@ def undo_action(request):
                 old_state['item_id'] = item_id
                 old_state['updated_at'] = datetime.now().isoformat()
                 dynamodb_service.put_item('STOCK', old_state)
+                if 'cost_per_unit' in old_state or 'gst_percentage' in old_state:
+                    from production.cost_rollup import CostRollupService
+                    CostRollupService.after_stock_cost_change(item_id)
                 
         elif operation == "DeleteStock":
             # Restore deleted item
@@ -140,6 +140,13 @@ def undo_action(request):
         record['completed_at'] = datetime.now().isoformat()
         dynamodb_service.put_item('undo_actions', record)
         
+        # Reports of the undone action's day and of today read the restored stock
+        if operation in CATALOG_OPERATIONS:
+            ReportResultCache.touch_catalog()
+        else:
+            ReportResultCache.touch_dates([record.get('timestamp', '')[:10], datetime.now().strftime('%Y-%m-%d')])
+        ReportWarmer.schedule()
+        
         logger.info(f"Undo action completed: {operation} for {username}")
         return JsonResponse({
             "message": f"Action '{operation}' undone successfully.",
@@ -170,7 +177,7 @@ def delete_transaction_data(request):
             return JsonResponse({"error": "Invalid confirmation"}, status=400)
         
         # Delete all transaction data (admin only)
-        tables_to_clear = ['stock_transactions', 'undo_actions', 'PUSH_TO_PRODUCTION']
+        tables_to_clear = ['stock_transactions', 'undo_actions', 'PUSH_TO_PRODUCTION', 'ITEM_DAILY_MOVEMENTS', 'ITEM_BALANCE_CHECKPOINTS', 'ITEM_MOVEMENTS', 'ITEM_PERIOD_ROLLUPS']
         deleted_count = 0
         
         for table_name in tables_to_clear:
@@ -184,12 +191,25 @@ def delete_transaction_data(request):
                         key = {'undo_id': item['undo_id']}
                     elif table_name == 'PUSH_TO_PRODUCTION':
                         key = {'push_id': item['push_id']}
+                    elif table_name == 'ITEM_DAILY_MOVEMENTS':
+                        key = {'month': item['month'], 'day_item': item['day_item']}
+                    elif table_name == 'ITEM_BALANCE_CHECKPOINTS':
+                        key = {'month': item['month'], 'item_id': item['item_id']}
+                    elif table_name == 'ITEM_MOVEMENTS':
+                        key = {'item_id': item['item_id'], 'ts_txn': item['ts_txn']}
+                    elif table_name == 'ITEM_PERIOD_ROLLUPS':
+                        key = {'period': item['period'], 'item_id': item['item_id']}
                     
                     dynamodb_service.delete_item(table_name, key)
                     deleted_count += 1
             except Exception as e:
                 logger.warning(f"Error clearing {table_name}: {e}")
         
+        # No transactions are left, so the emptied daily movements are complete
+        DailyMovementService.mark_backfilled()
+        ReportResultCache.touch_catalog()
+        transaction_columns.reset()
+        ReportWarmer.schedule()
         logger.info(f"Transaction data deleted by {username}: {deleted_count} records")
         return JsonResponse({
             "message": "Transaction data deleted successfully",
@@ -6,25 +6,38 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def authenticate(request):
+    """
+    (JWT payload, None) for a valid, non-revoked bearer token, else (None, 401 response).
+    A request already verified by the batched lambda router is not checked again.
+    """
+    if getattr(request, 'jwt_verified', False):
+        return request.user_info, None
+
+    auth_header = request.META.get('HTTP_AUTHORIZATION')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None, JsonResponse({"error": "Authentication required"}, status=401)
+    
+    token = auth_header.split(' ')[1]
+    
+    # Check if token is blacklisted
+    if TokenManager.is_token_blacklisted(token):
+        return None, JsonResponse({"error": "Token has been revoked"}, status=401)
+    
+    payload = decode_jwt_token(token)
+    if not payload:
+        return None, JsonResponse({"error": "Invalid or expired token"}, status=401)
+    
+    request.user_info = payload
+    request.jwt_token = token  # Store for potential blacklisting
+    return payload, None
+
 def jwt_required(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        auth_header = request.META.get('HTTP_AUTHORIZATION')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return JsonResponse({"error": "Authentication required"}, status=401)
-        
-        token = auth_header.split(' ')[1]
-        
-        # Check if token is blacklisted
-        if TokenManager.is_token_blacklisted(token):
-            return JsonResponse({"error": "Token has been revoked"}, status=401)
-        
-        payload = decode_jwt_token(token)
-        if not payload:
-            return JsonResponse({"error": "Invalid or expired token"}, status=401)
-        
-        request.user_info = payload
-        request.jwt_token = token  # Store for potential blacklisting
+        payload, error = authenticate(request)
+        if error is not None:
+            return error
         return view_func(request, *args, **kwargs)
     return wrapper
 
@@ -36,7 +49,7 @@ def admin_required(view_func):
             return JsonResponse({"error": "Authentication required"}, status=401)
         
         token = auth_header.split(' ')[1]
-        payload = decode_jwt_token(token)
+        payload = request.user_info if getattr(request, 'jwt_verified', False) else decode_jwt_token(token)
         
         if not payload:
             return JsonResponse({"error": "Invalid or expired token"}, status=401)
@@ -58,7 +71,7 @@ def role_required(required_roles):
                 return JsonResponse({"error": "Authentication required"}, status=401)
             
             token = auth_header.split(' ')[1]
-            payload = decode_jwt_token(token)
+            payload = request.user_info if getattr(request, 'jwt_verified', False) else decode_jwt_token(token)
             
             if not payload:
                 return JsonResponse({"error": "Invalid or expired token"}, status=401)